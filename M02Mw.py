@@ -1,25 +1,9 @@
 #!/usr/bin/env python
 
-from math import log10
 import argparse
 
-
-def moment2Mw(M0):
-    """
-    Convert seismic moment M0 to moment magnitude
-    :param M0: seismic moment
-    :type M0: float
-    :return  Mw: moment magnitude
-    :type Mw: float
-
-    """
-    return (2./3.) * log10(M0) - 10.7
-
-def energy(M0):
-    '''
-
-    '''
-    return 1.6 * M0 * 1.e-5
+# moment2Mw (M0 in dyne.cm) and energy work on scalars and arrays
+from magnitude import moment2Mw, energy
 
 
 if __name__ == "__main__":
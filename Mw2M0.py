@@ -2,22 +2,8 @@
 
 import argparse
 
-def Mw2moment(Mw):
-    '''
-    Convert moment magnitude Mw to seismic moment M0
-    :param Mw: moment magnitude
-    :type Mw: float
-    :return M0: seismic moment in Nm
-    :type M0: float
-    '''
-    
-    return 10.0 ** ((Mw + 6.0) / 2.0 * 3)
-                   
-def energy(M0):
-    '''
-
-    '''
-    return 1.6 * M0 * 1.e-5
+# Mw2moment (M0 in N.m) and energy work on scalars and arrays
+from magnitude import Mw2moment, energy
 
 if __name__ == "__main__":
                     
@@ -0,0 +1,590 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Animated GIF (or MP4/WebM) from a series of PNG snapshots, without
+ImageMagick.
+
+The frames are read, resized, quantized and compressed one at a time by a
+pool of worker processes, and written in order as soon as they are ready:
+only a few frames are in memory at once, whatever the length of the series.
+The palette is computed once, from the first frame, and shared by all the
+frames (global color table of the GIF).
+
+MP4 and WebM are written by piping the resized frames to ffmpeg, which must
+be in the PATH.
+
+usage (same arguments as imgtogif.sh):
+
+./animation.py thick.s                  # thick.s*.png -> out.gif
+./animation.py surf.w surf.gif
+./animation.py surf.w surf.mp4 -j 4 --delay 10
+
+import animation
+files = animation.frame_files('surf.w')
+animation.write_animation(files, 'surf.gif', size=(603, 693))
+'''
+
+import argparse
+import collections
+import glob
+import io
+import multiprocessing
+import os
+import re
+import struct
+import subprocess
+
+import numpy as np
+
+
+# default size of the frames (width, height), as imgtogif.sh
+DEFAULT_SIZE = (603, 693)
+
+# delay between the frames, in 1/100 s
+DEFAULT_DELAY = 50
+
+VIDEO_CODECS = {'.mp4': ('libx264', 'yuv420p'),
+                '.webm': ('libvpx-vp9', 'yuv420p')}
+
+
+#-------------------------------------------------------------------------------
+# frames
+
+def _sort_key(filename):
+    # sort -n -t _ -k 2: number at the beginning of the second field
+    fields = filename.split('_', 1)
+    match = re.match(r'\s*[-+]?(\d+\.?\d*|\.\d+)', fields[1]) if len(fields) > 1 else None
+    return (float(match.group(0)) if match else 0., filename)
+
+
+def frame_files(basename):
+    '''
+    PNG files of a series (basename*.png), sorted by the number after the
+    first '_' as imgtogif.sh (e.g. surf.w_2.png before surf.w_10.png)
+    '''
+    return sorted(glob.glob(basename + '*.png'), key=_sort_key)
+
+
+def read_frame(filename):
+    '''
+    Read a PNG file
+    :return: RGB array of uint8, shape (height, width, 3), the transparent
+             pixels are composited over white
+    '''
+    import matplotlib.image
+
+    img = matplotlib.image.imread(filename)
+    if img.dtype != np.uint8:
+        img = np.round(img * 255.).astype(np.uint8)
+    if img.ndim == 2:
+        img = np.repeat(img[:, :, np.newaxis], 3, axis=2)
+    if img.shape[2] == 4:
+        alpha = img[:, :, 3:].astype(float) / 255.
+        img = np.round(img[:, :, :3] * alpha + 255. * (1. - alpha)).astype(np.uint8)
+    return img
+
+
+def fit_size(shape, size):
+    '''
+    Size (width, height) of an image of shape (height, width, ...) resized to
+    fit in size, keeping its aspect ratio (as convert -resize WxH)
+    '''
+    height, width = shape[:2]
+    scale = min(size[0] / float(width), size[1] / float(height))
+    return (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+
+
+def _interp_axis(img, n, axis):
+    # linear interpolation along an axis, pixel centers aligned
+    m = img.shape[axis]
+    if m == n:
+        return img
+    x = (np.arange(n) + 0.5) * (m / float(n)) - 0.5
+    x = np.clip(x, 0, m - 1)
+    i0 = np.floor(x).astype(int)
+    i1 = np.minimum(i0 + 1, m - 1)
+    w = x - i0
+    shape = [1] * img.ndim
+    shape[axis] = n
+    w = w.reshape(shape)
+    return np.take(img, i0, axis=axis) * (1. - w) + np.take(img, i1, axis=axis) * w
+
+
+def resize(img, size):
+    '''
+    Resize an RGB image to size (width, height), by linear interpolation
+    (averaged over the source pixels when the image is reduced)
+    '''
+    width, height = size
+    if img.shape[:2] == (height, width):
+        return img
+    out = img.astype(float)
+    # reduction by an integer factor first: average of blocks of pixels
+    fy = max(1, img.shape[0] // height)
+    fx = max(1, img.shape[1] // width)
+    if fy > 1 or fx > 1:
+        h, w = out.shape[0] // fy * fy, out.shape[1] // fx * fx
+        out = out[:h, :w].reshape(h // fy, fy, w // fx, fx, -1).mean(axis=(1, 3))
+    out = _interp_axis(_interp_axis(out, height, 0), width, 1)
+    return np.round(out).astype(np.uint8)
+
+
+#-------------------------------------------------------------------------------
+# palette
+
+def _rgb15(img):
+    # index of the colors in a 32x32x32 grid
+    img = img.reshape(-1, 3) >> 3
+    return (img[:, 0].astype(np.int32) << 10) | (img[:, 1].astype(np.int32) << 5) | img[:, 2]
+
+
+def make_palette(img, ncolors=256):
+    '''
+    Palette of the most frequent colors of an image (quantized to 5 bits
+    per channel), each color being the mean of its pixels
+    :return: array of uint8, shape (ncolors, 3)
+    '''
+    cells = _rgb15(img)
+    count = np.bincount(cells, minlength=1 << 15)
+    top = np.argsort(count, kind='mergesort')[::-1][:ncolors]
+    top = top[count[top] > 0]
+    palette = np.zeros((ncolors, 3), dtype=np.uint8)
+    pixels = img.reshape(-1, 3).astype(float)
+    for k in range(3):
+        mean = np.bincount(cells, weights=pixels[:, k], minlength=1 << 15)[top] / count[top]
+        palette[:len(top), k] = np.round(mean)
+    return palette
+
+
+def palette_lut(palette):
+    '''
+    Index of the nearest color of the palette for each cell of the 32x32x32
+    grid of colors (see _rgb15): the frames are quantized with a lookup
+    '''
+    grid = np.indices((32, 32, 32)).reshape(3, -1).T * 8 + 4
+    lut = np.empty(len(grid), dtype=np.uint8)
+    palette = palette.astype(np.int32)
+    for start in range(0, len(grid), 4096):
+        block = grid[start:start + 4096]
+        d = ((block[:, np.newaxis, :] - palette[np.newaxis, :, :])**2).sum(axis=2)
+        lut[start:start + 4096] = d.argmin(axis=1)
+    return lut
+
+
+def quantize(img, lut):
+    '''
+    Index of the color of each pixel in the palette of lut (see palette_lut)
+    '''
+    return lut[_rgb15(img)].reshape(img.shape[:2])
+
+
+#-------------------------------------------------------------------------------
+# gif
+
+def _run_lengths(data):
+    # number of identical bytes from each position of a uint8 array
+    starts = np.flatnonzero(np.concatenate(([True], data[1:] != data[:-1])))
+    ends = np.append(starts[1:], len(data))
+    return (np.repeat(ends, ends - starts) - np.arange(len(data))).tolist()
+
+
+def _lzw_codes(data, min_code_size):
+    '''
+    LZW codes of a uint8 array and their width in bits. The strings of a
+    repeated byte are followed without a lookup per pixel: runs[c][k - 1]
+    is the code of k bytes c, the longest one in the table is matched at
+    once on a run of c.
+    '''
+    clear = 1 << min_code_size
+    eoi = clear + 1
+    codes = [clear]
+    sizes = [min_code_size + 1]
+    emit = codes.append
+    # the codes are written in the width of the table when they are emitted
+    emit_size = sizes.append
+    table = {}
+    runs = {}
+    next_code = eoi + 1
+    code_size = min_code_size + 1
+
+    n = len(data)
+    if n:
+        runlen = _run_lengths(data)
+        data = data.tolist()
+        # current string: code w, wrun bytes wbyte if it is a run (0 otherwise)
+        w = wbyte = data[0]
+        wrun = 1
+        runs[w] = [w]
+        p = 1
+        while p < n:
+            c = data[p]
+            if wrun and c == wbyte and wrun < len(runs[c]):
+                m = min(wrun + runlen[p], len(runs[c]))
+                p += m - wrun
+                w = runs[c][m - 1]
+                wrun = m
+                continue
+            key = (w << 8) | c
+            code = table.get(key)
+            if code is not None:
+                w = code
+                wrun = 0
+                p += 1
+                continue
+            emit(w)
+            emit_size(code_size)
+            if next_code == 4096:
+                emit(clear)
+                emit_size(code_size)
+                table = {}
+                runs = {}
+                next_code = eoi + 1
+                code_size = min_code_size + 1
+            else:
+                table[key] = next_code
+                if wrun and c == wbyte:
+                    runs[c].append(next_code)
+                if next_code == 1 << code_size:
+                    code_size += 1
+                next_code += 1
+            w = wbyte = c
+            wrun = 1
+            runs.setdefault(c, [c])
+            p += 1
+        emit(w)
+        emit_size(code_size)
+    emit(eoi)
+    emit_size(code_size)
+    return codes, sizes
+
+
+def _sub_blocks(min_code_size, out):
+    # image data of a GIF: code size, then sub-blocks of 255 bytes at most
+    blocks = bytearray([min_code_size])
+    for start in range(0, len(out), 255):
+        chunk = out[start:start + 255]
+        blocks.append(len(chunk))
+        blocks.extend(chunk)
+    blocks.append(0)
+    return bytes(blocks)
+
+
+def lzw_encode(indices, min_code_size=8):
+    '''
+    LZW compression of the pixels of a GIF image, in python (see
+    gif_encoder for Pillow's encoder): about 0.05 s for a frame of 603x693
+    pixels, less for large areas of a single color
+    :param indices: color indices of the pixels (uint8 array)
+    :return: compressed data, in sub-blocks of 255 bytes at most
+    '''
+    data = np.ascontiguousarray(indices, dtype=np.uint8).ravel()
+    codes, sizes = _lzw_codes(data, min_code_size)
+
+    # bits of the codes, least significant first, packed in bytes
+    codes = np.array(codes, dtype=np.int32)
+    sizes = np.array(sizes, dtype=np.int32)
+    bit = np.arange(12)
+    bits = ((codes[:, np.newaxis] >> bit) & 1).astype(np.uint8)[bit < sizes[:, np.newaxis]]
+    bits = np.concatenate((bits, np.zeros(-len(bits) % 8, dtype=np.uint8)))
+    out = np.packbits(bits.reshape(-1, 8)[:, ::-1], axis=1).tobytes()
+    return _sub_blocks(min_code_size, bytearray(out))
+
+
+def _pillow_lzw_encode(indices, min_code_size=8):
+    # Pillow's gif encoder (in C) as used by GifImagePlugin for the image
+    # data: the sub-blocks without the code size and the terminator
+    from PIL import Image, ImageFile
+
+    if min_code_size != 8:
+        return lzw_encode(indices, min_code_size)
+    im = Image.fromarray(np.ascontiguousarray(indices, dtype=np.uint8), 'L')
+    im.encoderconfig = (8, False)
+    buf = io.BytesIO()
+    ImageFile._save(im, buf, [('gif', (0, 0) + im.size, 0, 'L')])
+    return b'\x08' + buf.getvalue() + b'\x00'
+
+
+def gif_encoder():
+    '''
+    LZW encoder of the frames: Pillow's (in C, 20 to 100 times faster) if
+    Pillow >= 9.1 is installed, lzw_encode otherwise. The older versions of
+    Pillow write almost uncompressed codes, frames about 3 times larger.
+    '''
+    try:
+        import PIL
+        from PIL import Image, ImageFile
+    except ImportError:
+        return lzw_encode
+    version = getattr(PIL, '__version__', getattr(PIL, 'PILLOW_VERSION', '0'))
+    if tuple(int(v) for v in re.findall(r'\d+', version)[:2]) < (9, 1):
+        return lzw_encode
+    return _pillow_lzw_encode
+
+
+# LZW encoder of the process, chosen by encode_frame on its first frame
+_encoder = {}
+
+def encode_frame(img, lut, size=None):
+    '''
+    Resize, quantize and compress an RGB frame for GifWriter.write
+    :return: (width, height, compressed data)
+    '''
+    if size is not None:
+        img = resize(img, fit_size(img.shape, size))
+    if 'lzw' not in _encoder:
+        _encoder['lzw'] = gif_encoder()
+    return img.shape[1], img.shape[0], _encoder['lzw'](quantize(img, lut))
+
+
+class GifWriter():
+    '''
+    Animated GIF written frame by frame, with a global palette
+    '''
+
+    def __init__(self, filename, size, palette, delay=DEFAULT_DELAY, loop=0):
+        '''
+        :param size: (width, height) of the animation
+        :param palette: array of 256 RGB colors (see make_palette)
+        :param delay: delay between the frames, in 1/100 s
+        :param loop: number of loops, 0 for infinite
+        '''
+        self.size = size
+        self.delay = delay
+        self._file = open(filename, 'wb')
+        f = self._file
+        f.write(b'GIF89a')
+        # logical screen, global color table of 256 colors
+        f.write(struct.pack('<HHBBB', size[0], size[1], 0xf7, 0, 0))
+        f.write(np.asarray(palette, dtype=np.uint8).reshape(256, 3).tobytes())
+        # netscape extension: loop
+        f.write(b'\x21\xff\x0bNETSCAPE2.0\x03\x01' + struct.pack('<H', loop) + b'\x00')
+
+    def write(self, width, height, data):
+        '''
+        Add a frame compressed by encode_frame, centered in the animation
+        '''
+        f = self._file
+        f.write(b'\x21\xf9\x04\x00' + struct.pack('<H', self.delay) + b'\x00\x00')
+        left = max(0, (self.size[0] - width) // 2)
+        top = max(0, (self.size[1] - height) // 2)
+        f.write(b'\x2c' + struct.pack('<HHHHB', left, top, width, height, 0))
+        f.write(data)
+
+    def close(self):
+        if self._file is not None:
+            self._file.write(b'\x3b')
+            self._file.close()
+            self._file = None
+
+
+#-------------------------------------------------------------------------------
+# video
+
+def _which(name):
+    '''
+    Path of an executable, searched in the PATH if name has no directory
+    (as shutil.which of python 3), None if it is not found
+    '''
+    def executable(path):
+        return os.path.isfile(path) and os.access(path, os.X_OK)
+
+    if os.path.dirname(name):
+        return name if executable(name) else None
+    for directory in os.environ.get('PATH', os.defpath).split(os.pathsep):
+        path = os.path.join(directory, name)
+        if executable(path):
+            return path
+    return None
+
+
+class VideoWriter():
+    '''
+    MP4 or WebM written by ffmpeg, the RGB frames are piped to its stdin
+    '''
+
+    def __init__(self, filename, size, delay=DEFAULT_DELAY, encoder='ffmpeg'):
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in VIDEO_CODECS:
+            raise ValueError("unknown video format: {}".format(ext))
+        if _which(encoder) is None:
+            raise IOError("{} is needed to write {} files".format(encoder, ext))
+        codec, pix_fmt = VIDEO_CODECS[ext]
+        self.size = size
+        # the frames are padded to an even size, as needed by yuv420p
+        self._process = subprocess.Popen(
+            [encoder, '-y', '-loglevel', 'error',
+             '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+             '-s', '{}x{}'.format(*size), '-framerate', str(100. / delay),
+             '-i', '-',
+             '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2:(ow-iw)/2:(oh-ih)/2:white',
+             '-c:v', codec, '-pix_fmt', pix_fmt, filename],
+            stdin=subprocess.PIPE)
+
+    def write(self, img):
+        '''
+        Add an RGB frame (padded with white to the size of the video)
+        '''
+        width, height = self.size
+        if img.shape[:2] != (height, width):
+            frame = np.full((height, width, 3), 255, dtype=np.uint8)
+            h, w = min(height, img.shape[0]), min(width, img.shape[1])
+            top, left = (height - h) // 2, (width - w) // 2
+            frame[top:top + h, left:left + w] = img[:h, :w]
+            img = frame
+        self._process.stdin.write(np.ascontiguousarray(img, dtype=np.uint8).tobytes())
+
+    def close(self):
+        if self._process is not None:
+            self._process.stdin.close()
+            status = self._process.wait()
+            self._process = None
+            if status:
+                raise IOError("the encoder failed (exit status {})".format(status))
+
+
+#-------------------------------------------------------------------------------
+# pipeline: a pool of workers prepares the frames, the main process writes them
+
+# state of a worker process, set by _init_worker
+_worker = {}
+
+def _init_worker(size, lut):
+    _worker['size'] = size
+    _worker['lut'] = lut
+
+
+def _gif_frame(filename):
+    return encode_frame(read_frame(filename), _worker['lut'], _worker['size'])
+
+
+def _video_frame(filename):
+    img = read_frame(filename)
+    return resize(img, fit_size(img.shape, _worker['size']))
+
+
+def ordered_map(function, items, processes=None, inflight=None, initializer=None, initargs=()):
+    '''
+    Generator of function(item) for each item, computed by a pool of
+    processes and returned in order. At most inflight items are computed or
+    waiting at once (2 per process by default), so the memory does not
+    depend on the number of items.
+    :param processes: number of processes (cpu count if None, 1 to compute
+                      the items in the current process)
+    '''
+    if processes == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for item in items:
+            yield function(item)
+        return
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if inflight is None:
+        inflight = 2 * processes
+
+    pool = multiprocessing.Pool(processes, initializer, initargs)
+    pending = collections.deque()
+    try:
+        for item in items:
+            if len(pending) >= inflight:
+                yield pending.popleft().get()
+            pending.append(pool.apply_async(function, (item,)))
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def open_writer(output, size, palette=None, delay=DEFAULT_DELAY):
+    '''
+    GifWriter for a .gif file (palette is needed), VideoWriter for .mp4 or .webm
+    '''
+    if output.lower().endswith('.gif'):
+        return GifWriter(output, size, palette, delay=delay)
+    return VideoWriter(output, size, delay=delay)
+
+
+def write_animation(files, output, size=DEFAULT_SIZE, delay=DEFAULT_DELAY, processes=None):
+    '''
+    Write an animation from PNG files
+    :param files: PNG files, in the order of the animation
+    :param output: .gif, .mp4 or .webm file
+    :param size: maximum (width, height) of the animation: the first frame
+                 is resized to fit in it, the others to fit in the first one
+    :param delay: delay between the frames, in 1/100 s
+    :param processes: number of worker processes (see ordered_map)
+    :return: number of frames
+    '''
+    if not files:
+        raise ValueError("no frame")
+
+    first = read_frame(files[0])
+    frame_size = fit_size(first.shape, size)
+    is_gif = output.lower().endswith('.gif')
+    lut = None
+    palette = None
+    if is_gif:
+        palette = make_palette(resize(first, frame_size))
+        lut = palette_lut(palette)
+    del first
+
+    writer = open_writer(output, frame_size, palette=palette, delay=delay)
+    count = 0
+    try:
+        frames = ordered_map(_gif_frame if is_gif else _video_frame, files,
+                             processes=processes, initializer=_init_worker,
+                             initargs=(frame_size, lut))
+        for frame in frames:
+            if is_gif:
+                writer.write(*frame)
+            else:
+                writer.write(frame)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+def main():
+
+    parser = argparse.ArgumentParser(prog='animation.py',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     description='Create an animation (gif, mp4, webm) from the png snapshots basename*.png',
+                                     epilog='''example:
+./animation.py thick.s          : animation of the slide snapshots (out.gif)
+./animation.py surf.w surf.gif  : animation of the tsunami wave snapshots''')
+    parser.add_argument('basename', help='basename of the input files (basename*.png, sorted by the number after the first _)')
+    parser.add_argument('output', nargs='?', default='out.gif',
+                        help='output file: .gif, or .mp4 / .webm with ffmpeg (default: %(default)s)')
+    parser.add_argument('--size', default='{}x{}'.format(*DEFAULT_SIZE),
+                        help='maximum size of the frames WIDTHxHEIGHT (default: %(default)s)')
+    parser.add_argument('--delay', type=int, default=DEFAULT_DELAY,
+                        help='delay between the frames in 1/100 s (default: %(default)s)')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='number of worker processes (default: number of cpu)')
+    args = parser.parse_args()
+
+    try:
+        size = tuple(int(v) for v in args.size.lower().split('x'))
+        if len(size) != 2:
+            raise ValueError
+    except ValueError:
+        parser.error('--size must be WIDTHxHEIGHT')
+
+    files = frame_files(args.basename)
+    if not files:
+        parser.error('no file {}*.png'.format(args.basename))
+    print " Input files:", len(files), "(", files[0], "...", files[-1], ")"
+    print "Output file: ", args.output
+
+    count = write_animation(files, args.output, size=size, delay=args.delay,
+                            processes=args.processes)
+    print "animation created : {} ({} frames)".format(args.output, count)
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Cache of the beachball geometry computed by obspy.
+
+obspy's beach() computes the polygons of the nodal planes each time it is
+called. BeachballCache.beach() has the same arguments and returns the same
+PatchCollection, but the polygons (for a beachball of unit width centered on
+the origin) are kept in a LRU cache in memory and optionally in a file on
+disk, so that near-identical mechanisms and static figures (e.g. the
+reference mechanisms of the ternary diagram) are only computed once.
+
+The mechanisms are quantized to build the key of the cache:
+ - strike, dip, rake are rounded to a multiple of the resolution (degrees),
+ - moment tensors are normalized (norm 1, see key()) and their components
+   are rounded to a multiple of radians(resolution), e.g. 0.0175 for 1
+   degree: a tolerance on the components, about the change of the components
+   when the mechanism is rotated by the resolution.
+The geometry of the first mechanism met in a cell of this grid is reused for
+all the mechanisms of the cell.
+
+usage:
+
+from beachball_cache import BeachballCache
+cache = BeachballCache(resolution=1., cache_file='beachballs.db')
+ax.add_collection(cache.beach([200, 26, 56], xy=(0.5, 0.5), width=1))
+print cache.hits, cache.disk_hits, cache.misses
+cache.close()
+'''
+
+from collections import OrderedDict
+import shelve
+
+import numpy as np
+from matplotlib import collections, patches, transforms
+import matplotlib.path as mplpath
+from obspy.imaging.beachball import (MomentTensor, NodalPlane, mt2plane, mt2axes,
+                                     plot_dc, plot_mt, EPSILON)
+
+
+# keyword of the transform of the offsets of a collection (transOffset
+# before matplotlib 3.6)
+_OFFSET_TRANSFORM = ('offset_transform' if hasattr(collections.Collection, 'set_offset_transform')
+                     else 'transOffset')
+
+def _as_array(fm):
+    '''
+    nodal plane (3) or moment tensor (6) as an array
+    '''
+    if isinstance(fm, MomentTensor):
+        m = fm.mt
+        return np.array([m[0, 0], m[1, 1], m[2, 2], m[0, 1], m[0, 2], m[1, 2]], dtype=float)
+    if isinstance(fm, NodalPlane):
+        return np.array([fm.strike, fm.dip, fm.rake], dtype=float)
+    return np.asarray(fm, dtype=float).ravel()
+
+
+class BeachballCache():
+
+    def __init__(self, resolution=1., maxsize=4096, cache_file=None, readonly=False):
+        '''
+        :param resolution: resolution of the quantization: degrees for
+                           strike, dip, rake, and tolerance radians(resolution)
+                           on the components of the normalized moment tensors
+        :param maxsize: number of geometries kept in memory
+        :param cache_file: file of the on-disk cache (shelve), no disk cache if None
+        :param readonly: only read the on-disk cache (e.g. in the worker
+                         processes, while another process writes it)
+        '''
+        self.resolution = resolution
+        self.maxsize = maxsize
+        self.cache_file = cache_file
+        self.readonly = readonly
+        self._lru = OrderedDict()
+        self._disk = None
+        if cache_file:
+            self._disk = shelve.open(cache_file, flag='r' if readonly else 'c', protocol=2)
+
+        # counters
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def sync(self):
+        '''
+        write the geometries computed so far to the on-disk cache
+        '''
+        if self._disk is not None and not self.readonly:
+            self._disk.sync()
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+    def key(self, fm, size=100):
+        '''
+        key of a mechanism in the cache: strike, dip, rake rounded to the
+        resolution (degrees), or the components of the moment tensor
+        normalized by sqrt(sum(M_ij**2) / 2) (1 for a double couple of unit
+        moment) rounded to radians(resolution)
+        '''
+        fm = _as_array(fm)
+        if len(fm) == 3:
+            q = np.round(fm / self.resolution) * self.resolution
+            q[0] = np.mod(q[0], 360.)
+            kind = 'np'
+        elif len(fm) == 6:
+            step = np.radians(self.resolution)
+            norm = np.sqrt(0.5*(fm[:3]**2).sum() + (fm[3:]**2).sum())
+            q = np.round(fm / norm / step) * step
+            kind = 'mt'
+        else:
+            raise TypeError("Wrong input value for 'fm'.")
+
+        # +0. avoids different keys for 0 and -0
+        return '{}:{}:{}'.format(kind, size, ','.join('{:.6g}'.format(v + 0.) for v in q))
+
+    def geometry(self, fm, size=100):
+        '''
+        colors ('b' or 'w') and vertices/codes of the polygons of a beachball
+        of unit width centered on (0, 0)
+        '''
+        fm = _as_array(fm)
+        key = self.key(fm, size)
+
+        if key in self._lru:
+            self.hits += 1
+            geom = self._lru.pop(key)
+        elif self._disk is not None and key in self._disk:
+            self.disk_hits += 1
+            geom = self._disk[key]
+        else:
+            self.misses += 1
+            geom = self._compute(fm, size)
+            if self._disk is not None and not self.readonly:
+                self._disk[key] = geom
+
+        self._lru[key] = geom
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+        return geom
+
+    def _compute(self, fm, size):
+        # same dispatch as obspy's beach()
+        if len(fm) == 6:
+            mt = MomentTensor(fm[0], fm[1], fm[2], fm[3], fm[4], fm[5], 0)
+            np1 = mt2plane(mt)
+            (t, n, p) = mt2axes(mt.normalized)
+            if np.fabs(n.val) < EPSILON and np.fabs(t.val + p.val) < EPSILON:
+                colors, p = plot_dc(np1, size, xy=(0, 0), width=(1, 1))
+            else:
+                try:
+                    colors, p = plot_mt(t, n, p, size,
+                                        plot_zerotrace=True, xy=(0, 0), width=(1, 1))
+                except (ValueError, IndexError):
+                    # plot_mt fails on some tensors which are almost pure
+                    # double couples (but not within EPSILON): draw the
+                    # double couple
+                    colors, p = plot_dc(np1, size, xy=(0, 0), width=(1, 1))
+        else:
+            np1 = NodalPlane(fm[0], fm[1], fm[2])
+            colors, p = plot_dc(np1, size=size, xy=(0, 0), width=(1, 1))
+
+        # the circles are Ellipse patches, scaled by their patch transform
+        paths = [patch.get_patch_transform().transform_path(patch.get_path()) for patch in p]
+        return (list(colors),
+                [np.array(path.vertices, dtype=float) for path in paths],
+                [None if path.codes is None else np.array(path.codes) for path in paths])
+
+    def beach(self, fm, linewidth=2, facecolor='b', bgcolor='w', edgecolor='k',
+              alpha=1.0, xy=(0, 0), width=200, size=100, nofill=False,
+              zorder=100, axes=None):
+        '''
+        Same as obspy.imaging.beachball.beach, from the cached geometry
+        '''
+        try:
+            assert(len(width) == 2)
+        except TypeError:
+            width = (width, width)
+        if size < 100:
+            size = 100
+        xy = np.asarray(xy, dtype=float).reshape(2)
+
+        colors, vertices, codes = self.geometry(fm, size)
+
+        # with axes, the patches stay at the origin and are positioned with
+        # the offset of the collection (see obspy's beach)
+        origin = np.zeros(2) if axes is not None else xy
+        p = [patches.PathPatch(mplpath.Path(v * width + origin, c))
+             for v, c in zip(vertices, codes)]
+
+        kwargs = {}
+        if axes is not None:
+            kwargs = {'offsets': xy.reshape(1, 2), _OFFSET_TRANSFORM: axes.transData}
+        col = collections.PatchCollection(p, match_original=False, **kwargs)
+        if nofill:
+            col.set_facecolor('none')
+        else:
+            col.set_facecolors([facecolor if c == 'b' else bgcolor for c in colors])
+
+        if axes is not None:
+            col.set_transform(transforms.IdentityTransform())
+
+        col.set_edgecolor(edgecolor)
+        col.set_alpha(alpha)
+        col.set_linewidth(linewidth)
+        col.set_zorder(zorder)
+        return col
+
+    def beaches(self, fms, xy, width=200, linewidth=2, facecolor='b', bgcolor='w',
+                edgecolor='k', alpha=1.0, size=100, nofill=False, zorder=100):
+        '''
+        Beachballs of N mechanisms in a single collection, drawn in one call
+        :param fms: nodal planes (N, 3) or moment tensors (N, 6)
+        :param xy: centers of the beachballs (N, 2), in data coordinates
+        :param width: width of the beachballs, in data units (scalar or (N,))
+        :return: PathCollection
+        '''
+        fms = np.asarray(fms, dtype=float)
+        fms = fms.reshape(len(fms), -1) if fms.size else fms.reshape(0, 6)
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        width = np.broadcast_to(np.asarray(width, dtype=float), (len(fms),))
+        if size < 100:
+            size = 100
+
+        paths = []
+        faces = []
+        for fm, center, w in zip(fms, xy, width):
+            colors, vertices, codes = self.geometry(fm, size)
+            paths.extend(mplpath.Path(v * w + center, c) for v, c in zip(vertices, codes))
+            faces.extend(facecolor if c == 'b' else bgcolor for c in colors)
+
+        col = collections.PathCollection(paths)
+        if nofill:
+            col.set_facecolor('none')
+        else:
+            col.set_facecolors(faces)
+        col.set_edgecolor(edgecolor)
+        col.set_alpha(alpha)
+        col.set_linewidth(linewidth)
+        col.set_zorder(zorder)
+        return col
@@ -0,0 +1,609 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Benchmarks of the numeric paths of the scripts.
+
+Each benchmark is run for several numbers of events, on synthetic data
+generated on the fly (random mechanisms, catalogs written in temporary
+files), in its own process so that its peak memory can be measured.
+For each benchmark and size, the best time of several runs, the throughput
+(events/s) and the peak memory added by the run (MB, from the maximum
+resident set size) are printed and can be saved in a json file to be
+compared with the results of another commit.
+
+examples:
+
+./benchmarks.py --list
+./benchmarks.py --sizes 1 1000 1000000 --output before.json
+./benchmarks.py magnitude catalog --compare before.json
+'''
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from math import sqrt, sin, cos
+from timeit import default_timer as timer
+
+import numpy as np
+
+from timings import peak_rss, reset_peak_rss
+
+
+#-------------------------------------------------------------------------------
+# synthetic data
+
+def random_mechanisms(n, seed=0):
+    '''
+    strike, dip, rake (degrees) and Mw of n random events
+    '''
+    rng = np.random.RandomState(seed)
+    strike = rng.uniform(0., 360., n)
+    dip = np.degrees(np.arccos(rng.uniform(0., 1., n)))
+    rake = rng.uniform(-180., 180., n)
+    # Gutenberg-Richter with b = 1 above Mw 4
+    mw = 4. - np.log10(rng.uniform(1.e-4, 1., n))
+    return strike, dip, rake, mw
+
+
+def random_catalog(n, seed=0):
+    '''
+    Catalog array (see catalog.CATALOG_DTYPE) of n random double couples
+    '''
+    from catalog import CATALOG_DTYPE
+    from magnitude import Mw2moment
+    from moment_tensor_dec import sdrToMtArray
+
+    rng = np.random.RandomState(seed + 1)
+    strike, dip, rake, mw = random_mechanisms(n, seed)
+    cat = np.zeros(n, dtype=CATALOG_DTYPE)
+    cat['event'] = ['S{:015d}'.format(i) for i in range(n)]
+    cat['time'] = (np.datetime64('1976-01-01T00:00:00', 'ms') +
+                   np.sort(rng.randint(0, 40 * 365 * 86400, n)).astype('timedelta64[s]'))
+    cat['lat'] = rng.uniform(-90., 90., n)
+    cat['lon'] = rng.uniform(-180., 180., n)
+    cat['depth'] = rng.uniform(0., 700., n)
+    cat['mag'] = np.round(mw - 0.2, 1)
+
+    mt = sdrToMtArray(strike, dip, rake) * Mw2moment(mw, unit='dyne.cm')[:, np.newaxis]
+    exponent = np.floor(np.log10(np.abs(mt).max(axis=1))).astype(int)
+    cat['exponent'] = exponent
+    cat['mt'] = np.round(mt / 10.**exponent[:, np.newaxis], 3)
+    return cat
+
+
+def write_ndk(cat, filename):
+    with open(filename, 'w') as f:
+        for ev in cat:
+            t = str(ev['time'])
+            mt = ev['mt']
+            f.write('PDE  {} {}.0 {:7.2f} {:8.2f} {:5.1f} {:.1f} {:.1f} SYNTHETIC\n'.format(
+                t[:10].replace('-', '/'), t[11:19], ev['lat'], ev['lon'], ev['depth'],
+                ev['mag'], ev['mag']))
+            f.write('{:<16s} B:  0    0   0 S:  0    0   0 M:  0    0   0 CMT: 1 TRIHD:  0.0\n'.format(ev['event']))
+            f.write('CENTROID:      0.0 0.0 {:6.2f} 0.00 {:7.2f} 0.00 {:5.1f}  0.0 FREE S-20000101000000\n'.format(
+                ev['lat'], ev['lon'], ev['depth']))
+            f.write('{:2d} {}\n'.format(ev['exponent'], ' '.join('{:6.3f} 0.000'.format(m) for m in mt)))
+            f.write('V10   0.000  0   0   0.000  0   0   0.000  0   0   0.000   0  0    0   0  0    0\n')
+
+
+def write_cmtsolution(cat, filename):
+    from catalog import MT_KEYS
+    with open(filename, 'w') as f:
+        for ev in cat:
+            t = str(ev['time'])
+            mt = ev['mt'] * 10.**ev['exponent']
+            f.write('PDE {} {} {} {} {} {}.00 {:8.4f} {:9.4f} {:5.1f} {:.1f} {:.1f} SYNTHETIC\n'.format(
+                t[:4], t[5:7], t[8:10], t[11:13], t[14:16], t[17:19],
+                ev['lat'], ev['lon'], ev['depth'], ev['mag'], ev['mag']))
+            f.write('event name:     {}\n'.format(ev['event']))
+            f.write('time shift:      0.0000\nhalf duration:   0.0000\n')
+            f.write('latitude:       {:.4f}\nlongitude:      {:.4f}\ndepth:          {:.4f}\n'.format(
+                ev['lat'], ev['lon'], ev['depth']))
+            for k, m in zip(MT_KEYS, mt):
+                f.write('{}:      {:e}\n'.format(k, m))
+
+
+def write_foc_mec(cat, filename):
+    from catalog import moment_tensors
+    np.savetxt(filename, moment_tensors(cat) / 1.e24, fmt='%.3f',
+               header='Mrr Mtt Mpp Mrt Mrp Mtp')
+
+
+#-------------------------------------------------------------------------------
+# per-event implementations replaced by the vectorized ones, copied from
+# ternary_plot.py before the changes: the baselines of their benchmarks
+
+degtorad = np.pi/180.
+
+
+def _legacy_read_foc_mec_file(fmfile):
+
+    fm = {}
+    idx = 0
+    with open(fmfile, 'r') as f:
+        data = f.readlines()
+
+        for line in data:
+            line = line.strip()
+            if not line.startswith("#"):
+                col = line.split()
+                idx +=1
+                fm[idx] = {}
+
+                fm[idx]['Mrr']  = float(col[0])
+                fm[idx]['Mtt']  = float(col[1])
+                fm[idx]['Mpp']  = float(col[2])
+                fm[idx]['Mrt']  = float(col[3])
+                fm[idx]['Mrp']  = float(col[4])
+                fm[idx]['Mtp']  = float(col[5])
+
+    return fm
+
+
+def _legacy_sdrToMt(strike, dip, rake):
+    '''
+    convert strike dip rake to moment tensor
+    '''
+
+
+    strike *=degtorad
+    dip *= degtorad
+    rake *= degtorad
+    # moment tensor (r=up, t=south and p=east)
+    is2 = 1/sqrt(2.0)
+
+    mrr = is2*( sin(2*dip) * sin(rake) )
+    mtt = -is2*( sin(dip) * cos(rake) * sin(2*strike) + sin(2*dip) * sin(rake) * sin(strike)**2 )
+    mpp = is2*( sin(dip) * cos(rake) * sin(2*strike) - sin(2*dip) * sin(rake) * cos(strike)**2 )
+    mtp = -is2*( sin(dip) * cos(rake) * cos(2*strike) + 0.5*sin(2*dip) * sin(rake) * sin(2*strike) )
+    mrp = is2*( cos(dip) * cos(rake) * sin(strike) - cos(2*dip) * sin(rake) * cos(strike))
+    mrt = -is2*( cos(dip) * cos(rake) * cos(strike) + cos(2*dip) * sin(rake) * sin(strike) )
+
+    #mt = MomentTensor((mrr, mtt, mpp, mrt, mrp, mtp), 0)
+    return mrr, mtt, mpp, mrt, mrp, mtp
+
+
+#-------------------------------------------------------------------------------
+# benchmarks: setup(n, tmpdir) -> state, run(state)
+
+def _sdr(n, tmpdir):
+    return random_mechanisms(n)[:3]
+
+
+def _mt(n, tmpdir):
+    from catalog import moment_tensors
+    return moment_tensors(random_catalog(n))
+
+
+def _mtdec_main(mt):
+    from moment_tensor_dec import main
+    # main prints the percentages
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        for m in mt:
+            main(*m)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def _decompose(mt):
+    from moment_tensor_dec import decompose
+    decompose(mt)
+
+
+def _principal_axes(mt):
+    from moment_tensor_dec import principal_axes
+    principal_axes(mt)
+
+
+def _aux_plane(sdr):
+    from moment_tensor_dec import aux_plane
+    aux_plane(*sdr)
+
+
+def _obspy_aux_plane(sdr):
+    from obspy.imaging.beachball import aux_plane
+    for s, d, r in zip(*sdr):
+        aux_plane(s, d, r)
+
+
+def _obspy_mt2axes(mt):
+    from obspy.imaging.beachball import MomentTensor, mt2axes
+    for m in mt:
+        mt2axes(MomentTensor(m, 0).normalized)
+
+
+def _obspy_mt2plane(mt):
+    from obspy.imaging.beachball import MomentTensor, mt2plane
+    for m in mt:
+        mt2plane(MomentTensor(m, 0))
+
+
+def _focal_mechanisms(sdr):
+    from moment_tensor_dec import focal_mechanisms
+    focal_mechanisms(*sdr)
+
+
+def _mt2planes(mt):
+    from moment_tensor_dec import mt2planes
+    mt2planes(mt)
+
+
+def _kagan_quaternions(mt):
+    from kagan import quaternions
+    quaternions(mt)
+
+
+def _quaternions(n, tmpdir):
+    from kagan import sdr_quaternions
+    return sdr_quaternions(*random_mechanisms(n)[:3])
+
+
+def _kagan_pairs(q):
+    from kagan import kagan_pairs
+    kagan_pairs(q, 10.)
+
+
+def _kagan_index_pairs(q):
+    from kagan import KaganIndex
+    for pairs in KaganIndex(q).iter_pairs(10.):
+        pass
+
+
+def _sdrToMt(sdr):
+    # the python floats of the original script (math functions)
+    for s, d, r in zip(*[a.tolist() for a in sdr]):
+        _legacy_sdrToMt(s, d, r)
+
+
+def _sdrToMtArray(sdr):
+    from moment_tensor_dec import sdrToMtArray
+    sdrToMtArray(*sdr)
+
+
+def _catalog_file(write):
+    def setup(n, tmpdir):
+        filename = os.path.join(tmpdir, 'catalog.txt')
+        write(random_catalog(n), filename)
+        return filename
+    return setup
+
+
+def _read_catalog(filename):
+    from catalog import read_catalog
+    for events in read_catalog(filename):
+        pass
+
+
+def _read_foc_mec_file(filename):
+    _legacy_read_foc_mec_file(filename)
+
+
+def _load_foc_mec(filename):
+    from catalog import load_foc_mec
+    load_foc_mec(filename)
+
+
+def _magnitudes(n, tmpdir):
+    mw = random_mechanisms(n)[3]
+    return mw, np.empty_like(mw)
+
+
+def _moments(n, tmpdir):
+    from magnitude import Mw2moment
+    m0 = Mw2moment(random_mechanisms(n)[3], unit='dyne.cm')
+    return m0, np.empty_like(m0)
+
+
+def _moment2Mw(state):
+    from magnitude import moment2Mw
+    m0, out = state
+    moment2Mw(m0, out=out)
+
+
+def _Mw2moment(state):
+    from magnitude import Mw2moment
+    mw, out = state
+    Mw2moment(mw, out=out)
+
+
+def _energy(state):
+    from magnitude import energy
+    m0, out = state
+    energy(m0, out=out)
+
+
+def _timestamps(n, tmpdir):
+    return np.random.RandomState(0).uniform(0., 2.e9, n)
+
+
+def _dates(n, tmpdir):
+    # to the second, the format of date_to_timestamp
+    from timestamp2date import timestamps_to_dates
+    return timestamps_to_dates(_timestamps(n, tmpdir), unit='s', sep='T')
+
+
+def _timestamp_to_date(ts):
+    from timestamp2date import timestamp_to_date
+    for t in ts:
+        timestamp_to_date(t)
+
+
+def _timestamps_to_dates(ts):
+    from timestamp2date import timestamps_to_dates
+    timestamps_to_dates(ts, unit='us')
+
+
+def _date_to_timestamp(dates):
+    from date2timestamp import date_to_timestamp
+    for d in dates:
+        date_to_timestamp(d)
+
+
+def _dates_to_timestamps(dates):
+    from date2timestamp import dates_to_timestamps
+    dates_to_timestamps(dates)
+
+
+def _obspy_beach(sdr):
+    from obspy.imaging.beachball import beach
+    for fm in zip(*sdr):
+        beach(fm, xy=(0, 0), width=1)
+
+
+def _cache(n, tmpdir):
+    from beachball_cache import BeachballCache
+    # the runs after the first one only hit the cache
+    return _sdr(n, tmpdir), BeachballCache(maxsize=max(n, 1))
+
+
+def _cached_beach(state):
+    sdr, cache = state
+    for fm in zip(*sdr):
+        cache.beach(fm, xy=(0, 0), width=1)
+
+
+def _png_dir(n, tmpdir):
+    return np.column_stack(_sdr(n, tmpdir)), os.path.join(tmpdir, 'bb_{index:06d}.png')
+
+
+def _draw_batch(state):
+    from plot_beachball import draw_batch
+    mechanisms, template = state
+    draw_batch(mechanisms, template=template, processes=1)
+
+
+# name: (setup, run, largest number of events)
+BENCHMARKS = [
+    ('moment_tensor_dec.main', _mt, _mtdec_main, 10**4),
+    ('moment_tensor_dec.decompose', _mt, _decompose, 10**6),
+    ('moment_tensor_dec.principal_axes', _mt, _principal_axes, 10**6),
+    ('obspy.aux_plane', _sdr, _obspy_aux_plane, 10**5),
+    ('obspy.mt2axes', _mt, _obspy_mt2axes, 10**4),
+    ('obspy.mt2plane', _mt, _obspy_mt2plane, 10**4),
+    ('moment_tensor_dec.aux_plane', _sdr, _aux_plane, 10**6),
+    ('moment_tensor_dec.sdrToMtArray', _sdr, _sdrToMtArray, 10**6),
+    ('moment_tensor_dec.focal_mechanisms', _sdr, _focal_mechanisms, 10**6),
+    ('moment_tensor_dec.mt2planes', _mt, _mt2planes, 10**6),
+    ('kagan.quaternions', _mt, _kagan_quaternions, 10**6),
+    ('kagan.kagan_pairs', _quaternions, _kagan_pairs, 10**4),
+    ('kagan.KaganIndex.iter_pairs', _quaternions, _kagan_index_pairs, 10**5),
+    ('ternary_plot.sdrToMt[legacy]', _sdr, _sdrToMt, 10**5),
+    ('ternary_plot.read_foc_mec_file[legacy]', _catalog_file(write_foc_mec), _read_foc_mec_file, 10**6),
+    ('catalog.load_foc_mec', _catalog_file(write_foc_mec), _load_foc_mec, 10**6),
+    ('catalog.read_catalog[ndk]', _catalog_file(write_ndk), _read_catalog, 10**6),
+    ('catalog.read_catalog[cmt]', _catalog_file(write_cmtsolution), _read_catalog, 10**6),
+    ('magnitude.moment2Mw', _moments, _moment2Mw, 10**6),
+    ('magnitude.Mw2moment', _magnitudes, _Mw2moment, 10**6),
+    ('magnitude.energy', _moments, _energy, 10**6),
+    ('timestamp2date.timestamp_to_date', _timestamps, _timestamp_to_date, 10**5),
+    ('timestamp2date.timestamps_to_dates', _timestamps, _timestamps_to_dates, 10**6),
+    ('date2timestamp.date_to_timestamp', _dates, _date_to_timestamp, 10**5),
+    ('date2timestamp.dates_to_timestamps', _dates, _dates_to_timestamps, 10**6),
+    ('beachball.obspy_beach', _sdr, _obspy_beach, 10**3),
+    ('beachball.BeachballCache.beach', _cache, _cached_beach, 10**4),
+    ('plot_beachball.draw_batch', _png_dir, _draw_batch, 10**3),
+]
+
+# baseline implementation of a benchmark (per-event functions, obspy), its
+# speedup is printed after the runs
+BASELINES = {
+    'moment_tensor_dec.decompose': 'moment_tensor_dec.main',
+    'moment_tensor_dec.principal_axes': 'obspy.mt2axes',
+    'moment_tensor_dec.aux_plane': 'obspy.aux_plane',
+    'moment_tensor_dec.sdrToMtArray': 'ternary_plot.sdrToMt[legacy]',
+    'moment_tensor_dec.mt2planes': 'obspy.mt2plane',
+    'kagan.KaganIndex.iter_pairs': 'kagan.kagan_pairs',
+    'catalog.load_foc_mec': 'ternary_plot.read_foc_mec_file[legacy]',
+    'timestamp2date.timestamps_to_dates': 'timestamp2date.timestamp_to_date',
+    'date2timestamp.dates_to_timestamps': 'date2timestamp.date_to_timestamp',
+    'beachball.BeachballCache.beach': 'beachball.obspy_beach',
+}
+
+
+#-------------------------------------------------------------------------------
+def _measure(setup, run, n, min_time, conn):
+    '''
+    Run in a child process: best time of the runs of at least min_time
+    seconds in total, and peak memory added by the runs (MB)
+    '''
+    tmpdir = tempfile.mkdtemp(prefix='benchmark-')
+    try:
+        state = setup(n, tmpdir)
+        rss0 = reset_peak_rss()
+        # warm up (imports, caches of numpy)
+        run(state)
+
+        # fast runs are timed by batches of at least 1 ms, as timeit does
+        number = 1
+        while True:
+            t = timer()
+            for i in range(number):
+                run(state)
+            t = timer() - t
+            if t >= 1.e-3:
+                break
+            number *= 10
+
+        times = [t / number]
+        start = timer()
+        while timer() - start < min_time and len(times) < 1000:
+            t = timer()
+            for i in range(number):
+                run(state)
+            times.append((timer() - t) / number)
+        conn.send({'time': min(times), 'repeat': len(times), 'number': number,
+                   'peak_mb': peak_rss() - rss0})
+    except Exception as e:
+        conn.send({'error': '{}: {}'.format(type(e).__name__, e)})
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        conn.close()
+
+
+def measure(setup, run, n, min_time=0.2):
+    parent, child = multiprocessing.Pipe(duplex=False)
+    p = multiprocessing.Process(target=_measure, args=(setup, run, n, min_time, child))
+    p.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {'error': 'process died (exit code {})'.format(p.exitcode)}
+    p.join()
+    return result
+
+
+def _git_commit():
+    try:
+        with open(os.devnull, 'w') as null:
+            return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                           cwd=os.path.dirname(os.path.abspath(__file__)),
+                                           stderr=null).strip().decode()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, reference, tolerance=0.1):
+    '''
+    Print the throughput of the results against the reference results
+    :return: number of benchmarks slower than the reference by more than tolerance
+    '''
+    ref = dict(((r['name'], r['n']), r) for r in reference['results'] if 'rate' in r)
+    print '\n{:40s} {:>8s} {:>12s} {:>12s} {:>7s}'.format(
+        'compared to ' + str(reference['meta'].get('commit')), 'events', 'before/s', 'after/s', 'ratio')
+    slower = 0
+    for r in results:
+        old = ref.get((r['name'], r['n']))
+        if old is None or 'rate' not in r:
+            continue
+        ratio = r['rate'] / old['rate']
+        flag = ''
+        if ratio < 1. / (1. + tolerance):
+            flag = ' slower'
+            slower += 1
+        print '{:40s} {:8d} {:12.4g} {:12.4g} {:7.2f}{}'.format(
+            r['name'], r['n'], old['rate'], r['rate'], ratio, flag)
+    return slower
+
+
+def speedups(results):
+    '''
+    Print the throughput of the benchmarks against their baseline (see
+    BASELINES), for the sizes run for both
+    '''
+    rates = dict(((r['name'], r['n']), r['rate']) for r in results if 'rate' in r)
+    rows = [(r['name'], r['n'], rates[(BASELINES[r['name']], r['n'])], r['rate'])
+            for r in results
+            if 'rate' in r and (BASELINES.get(r['name']), r['n']) in rates]
+    if not rows:
+        return
+    print '\n{:40s} {:>8s} {:>12s} {:>12s} {:>9s}'.format(
+        'against the baseline', 'events', 'baseline/s', 'events/s', 'speedup')
+    for name, n, baseline, rate in rows:
+        print '{:40s} {:8d} {:12.4g} {:12.4g} {:9.1f}'.format(name, n, baseline, rate, rate / baseline)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(prog='benchmarks.py',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     description='Time the numeric paths of the scripts on synthetic data',
+                                     epilog='''example:
+./benchmarks.py --output before.json
+./benchmarks.py magnitude catalog --compare before.json''')
+    parser.add_argument('patterns', nargs='*',
+                        help='only run the benchmarks whose name contains one of these strings')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1, 100, 10**4, 10**6],
+                        help='numbers of events (default: %(default)s)')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='minimum duration of the runs of a benchmark, in seconds (default: %(default)s)')
+    parser.add_argument('--output', help='save the results in a json file')
+    parser.add_argument('--compare', metavar='JSON',
+                        help='compare the throughput with the results of a previous run')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative slowdown reported by --compare (default: %(default)s)')
+    parser.add_argument('--list', action='store_true', help='list the benchmarks and exit')
+    args = parser.parse_args()
+
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    # a selected benchmark runs with its baseline
+    selected = set(b[0] for b in BENCHMARKS
+                   if not args.patterns or any(p in b[0] for p in args.patterns))
+    selected.update([BASELINES[name] for name in selected if name in BASELINES])
+    benchmarks = [b for b in BENCHMARKS if b[0] in selected]
+    if args.list:
+        for name, _, _, max_n in benchmarks:
+            print '{:40s} up to {} events'.format(name, max_n)
+        return
+
+    meta = {'commit': _git_commit(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'min_time': args.min_time}
+
+    print '{:40s} {:>8s} {:>12s} {:>12s} {:>9s}'.format('benchmark', 'events', 'time (s)', 'events/s', 'peak (MB)')
+    results = []
+    for name, setup, run, max_n in benchmarks:
+        for n in sorted(args.sizes):
+            if n > max_n:
+                continue
+            r = measure(setup, run, n, args.min_time)
+            r.update(name=name, n=n)
+            if 'error' in r:
+                print '{:40s} {:8d} {}'.format(name, n, r['error'])
+            else:
+                r['rate'] = n / r['time'] if r['time'] > 0 else float('inf')
+                print '{:40s} {:8d} {:12.4g} {:12.4g} {:9.1f}'.format(name, n, r['time'], r['rate'], r['peak_mb'])
+            sys.stdout.flush()
+            results.append(r)
+
+    speedups(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=1)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            reference = json.load(f)
+        compare(results, reference, args.tolerance)
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,480 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Streaming reader for moment tensor catalogs from the Global CMT project.
+
+Two formats are understood:
+
+ - CMTSOLUTION (one or several concatenated events, 13 lines per event):
+
+PDEQ2014 10 15 11 16 34.00  64.4500  -18.0400  10.0 0.0 5.1 ICELAND
+event name:     201410151116A
+time shift:      8.2300
+half duration:   1.5000
+latitude:       64.6000
+longitude:     -17.3000
+depth:          12.0000
+Mrr:      -3.260000e+24
+Mtt:       1.960000e+24
+Mpp:       1.300000e+24
+Mrt:      -6.790000e+22
+Mrp:      -6.030000e+23
+Mtp:      -2.030000e+23
+
+ - NDK (5 lines per event), the format of the full GCMT catalog dumps.
+
+The file is read line by line and the events are returned by chunks of
+fixed size in a structured array (see CATALOG_DTYPE), so that a multi-gigabyte
+catalog never has to be held in memory.
+
+The magnitude is the largest of mb and Ms given on the hypocenter line.
+The moment tensor is stored as in the NDK format: the six components
+(Mrr,Mtt,Mpp,Mrt,Mrp,Mtp) are mantissas, the full tensor in dyne.cm is
+mt * 10**exponent.
+
+usage:
+
+import catalog
+for events in catalog.read_catalog('jan76_dec13.ndk'):
+    print events['event'], events['mt']
+'''
+
+import numpy as np
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+
+
+CATALOG_DTYPE = np.dtype([('event', 'S16'),
+                          ('time', 'datetime64[ms]'),
+                          ('lat', 'f8'),
+                          ('lon', 'f8'),
+                          ('depth', 'f8'),
+                          ('mag', 'f8'),
+                          ('exponent', 'i2'),
+                          ('mt', 'f8', (6,))])
+
+# order of the moment tensor components in the CMTSOLUTION format
+MT_KEYS = ('Mrr', 'Mtt', 'Mpp', 'Mrt', 'Mrp', 'Mtp')
+
+# bump when the layout of the cached arrays changes
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME',
+                                                os.path.join(os.path.expanduser('~'), '.cache')),
+                                 'tools')
+
+# date at the start of the hypocenter line of a CMTSOLUTION event, after the
+# hypocenter catalog ("PDE 2014 10 15", "PDEQ2014 10 15", " PDE 2014 10 15")
+_CMT_DATE = re.compile(r'\d{4}\s+\d+\s+\d+\s')
+
+
+def _to_array(events, full_tensor=False):
+    '''
+    Convert a list of event tuples (event, date, seconds of the day, lat, lon,
+    depth, mag, exponent, 6 components) into a CATALOG_DTYPE array.
+    If full_tensor is True, the components are full values and the exponent is
+    estimated from the largest component.
+    '''
+    cat = np.empty(len(events), dtype=CATALOG_DTYPE)
+    if not events:
+        return cat
+
+    cols = list(zip(*events))
+    cat['event'] = cols[0]
+    cat['time'] = (np.array(cols[1], dtype='datetime64[D]').astype('datetime64[ms]') +
+                   np.round(np.array(cols[2]) * 1000.).astype('timedelta64[ms]'))
+    cat['lat'] = cols[3]
+    cat['lon'] = cols[4]
+    cat['depth'] = cols[5]
+    cat['mag'] = cols[6]
+
+    mt = np.array(cols[8:], dtype=float).T
+    if full_tensor:
+        m_max = np.abs(mt).max(axis=1)
+        exponent = np.zeros(len(events), dtype=int)
+        nonzero = m_max > 0
+        exponent[nonzero] = np.floor(np.log10(m_max[nonzero]))
+        cat['exponent'] = exponent
+        cat['mt'] = mt / 10.**exponent[:, np.newaxis]
+    else:
+        cat['exponent'] = cols[7]
+        cat['mt'] = mt
+    return cat
+
+
+def _seconds(hour, minute, sec):
+    return 3600. * float(hour) + 60. * float(minute) + float(sec)
+
+
+def _parse_cmtsolution_event(lines):
+    '''
+    Parse the 13 lines of an event at the CMTSOLUTION format
+    '''
+    # the hypocenter catalog is sometimes glued to the year (PDEQ2014,
+    # PDEW2014...) and the line sometimes starts with a space
+    date = _CMT_DATE.search(lines[0])
+    if date is None:
+        raise ValueError("invalid CMTSOLUTION hypocenter line: {!r}".format(lines[0]))
+    col = lines[0][date.start():].split()
+    date = '{:04d}-{:02d}-{:02d}'.format(int(col[0]), int(col[1]), int(col[2]))
+    sec = _seconds(col[3], col[4], col[5])
+    mag = max(float(col[9]), float(col[10]))
+
+    cmt_dict = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(':')
+        cmt_dict[key.strip()] = value.strip()
+
+    return ((cmt_dict['event name'], date, sec,
+             float(cmt_dict['latitude']),
+             float(cmt_dict['longitude']),
+             float(cmt_dict['depth']),
+             mag, 0) +
+            tuple(float(cmt_dict[k]) for k in MT_KEYS))
+
+
+def _parse_ndk_event(lines):
+    '''
+    Parse the 5 lines of an event at the NDK format
+    '''
+    # hypocenter catalog (4 characters), date, time, lat, lon, depth, mb, MS
+    col = lines[0][4:].split()
+    date = col[0].replace('/', '-')
+    hour, minute, sec = col[1].split(':')
+    mag = max(float(col[5]), float(col[6]))
+
+    event = lines[1][:16].strip()
+
+    # centroid: time shift and location
+    col = lines[2].split()
+    lat = float(col[3])
+    lon = float(col[5])
+    depth = float(col[7])
+
+    col = lines[3].split()
+    exponent = int(col[0])
+    mt = tuple(float(v) for v in col[1:12:2])
+
+    return (event, date, _seconds(hour, minute, sec),
+            lat, lon, depth, mag, exponent) + mt
+
+
+def guess_format(filename):
+    '''
+    Return 'cmt' for a CMTSOLUTION file, 'ndk' for a NDK file
+    '''
+    with open(filename, 'r') as f:
+        lines = []
+        for line in f:
+            if line.strip():
+                lines.append(line)
+            if len(lines) == 2:
+                break
+
+    if len(lines) == 2 and lines[1].lstrip().startswith('event name'):
+        return 'cmt'
+    return 'ndk'
+
+
+def read_catalog(filename, chunksize=10000, fmt=None):
+    '''
+    Generator reading a CMTSOLUTION or NDK catalog by chunks of events
+    :param filename: catalog file
+    :param chunksize: maximum number of events per chunk
+    :type chunksize: int
+    :param fmt: 'cmt' or 'ndk', guessed from the file content if None
+    :return: yield arrays of dtype CATALOG_DTYPE
+    '''
+    if fmt is None:
+        fmt = guess_format(filename)
+
+    if fmt == 'cmt':
+        parse_event = _parse_cmtsolution_event
+        nlines = 13
+    elif fmt == 'ndk':
+        parse_event = _parse_ndk_event
+        nlines = 5
+    else:
+        raise ValueError("unknown catalog format: {}".format(fmt))
+
+    events = []
+    lines = []
+    with open(filename, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            lines.append(line.rstrip('\r\n'))
+            if len(lines) == nlines:
+                events.append(parse_event(lines))
+                lines = []
+                if len(events) == chunksize:
+                    yield _to_array(events, full_tensor=(fmt == 'cmt'))
+                    events = []
+
+    if lines:
+        raise ValueError("{}: truncated event at the end of the file".format(filename))
+    if events:
+        yield _to_array(events, full_tensor=(fmt == 'cmt'))
+
+
+def load_catalog(filename, chunksize=10000, fmt=None):
+    '''
+    Read a whole catalog in a single array of dtype CATALOG_DTYPE
+    '''
+    chunks = list(read_catalog(filename, chunksize=chunksize, fmt=fmt))
+    if not chunks:
+        return np.empty(0, dtype=CATALOG_DTYPE)
+    return np.concatenate(chunks)
+
+
+def moment_tensors(cat):
+    '''
+    Full moment tensors (dyne.cm) of a catalog array, shape (N, 6)
+    '''
+    return cat['mt'] * 10.**cat['exponent'][:, np.newaxis]
+
+
+# columns of the focal mechanism tables: moment tensor, then optionally
+# longitude, latitude, depth and magnitude
+FOC_MEC_COLUMNS = MT_KEYS + ('lon', 'lat', 'depth', 'Mw')
+
+# whitespace characters, by byte value
+_WHITESPACE = np.zeros(256, dtype=bool)
+_WHITESPACE[[9, 10, 11, 12, 13, 32]] = True
+
+
+def _fields_per_line(text, nlines):
+    '''
+    number of whitespace separated fields of each of the nlines lines of
+    text (ending with a newline), counted without splitting the lines
+    '''
+    buf = np.frombuffer(text, dtype=np.uint8)
+    space = _WHITESPACE[buf]
+    # first character of each field
+    starts = np.flatnonzero(~space[1:] & space[:-1]) + 1
+    if len(buf) and not space[0]:
+        starts = np.concatenate(([0], starts))
+    newlines = np.flatnonzero(buf == 10)
+    return np.bincount(np.searchsorted(newlines, starts), minlength=nlines)[:nlines]
+
+
+def read_foc_mec(filename, chunksize=65536, columns=None):
+    '''
+    Generator reading a table of focal mechanisms by chunks of lines: one
+    mechanism per line, the 6 components of the moment tensor (Mrr Mtt Mpp
+    Mrt Mrp Mtp) followed by up to 4 optional columns (lon lat depth Mw, see
+    FOC_MEC_COLUMNS). Empty lines and lines starting with # are skipped.
+    The lines of a chunk are converted at once by np.fromstring, without
+    Python objects per value, after checking the number of fields of each
+    line.
+    :param filename: text file
+    :param chunksize: maximum number of lines per chunk
+    :param columns: allowed numbers of columns, 6 to 10 by default (e.g.
+                    (3, 6) for the nodal planes or moment tensors of
+                    plot_beachball.py)
+    :return: yield float arrays of shape (n, ncols), the number of columns
+             is the one of the first line, the same for all lines
+    '''
+    if columns is None:
+        columns = range(6, len(FOC_MEC_COLUMNS) + 1)
+    ncols = None
+    lineno = 0
+    with open(filename, 'r') as f:
+        while True:
+            lines = list(itertools.islice(f, chunksize))
+            if not lines:
+                break
+            chunk = lines
+            first = lineno + 1
+            lineno += len(lines)
+            lines = [line for line in lines
+                     if line.strip() and not line.lstrip().startswith('#')]
+            if not lines:
+                continue
+            if not lines[-1].endswith('\n'):
+                lines[-1] += '\n'
+            if ncols is None:
+                ncols = len(lines[0].split())
+                if ncols not in columns:
+                    raise ValueError("{}: expected {} or {} columns, got {}".format(
+                        filename, ', '.join(str(n) for n in columns[:-1]), columns[-1], ncols))
+
+            text = ''.join(lines)
+            values = None
+            if (_fields_per_line(text, len(lines)) == ncols).all():
+                values = np.fromstring(text, sep=' ')
+            if values is None or values.size != len(lines) * ncols:
+                # find the faulty line for the message
+                for n, line in enumerate(chunk, first):
+                    if not line.strip() or line.lstrip().startswith('#'):
+                        continue
+                    try:
+                        ok = len([float(v) for v in line.split()]) == ncols
+                    except ValueError:
+                        ok = False
+                    if not ok:
+                        break
+                raise ValueError("{}: line {}: expected {} numbers, got: {}".format(
+                    filename, n, ncols, line.strip()))
+            yield values.reshape(-1, ncols)
+
+
+def load_foc_mec(filename, chunksize=65536, columns=None):
+    '''
+    Read a whole table of focal mechanisms (see read_foc_mec)
+    :return: float array of shape (N, ncols), the moment tensors are the
+             first 6 columns
+    '''
+    chunks = list(read_foc_mec(filename, chunksize=chunksize, columns=columns))
+    if not chunks:
+        return np.empty((0, 6 if columns is None else min(columns)))
+    return np.concatenate(chunks)
+
+
+def _sha1(filename, blocksize=1 << 20):
+    h = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        block = f.read(blocksize)
+        while block:
+            h.update(block)
+            block = f.read(blocksize)
+    return h.hexdigest()
+
+
+class NpyWriter():
+    '''
+    Write a .npy file by appending arrays, without holding them all in
+    memory: the rows are first streamed in a raw file, the header is written
+    by close(), once the number of rows is known.
+    '''
+
+    def __init__(self, path, dtype):
+        '''
+        :param path: .npy file
+        :param dtype: dtype of the rows (can be a subarray dtype, e.g.
+                      ('f8', (6,)) for an (N, 6) array)
+        '''
+        self.path = path
+        self._template = np.empty(0, dtype=dtype)
+        self.nrows = 0
+        self._raw = open(path + '.raw', 'wb')
+
+    def append(self, chunk):
+        template = self._template
+        chunk = np.ascontiguousarray(chunk, dtype=template.dtype)
+        if chunk.shape[1:] != template.shape[1:]:
+            raise ValueError("chunk of shape {} does not match {}".format(chunk.shape, template.shape))
+        self._raw.write(chunk.tobytes())
+        self.nrows += len(chunk)
+
+    def close(self):
+        if self._raw is None:
+            return
+        self._raw.close()
+        self._raw = None
+        raw = self.path + '.raw'
+        header = np.lib.format.header_data_from_array_1_0(self._template)
+        header['shape'] = (self.nrows,) + self._template.shape[1:]
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f, open(raw, 'rb') as fraw:
+            np.lib.format.write_array_header_1_0(f, header)
+            shutil.copyfileobj(fraw, f, 1 << 20)
+        os.remove(raw)
+        os.rename(tmp, self.path)
+
+
+def _write_npy(path, chunks, dtype):
+    '''
+    Write a sequence of arrays into a single .npy file (see NpyWriter)
+    '''
+    writer = NpyWriter(path, dtype)
+    for chunk in chunks:
+        writer.append(chunk)
+    writer.close()
+
+
+def cached_array(filename, read_chunks, dtype, tag='', cache_dir=None):
+    '''
+    Return the array parsed from a text file, through a binary cache.
+    The first call parses the file with read_chunks and stores the result
+    in a .npy file, the next calls open it with np.memmap (read only).
+    The cache is rebuilt when the size of the source file changes, or when its
+    modification time changes and its content (sha1) is not the same.
+    :param filename: source text file
+    :param read_chunks: function(filename) returning an iterable of arrays
+    :param dtype: dtype of the rows returned by read_chunks (can be a
+                  subarray dtype, e.g. ('f8', (6,)) for an (N, 6) array)
+    :param tag: distinguish several caches of the same source file
+    :param cache_dir: directory of the cache files (DEFAULT_CACHE_DIR if None)
+    :return: read only np.memmap
+    '''
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+
+    source = os.path.abspath(filename)
+    key = hashlib.sha1('{}:{}'.format(source, tag).encode('utf-8')).hexdigest()[:16]
+    base = os.path.join(cache_dir, '{}-{}'.format(os.path.basename(source), key))
+    npy_file = base + '.npy'
+    meta_file = base + '.json'
+
+    st = os.stat(source)
+    meta = None
+    if os.path.exists(npy_file) and os.path.exists(meta_file):
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+
+    valid = (meta is not None and
+             meta.get('version') == CACHE_VERSION and
+             meta.get('size') == st.st_size)
+    if valid and meta.get('mtime') != st.st_mtime:
+        # touched but maybe not modified
+        valid = meta.get('sha1') == _sha1(source)
+        if valid:
+            meta['mtime'] = st.st_mtime
+            with open(meta_file, 'w') as f:
+                json.dump(meta, f)
+
+    if not valid:
+        _write_npy(npy_file, read_chunks(source), dtype)
+        meta = {'version': CACHE_VERSION,
+                'source': source,
+                'size': st.st_size,
+                'mtime': st.st_mtime,
+                'sha1': _sha1(source)}
+        with open(meta_file, 'w') as f:
+            json.dump(meta, f)
+
+    return np.load(npy_file, mmap_mode='r')
+
+
+def open_catalog(filename, fmt=None, cache_dir=None):
+    '''
+    Same as load_catalog, through the binary cache (see cached_array)
+    '''
+    if fmt is None:
+        fmt = guess_format(filename)
+    return cached_array(filename,
+                        lambda f: read_catalog(f, fmt=fmt),
+                        CATALOG_DTYPE, tag=fmt, cache_dir=cache_dir)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(prog='catalog.py',
+                                     description='Read a CMTSOLUTION or NDK catalog and print one line per event')
+    parser.add_argument('catalog', help='catalog file (CMTSOLUTION or NDK)')
+    parser.add_argument('--format', choices=('cmt', 'ndk'), default=None,
+                        help='format of the catalog (guessed by default)')
+    args = parser.parse_args()
+
+    for events in read_catalog(args.catalog, fmt=args.format):
+        for ev in events:
+            print ev['event'], ev['time'], ev['lat'], ev['lon'], ev['depth'], \
+                ev['mag'], ev['exponent'], ' '.join('{:.3f}'.format(m) for m in ev['mt'])
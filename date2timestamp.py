@@ -1,14 +1,38 @@
-#/usr/bin/env python
+#!/usr/bin/env python
 
 import time
 import datetime
 import argparse
 
+import numpy as np
+
 
 def date_to_timestamp(date):
     return time.mktime(datetime.datetime.strptime(date, "%Y-%m-%dT%H:%M:%S").timetuple())
 
 
+def dates_to_timestamps(dates, unit='us'):
+    '''
+    Convert ISO dates to timestamps, in UTC (date_to_timestamp uses the local time)
+    :param dates: dates yyyy-mm-ddThh:mm:ss[.ffffff] (or with a space instead
+                  of the T, or only yyyy-mm-dd)
+    :type dates: str or array-like of str
+    :param unit: precision of the parsing ('s', 'ms', 'us' or 'ns'),
+                 finer digits are truncated
+    :return: seconds since 1970-01-01T00:00:00 UTC
+    :type: float or array
+    '''
+    t = np.asarray(dates, dtype='datetime64[{}]'.format(unit))
+    ticks = np.timedelta64(1, 's') // np.timedelta64(1, unit)
+    # integer ticks first, to keep the sub-second digits of recent dates
+    seconds = t.view('int64') // ticks
+    frac = t.view('int64') - seconds * ticks
+    ts = seconds + frac / float(ticks)
+    if ts.ndim == 0:
+        return float(ts)
+    return ts
+
+
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="")
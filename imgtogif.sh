@@ -35,7 +35,10 @@ echo "Output file (gif): " ${outfile}
 #echo $inputfiles2
 
 #convert -delay 50 $inputfiles -loop 0 $outfile
-convert -delay 50 $inputfiles -resize 603x693 -gravity center +repage -loop 0 $outfile
+#convert -delay 50 $inputfiles -resize 603x693 -gravity center +repage -loop 0 $outfile
+# animation.py streams the frames (convert loads all of them in memory),
+# it also writes .mp4 / .webm with ffmpeg
+"$(dirname "$0")"/animation.py "$1" $outfile --size 603x693 --delay 50
 if [ $? -eq  "0" ] ;then 
     echo "gif created : "$outfile
     #eog ${outfile}
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Kagan angle between focal mechanisms: the smallest rotation which brings
+the principal axes of a double couple onto the axes of another one
+(Kagan, 1991), from 0 to 120 degrees.
+
+The orientation of a mechanism is stored as a unit quaternion (rotation
+from the reference frame to the frame of the T, B=P^T, P axes). For the
+relative rotation q = conj(q1) q2, the four rotations which leave a double
+couple unchanged (identity and 180 degrees around T, B, P) permute the
+components of q, so that:
+
+    kagan angle = 2 arccos(max(|q0|, |q1|, |q2|, |q3|))
+
+Each component is a bilinear form of q1 and q2, so the angles between two
+sets of mechanisms are computed with 4 matrix products (kagan_blocks,
+by blocks to bound the memory). KaganIndex finds the mechanisms within a
+given angle of another one without comparing all the pairs: the 8
+quaternions equivalent to each mechanism (the 4 rotations above, and -q)
+are kept in a kd-tree of R^4, where a kagan angle below X is a euclidean
+distance below sqrt(2 - 2 cos(X/2)).
+
+usage:
+
+from kagan import sdr_quaternions, kagan_angle, kagan_pairs, KaganIndex
+q = sdr_quaternions(strike, dip, rake)
+print kagan_angle(q[0], q[1])
+i, j, angle = kagan_pairs(q, 20.)
+index = KaganIndex(q)
+idx, angle = index.query(q[0], 15.)
+
+./kagan.py --np 321 69 -173 --np 200 26 56
+./kagan.py -c jan76_dec13.ndk --max-angle 10
+'''
+
+import argparse
+import sys
+
+import numpy as np
+
+from catalog import load_catalog, moment_tensors
+from moment_tensor_dec import mt_matrices, _axes, _fault_vectors
+
+
+# components of conj(a) b = (a^T M_k b), k = 0..3, a and b as (w, x, y, z)
+_PRODUCT = np.array([[[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]],
+                     [[0, 1, 0, 0], [-1, 0, 0, 0], [0, 0, 0, -1], [0, 0, 1, 0]],
+                     [[0, 0, 1, 0], [0, 0, 0, 1], [-1, 0, 0, 0], [0, -1, 0, 0]],
+                     [[0, 0, 0, 1], [0, 0, -1, 0], [0, 1, 0, 0], [-1, 0, 0, 0]]],
+                    dtype=float)
+
+
+def rotation_quaternions(r):
+    '''
+    Unit quaternions (w, x, y, z) of rotation matrices
+    :param r: rotation matrices
+    :type r: array of shape (N, 3, 3)
+    :return: array of shape (N, 4), with w >= 0
+    '''
+    r = np.asarray(r, dtype=float)
+    # 4 w^2, 4 x^2, 4 y^2, 4 z^2: the largest gives the best conditioned formula
+    diag = np.column_stack((1. + r[:, 0, 0] + r[:, 1, 1] + r[:, 2, 2],
+                            1. + r[:, 0, 0] - r[:, 1, 1] - r[:, 2, 2],
+                            1. - r[:, 0, 0] + r[:, 1, 1] - r[:, 2, 2],
+                            1. - r[:, 0, 0] - r[:, 1, 1] + r[:, 2, 2]))
+    k = diag.argmax(axis=1)
+    m = diag[np.arange(len(r)), k]
+    s = 2. * np.sqrt(np.maximum(m, 1.e-300))
+
+    q = np.empty((len(r), 4))
+    # off-diagonal sums and differences
+    d21 = r[:, 2, 1] - r[:, 1, 2]
+    d02 = r[:, 0, 2] - r[:, 2, 0]
+    d10 = r[:, 1, 0] - r[:, 0, 1]
+    s01 = r[:, 0, 1] + r[:, 1, 0]
+    s02 = r[:, 0, 2] + r[:, 2, 0]
+    s12 = r[:, 1, 2] + r[:, 2, 1]
+    for i, cols in enumerate(((m, d21, d02, d10),
+                              (d21, m, s01, s02),
+                              (d02, s01, m, s12),
+                              (d10, s02, s12, m))):
+        sel = k == i
+        q[sel] = np.column_stack([c[sel] for c in cols]) / s[sel, np.newaxis]
+
+    # one of q and -q
+    q *= np.where(q[:, 0] < 0, -1., 1.)[:, np.newaxis]
+    return q / np.sqrt((q**2).sum(axis=1))[:, np.newaxis]
+
+
+def _frame_quaternions(t, p):
+    '''
+    quaternions of the frames (T, P^T, P) from the T and P axes (N, 3),
+    in (r, t, p)
+    '''
+    b = np.cross(p, t)
+    return rotation_quaternions(np.stack((t, b, p), axis=2))
+
+
+def quaternions(mt):
+    '''
+    Orientation of the double couple of N moment tensors (from their T and
+    P axes, the non double couple part is ignored)
+    :param mt: moment tensors, one per row (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp)
+    :type mt: array-like of shape (N, 6)
+    :return: unit quaternions, array of shape (N, 4)
+    '''
+    _, vec = _axes(mt_matrices(mt))
+    return _frame_quaternions(vec[:, :, 0], vec[:, :, 2])
+
+
+def sdr_quaternions(strike, dip, rake):
+    '''
+    Orientation of N double couples given by a nodal plane
+    :param strike, dip, rake: angles of the nodal planes in degrees
+    :type strike, dip, rake: float or array-like (broadcast together)
+    :return: unit quaternions, array of shape (N, 4)
+    '''
+    strike, dip, rake = [np.ravel(a) for a in
+                         np.broadcast_arrays(np.asarray(strike, dtype=float),
+                                             np.asarray(dip, dtype=float),
+                                             np.asarray(rake, dtype=float))]
+    normal, slip = _fault_vectors(strike, dip, rake)
+    # (north, east, down) -> (r, t, p), the frame of the moment tensors
+    ned_to_rtp = np.array([[0., 0., -1.], [-1., 0., 0.], [0., 1., 0.]])
+    t = np.dot(ned_to_rtp, normal + slip).T / np.sqrt(2.)
+    p = np.dot(ned_to_rtp, normal - slip).T / np.sqrt(2.)
+    return _frame_quaternions(t, p)
+
+
+def _angle(cos_half):
+    return 2. * np.degrees(np.arccos(np.clip(cos_half, 0., 1.)))
+
+
+def kagan_angle(q1, q2):
+    '''
+    Kagan angle between mechanisms, element by element
+    :param q1, q2: quaternions (see quaternions and sdr_quaternions)
+    :type q1, q2: arrays of shape (..., 4) broadcast together
+    :return: angles in degrees (0 to 120)
+    '''
+    q1 = np.asarray(q1, dtype=float)
+    q2 = np.asarray(q2, dtype=float)
+    c = np.abs(np.einsum('...i,kij,...j->...k', q1, _PRODUCT, q2)).max(axis=-1)
+    return _angle(c)
+
+
+def kagan_blocks(q1, q2=None, blocksize=2048):
+    '''
+    Generator of the Kagan angles between all the mechanisms of q1 and all
+    the mechanisms of q2 (q1 itself if None), by blocks of at most
+    blocksize x blocksize angles
+    :return: yield (i, j, angles), angles[a, b] is the angle between
+             q1[i + a] and q2[j + b]
+    '''
+    q1 = np.asarray(q1, dtype=float).reshape(-1, 4)
+    q2 = q1 if q2 is None else np.asarray(q2, dtype=float).reshape(-1, 4)
+    # q1 M_k for the 4 components, (4, N1, 4)
+    a = np.einsum('ni,kij->knj', q1, _PRODUCT)
+
+    for i in range(0, len(q1), blocksize):
+        ai = a[:, i:i + blocksize]
+        for j in range(0, len(q2), blocksize):
+            qj = q2[j:j + blocksize]
+            c = np.abs(np.dot(ai[0], qj.T))
+            for k in range(1, 4):
+                np.maximum(c, np.abs(np.dot(ai[k], qj.T)), out=c)
+            yield i, j, _angle(c)
+
+
+def kagan_pairs(q, max_angle, blocksize=2048):
+    '''
+    All the pairs of mechanisms with a Kagan angle below max_angle, computed
+    by blocks (the memory is bounded by blocksize^2)
+    :param q: quaternions of N mechanisms, array of shape (N, 4)
+    :param max_angle: degrees
+    :return i, j, angle: indices (i < j) and angles of the pairs
+    '''
+    q = np.asarray(q, dtype=float).reshape(-1, 4)
+    pairs = []
+    for i0, j0, angles in kagan_blocks(q, q, blocksize):
+        if j0 + blocksize <= i0:
+            # block under the diagonal
+            continue
+        a, b = np.nonzero(angles <= max_angle)
+        sel = i0 + a < j0 + b
+        pairs.append((i0 + a[sel], j0 + b[sel], angles[a[sel], b[sel]]))
+    if not pairs:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0)
+    return tuple(np.concatenate(c) for c in zip(*pairs))
+
+
+def _radius(max_angle):
+    # |a - b|^2 = 2 - 2 a.b for unit vectors
+    return np.sqrt(max(2. - 2. * np.cos(np.radians(min(max_angle, 120.)) / 2.), 0.))
+
+
+class KaganIndex():
+
+    def __init__(self, q, leafsize=16):
+        '''
+        :param q: quaternions of the indexed mechanisms, array of shape (N, 4)
+        '''
+        from scipy.spatial import cKDTree
+
+        self.q = np.asarray(q, dtype=float).reshape(-1, 4)
+        n = len(self.q)
+        # the 8 quaternions of the same double couple: q, q x T, q x B, q x P
+        # and their opposites
+        equiv = np.einsum('ni,kij->knj', self.q, _PRODUCT.transpose(0, 2, 1))
+        equiv = np.concatenate((equiv, -equiv)).reshape(-1, 4)
+        self._owner = np.tile(np.arange(n), 8)
+        self._tree = cKDTree(equiv, leafsize=leafsize)
+
+    def __len__(self):
+        return len(self.q)
+
+    def query(self, q, max_angle):
+        '''
+        Mechanisms within max_angle degrees of a mechanism
+        :param q: quaternion of the mechanism (4,)
+        :return idx, angle: indices of the mechanisms and Kagan angles,
+                            sorted by angle
+        '''
+        q = np.asarray(q, dtype=float).reshape(4)
+        hits = self._tree.query_ball_point(q, _radius(max_angle) + 1.e-12)
+        idx = np.unique(self._owner[np.asarray(hits, dtype=int)])
+        angle = kagan_angle(q, self.q[idx])
+        keep = angle <= max_angle
+        order = np.argsort(angle[keep], kind='mergesort')
+        return idx[keep][order], angle[keep][order]
+
+    def iter_pairs(self, max_angle, chunksize=1024):
+        '''
+        Generator of the pairs of indexed mechanisms within max_angle degrees,
+        for chunksize mechanisms at a time (the memory is bounded by the
+        number of neighbours of a chunk)
+        :return: yield (i, j, angle), indices (i < j) and angles of the pairs
+        '''
+        n = len(self.q)
+        radius = _radius(max_angle) + 1.e-12
+        for i0 in range(0, n, chunksize):
+            hits = self._tree.query_ball_point(self.q[i0:i0 + chunksize], radius)
+            i = np.repeat(np.arange(i0, i0 + len(hits)), [len(h) for h in hits])
+            j = self._owner[np.fromiter((h for hit in hits for h in hit), dtype=int, count=len(i))]
+            # each pair once, even if found through several equivalent quaternions
+            keep = i < j
+            ij = np.unique(i[keep] * n + j[keep])
+            i, j = ij // n, ij % n
+            angle = kagan_angle(self.q[i], self.q[j])
+            keep = angle <= max_angle
+            yield i[keep], j[keep], angle[keep]
+
+    def query_pairs(self, max_angle):
+        '''
+        All the pairs of indexed mechanisms within max_angle degrees
+        :return i, j, angle: indices (i < j) and angles of the pairs
+        '''
+        pairs = list(self.iter_pairs(max_angle))
+        if not pairs:
+            return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0)
+        return tuple(np.concatenate(c) for c in zip(*pairs))
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(prog='kagan.py',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     description='Kagan angle between focal mechanisms',
+                                     epilog='''example:
+./kagan.py --np 321 69 -173 --np 200 26 56
+./kagan.py -c jan76_dec13.ndk --max-angle 10''')
+    group_input = parser.add_mutually_exclusive_group(required=True)
+    group_input.add_argument('--np', help='nodal plane (strike dip rake), given twice',
+                             nargs=3, type=float, action='append', metavar=('strike', 'dip', 'rake'))
+    group_input.add_argument('-c', '--cmtfile', help='catalog (CMTSOLUTION or NDK): print the pairs of events within --max-angle')
+    parser.add_argument('--max-angle', help='with -c, largest Kagan angle of the pairs (degrees). Default is %(default)s',
+                        type=float, default=10.)
+    args = parser.parse_args()
+
+    if args.np:
+        if len(args.np) != 2:
+            parser.error('--np must be given twice')
+        q = sdr_quaternions(*np.array(args.np).T)
+        print "Kagan angle: {:.2f}".format(kagan_angle(q[0], q[1]))
+        sys.exit()
+
+    cat = load_catalog(args.cmtfile)
+    q = quaternions(moment_tensors(cat))
+    for i, j, angle in KaganIndex(q).iter_pairs(args.max_angle):
+        for a, b, ang in zip(i, j, angle):
+            print cat['event'][a], cat['event'][b], '{:.2f}'.format(ang)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Conversions between seismic moment, moment magnitude and radiated energy.
+
+The functions work like numpy ufuncs: they accept scalars, lists or arrays
+(a scalar gives a float), and the result can be written in place in an
+array given with out=.
+
+The seismic moment can be given in N.m or in dyne.cm (1 N.m = 1e7 dyne.cm)
+with the unit argument. The defaults are the ones of the original scripts:
+moment2Mw and energy take M0 in dyne.cm, Mw2moment returns M0 in N.m.
+energy returns joules whatever the unit of M0.
+
+Both directions use Mw = 2/3 (log10 M0 - 9.1), M0 in N.m (Hanks & Kanamori,
+IASPEI standard), so that moment2Mw and Mw2moment are inverse of each other
+(the original scripts used -10.7 with M0 in dyne.cm and +9.0 with M0 in N.m).
+
+usage:
+
+from magnitude import moment2Mw, Mw2moment, energy
+mw = moment2Mw(m0_catalog, unit='N.m')
+m0 = Mw2moment(np.random.uniform(4, 8, 10**7))
+'''
+
+import numpy as np
+
+
+# factor to convert the seismic moment to dyne.cm
+UNITS = {'N.m': 1.e7, 'dyne.cm': 1.}
+
+# log10 of M0 in N.m for Mw = 0
+LOG_M0_MW0 = 9.1
+
+
+def _scale(unit):
+    try:
+        return UNITS[unit]
+    except KeyError:
+        raise ValueError("unknown unit for the seismic moment: {} (N.m or dyne.cm)".format(unit))
+
+
+def _result(out, value):
+    # a scalar for a scalar input, as the math functions
+    if out.ndim == 0 and np.ndim(value) == 0:
+        return float(out)
+    return out
+
+
+def moment2Mw(M0, out=None, unit='dyne.cm'):
+    '''
+    Convert seismic moment M0 to moment magnitude
+    :param M0: seismic moment
+    :type M0: float or array-like
+    :param out: optional output array
+    :param unit: unit of M0, 'dyne.cm' or 'N.m'
+    :return Mw: moment magnitude
+    :type Mw: float or array
+    '''
+    scale = _scale(unit) / UNITS['N.m']
+    out = np.log10(M0, out=out)
+    out += np.log10(scale) - LOG_M0_MW0
+    out *= 2./3.
+    return _result(out, M0)
+
+
+def Mw2moment(Mw, out=None, unit='N.m'):
+    '''
+    Convert moment magnitude Mw to seismic moment M0
+    :param Mw: moment magnitude
+    :type Mw: float or array-like
+    :param out: optional output array
+    :param unit: unit of M0, 'N.m' or 'dyne.cm'
+    :return M0: seismic moment
+    :type M0: float or array
+    '''
+    scale = UNITS['N.m'] / _scale(unit)
+    if out is None:
+        # an array even for a scalar: np.power needs one for out=
+        out = np.empty(np.shape(Mw))
+    np.multiply(Mw, 1.5, out=out)
+    out += LOG_M0_MW0 + np.log10(scale)
+    np.power(10.0, out, out=out)
+    return _result(out, Mw)
+
+
+def energy(M0, out=None, unit='dyne.cm'):
+    '''
+    Radiated seismic energy from the seismic moment: Es = 1.6e-5 M0, in
+    joules for M0 in N.m (in erg for M0 in dyne.cm)
+    :param M0: seismic moment
+    :type M0: float or array-like
+    :param out: optional output array
+    :param unit: unit of M0, 'dyne.cm' or 'N.m'
+    :return Es: energy in joules
+    :type Es: float or array
+    '''
+    out = np.multiply(M0, 1.6e-5 * _scale(unit) / UNITS['N.m'], out=out)
+    return _result(out, M0)
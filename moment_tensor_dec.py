@@ -25,6 +25,18 @@ Mtp:      -2.030000e+23
   using the -c (cmtfile) option:
    ./moment_tensor_dec.py -c iceland_Event-20141015.txt
 
+  the file can contain several concatenated events, at the CMTSOLUTION or at
+  the NDK format (e.g. the whole GCMT catalog).
+  With --cache, the parsed file is kept at a binary format and opened with
+  np.memmap by the next runs (rebuilt when the file changes).
+  With --store, the results are kept in a directory (see results_store) and
+  the next runs only decompose the events which are new or have changed:
+   ./moment_tensor_dec.py -c jan76_dec13.ndk --store gcmt_store
+  With --save, the full eigendecomposition of the events (see
+  eigen_decomposition) is written in a .npy file, for the scripts which need
+  the principal axes of the catalog:
+   ./moment_tensor_dec.py -c jan76_dec13.ndk --save gcmt_axes.npy
+
 
   or using the option -m (--moment_tensor)
    ./moment_tensor_dec.py -m -3.260000 1.960000 1.300000 -0.06790000 -0.6030000 -0.2030000
@@ -46,26 +58,8 @@ import numpy as np
 import argparse
 import sys
 
-
-
-
-#-------------------------------------------------------------------------------
-def parse_cmt(cmtfile):
-    cmt_dict = {}
-
-    with open(cmtfile, 'r') as fcmt :
-         cmt_lines = fcmt.readlines()
-
-         line = cmt_lines[0]
-         cmt_dict['mag'] = float(line.split()[10])
-         cmt_dict['pde_time'] = line[5:24]
-
-         for line in cmt_lines[1:]:
-             key   = line.rstrip().split(':')[0]
-             value = ' '.join(line.rstrip().split(':')[1:])
-             cmt_dict[key] = value
-         return cmt_dict
-
+from catalog import read_catalog, open_catalog, moment_tensors, DEFAULT_CACHE_DIR
+import timings
 
 
 def main(Mrr,Mtt,Mpp,Mrt,Mrp,Mtp):
@@ -120,6 +114,402 @@ def main(Mrr,Mtt,Mpp,Mrt,Mrp,Mtp):
     return iso_perc, clvd_perc,dc_perc
 
 
+def mt_matrices(mt):
+    '''
+    Build the stack of symmetric 3x3 moment tensors from their 6 components
+    :param mt: moment tensors, one per row (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp)
+    :type mt: array-like of shape (N, 6) or (6,)
+    :return m: moment tensors in matrix form
+    :type m: array of shape (N, 3, 3)
+    '''
+    mt = np.asarray(mt, dtype=float).reshape(-1, 6)
+
+    m = np.empty((mt.shape[0], 3, 3))
+    m[:, 0, 0] = mt[:, 0]
+    m[:, 1, 1] = mt[:, 1]
+    m[:, 2, 2] = mt[:, 2]
+    m[:, 0, 1] = m[:, 1, 0] = mt[:, 3]
+    m[:, 0, 2] = m[:, 2, 0] = mt[:, 4]
+    m[:, 1, 2] = m[:, 2, 1] = mt[:, 5]
+    return m
+
+
+def _percentages(eigval):
+    '''
+    ISO, CLVD and DC percentages from the eigenvalues (N, 3), as in main.
+    A tensor without deviatoric part (up to the error of the 0.3333 of main)
+    is 100 % ISO (-100 % for an implosion), 0 % CLVD and DC; the zero
+    tensor is 0 % of each.
+    '''
+    tr_m = eigval.sum(axis=1)
+
+    # valeurs absolues des valeurs propres deviatoriques, triees
+    eigval_dev_sort = np.abs(eigval - 0.3333*tr_m[:, np.newaxis])
+    eigval_dev_sort.sort(axis=1)
+
+    # pure isotropic tensors: 0.3333 leaves a deviatoric part of 1e-4 of
+    # the trace
+    dev_max = eigval_dev_sort[:, 2]
+    isotropic = dev_max <= 1.e-3 * np.abs(tr_m)
+    dev_max = np.where(isotropic, 1., dev_max)
+
+    eps = eigval_dev_sort[:, 0] / dev_max
+    iso_perc = 0.3333 * 100. * tr_m / dev_max
+    iso_perc[isotropic] = 100. * np.sign(tr_m[isotropic])
+    eps[isotropic] = 0.
+
+    clvd_perc = -2. * eps * (100. - iso_perc) + 0.
+    dc_perc = 100. - np.abs(iso_perc) - np.abs(clvd_perc)
+    dc_perc[isotropic] = 0.
+
+    return iso_perc, clvd_perc, dc_perc
+
+
+def decompose(mt):
+    '''
+    Batch version of main: ISO, CLVD and DC percentages of N moment tensors,
+    computed with a single stacked eigendecomposition and without printing.
+    A tensor without deviatoric part is +-100 % ISO, 0 % CLVD and DC (0 % of
+    each for the zero tensor).
+    :param mt: moment tensors, one per row (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp)
+    :type mt: array-like of shape (N, 6)
+    :return iso_perc, clvd_perc, dc_perc: percentages for each tensor
+    :type iso_perc, clvd_perc, dc_perc: arrays of shape (N,)
+    '''
+    # tenseurs symetriques : valeurs propres reelles
+    return _percentages(np.linalg.eigvalsh(mt_matrices(mt)))
+
+
+def _axes(m):
+    '''
+    eigenvalues and eigenvectors in the order T, N, P, vectors pointing downward
+    '''
+    # valeurs propres par ordre croissant : P, N, T
+    val, vec = np.linalg.eigh(m)
+    val = val[:, ::-1]
+    vec = vec[:, :, ::-1]
+
+    # axes pointing downward (r=up, t=south and p=east)
+    vec = vec * np.where(vec[:, 0, :] >= 0, -1., 1.)[:, np.newaxis, :]
+    return val, vec
+
+
+def _orientation(vec):
+    '''
+    plunge and azimuth (degrees) of the eigenvectors (columns of vec)
+    '''
+    plunge = np.degrees(np.arcsin(np.clip(-vec[:, 0, :], -1., 1.)))
+    azimuth = np.mod(np.degrees(np.arctan2(vec[:, 2, :], -vec[:, 1, :])), 360.)
+    return plunge, azimuth
+
+
+def principal_axes(mt):
+    '''
+    Principal axes T, N, P of N moment tensors, with the same conventions as
+    obspy's mt2axes (plunge downward, azimuth clockwise from north)
+    :param mt: moment tensors, one per row (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp)
+    :type mt: array-like of shape (N, 6)
+    :return val, plunge, azimuth: eigenvalues and orientation in degrees of
+                                  the axes, in the order T, N, P
+    :type val, plunge, azimuth: arrays of shape (N, 3)
+    '''
+    val, vec = _axes(mt_matrices(mt))
+    plunge, azimuth = _orientation(vec)
+
+    return val, plunge, azimuth
+
+
+# result of eigen_decomposition, the axes are in the order T, N, P
+DECOMPOSITION_DTYPE = np.dtype([('val', 'f8', (3,)),
+                                ('vec', 'f8', (3, 3)),
+                                ('plunge', 'f8', (3,)),
+                                ('azimuth', 'f8', (3,)),
+                                ('iso', 'f8'),
+                                ('clvd', 'f8'),
+                                ('dc', 'f8'),
+                                ('m0', 'f8')])
+
+
+def eigen_decomposition(mt, out=None):
+    '''
+    Everything computed from the eigendecomposition of N moment tensors, in a
+    single pass: eigenvalues and eigenvectors, orientation of the principal
+    axes (as principal_axes), ISO, CLVD and DC percentages (as decompose) and
+    scalar moment M0 = (T - P) / 2.
+    :param mt: moment tensors, one per row (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp)
+    :type mt: array-like of shape (N, 6)
+    :param out: optional output array of dtype DECOMPOSITION_DTYPE
+    :return: array of dtype DECOMPOSITION_DTYPE and shape (N,), vec[i][:, k]
+             is the axis k (T, N, P) of the tensor i in (r, t, p)
+    '''
+    m = mt_matrices(mt)
+    if out is None:
+        out = np.empty(len(m), dtype=DECOMPOSITION_DTYPE)
+
+    val, vec = _axes(m)
+    out['val'] = val
+    out['vec'] = vec
+    out['plunge'], out['azimuth'] = _orientation(vec)
+    out['iso'], out['clvd'], out['dc'] = _percentages(val)
+    out['m0'] = 0.5 * (val[:, 0] - val[:, 2])
+    return out
+
+
+# fault type classes of ternary_classify
+FAULT_TYPES = ('strike-slip', 'normal', 'reverse', 'odd')
+
+
+def ternary_classify(mt):
+    '''
+    Classification of N moment tensors after Frohlich & Apperson (1992):
+    strike-slip if the plunge of N > 60, normal if the plunge of P > 60,
+    reverse if the plunge of T > 50, odd otherwise.
+    The ternary coordinates are sin(plunge) of the N, P and T axes (vertices
+    strike-slip, normal and reverse of the ternary diagram), scaled to sum to 1.
+    :param mt: moment tensors, one per row (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp), or
+               their eigen_decomposition
+    :type mt: array-like of shape (N, 6), or array of DECOMPOSITION_DTYPE
+    :return plunge, bary, fault_type: plunges of T, N, P (N, 3), ternary
+                                      coordinates (N, 3) and index of the
+                                      class in FAULT_TYPES (N,)
+    '''
+    if getattr(mt, 'dtype', None) == DECOMPOSITION_DTYPE:
+        plunge = mt['plunge']
+    else:
+        _, plunge, _ = principal_axes(mt)
+
+    # ordre des sommets du diagramme : N (strike-slip), P (normal), T (reverse)
+    bary = np.sin(np.radians(plunge[:, [1, 2, 0]]))
+    bary /= bary.sum(axis=1)[:, np.newaxis]
+
+    fault_type = np.full(len(plunge), 3, dtype=np.int8)
+    fault_type[plunge[:, 0] > 50.] = 2
+    fault_type[plunge[:, 2] > 60.] = 1
+    fault_type[plunge[:, 1] > 60.] = 0
+
+    return plunge, bary, fault_type
+
+
+def sdrToMtArray(strike, dip, rake, out=None, blocksize=65536):
+    '''
+    Convert strike, dip, rake (degrees) to moment tensors (r=up, t=south and
+    p=east), for arrays of angles. Each trigonometric term is computed once,
+    by blocks of blocksize mechanisms.
+    :param strike, dip, rake: angles of the nodal plane in degrees
+    :type strike, dip, rake: float or array-like (broadcast together)
+    :param out: optional output buffer of shape (N, 6)
+    :return mt: moment tensors (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp) of unit scalar moment
+    :type mt: array of shape (N, 6)
+    '''
+    strike, dip, rake = [np.ravel(a) for a in
+                         np.broadcast_arrays(np.asarray(strike, dtype=float),
+                                             np.asarray(dip, dtype=float),
+                                             np.asarray(rake, dtype=float))]
+    n = strike.size
+
+    if out is None:
+        out = np.empty((n, 6))
+    elif out.shape != (n, 6):
+        raise ValueError("out must be of shape ({}, 6), not {}".format(n, out.shape))
+
+    is2 = 1/np.sqrt(2.0)
+
+    for i in range(0, n, blocksize):
+        sl = slice(i, i + blocksize)
+        s = np.radians(strike[sl])
+        d = np.radians(dip[sl])
+        r = np.radians(rake[sl])
+
+        sin_s = np.sin(s)
+        cos_s = np.cos(s)
+        sin_2s = 2. * sin_s * cos_s
+        cos_2s = cos_s**2 - sin_s**2
+        sin_d = np.sin(d)
+        cos_d = np.cos(d)
+        sin_2d = 2. * sin_d * cos_d
+        cos_2d = cos_d**2 - sin_d**2
+        sin_r = np.sin(r)
+        cos_r = np.cos(r)
+
+        sd_cr = sin_d * cos_r
+        s2d_sr = sin_2d * sin_r
+        cd_cr = cos_d * cos_r
+        c2d_sr = cos_2d * sin_r
+
+        o = out[sl]
+        o[:, 0] = is2 * s2d_sr
+        o[:, 1] = -is2 * (sd_cr * sin_2s + s2d_sr * sin_s**2)
+        o[:, 2] = is2 * (sd_cr * sin_2s - s2d_sr * cos_s**2)
+        o[:, 3] = -is2 * (cd_cr * cos_s + c2d_sr * sin_s)
+        o[:, 4] = is2 * (cd_cr * sin_s - c2d_sr * cos_s)
+        o[:, 5] = -is2 * (sd_cr * cos_2s + 0.5 * s2d_sr * sin_2s)
+
+    return out
+
+
+def aux_plane(strike, dip, rake):
+    '''
+    Strike, dip and rake of the auxiliary plane, for arrays of nodal planes.
+    Same formula as obspy's aux_plane (from bb.m by Andy Michael, Chen Ji and
+    Oliver Boyd), without importing obspy and matplotlib.
+    :param strike, dip, rake: angles of the nodal plane in degrees
+    :type strike, dip, rake: float or array-like (broadcast together)
+    :return strike, dip, rake: angles of the auxiliary plane, arrays of shape (N,)
+    '''
+    s1, d1, r1 = [np.ravel(a) for a in
+                  np.broadcast_arrays(np.asarray(strike, dtype=float),
+                                      np.asarray(dip, dtype=float),
+                                      np.asarray(rake, dtype=float))]
+
+    z = np.radians(s1 + 90.)
+    sin_z = np.sin(z)
+    cos_z = np.cos(z)
+    sin_d = np.sin(np.radians(d1))
+    cos_d = np.cos(np.radians(d1))
+    sin_r = np.sin(np.radians(r1))
+    cos_r = np.cos(np.radians(r1))
+
+    # slick vector in plane 1 (normal vector to plane 2)
+    sl1 = -cos_r * cos_z - sin_r * sin_z * cos_d
+    sl2 = cos_r * sin_z - sin_r * cos_z * cos_d
+    sl3 = sin_r * sin_d
+
+    # normale orientee vers le haut
+    up = np.where(sl3 < 0, -1., 1.)
+    n = up * sl2
+    e = up * sl1
+    u = up * sl3
+    strike2 = np.mod(np.degrees(np.arctan2(e, n)) - 90., 360.)
+    dip2 = np.degrees(np.arctan2(np.sqrt(n**2 + e**2), u))
+
+    # normal vector to plane 1 and strike vector of plane 2
+    n1 = sin_z * sin_d
+    n2 = cos_z * sin_d
+    h1 = -sl2
+    h2 = sl1
+    cos_rake = (h1 * n1 + h2 * n2) / np.sqrt(h1**2 + h2**2)
+    rake2 = np.degrees(np.arccos(np.clip(cos_rake, -1., 1.)))
+    rake2 = np.where(sl3 > 0, rake2, -rake2)
+
+    return strike2, dip2, rake2
+
+
+def _fault_vectors(strike, dip, rake):
+    '''
+    unit normal (upward) and slip vectors of nodal planes, (3, N) arrays in
+    north, east, down (Aki & Richards, 1980)
+    '''
+    phi = np.radians(strike)
+    delta = np.radians(dip)
+    lam = np.radians(rake)
+    sin_p, cos_p = np.sin(phi), np.cos(phi)
+    sin_d, cos_d = np.sin(delta), np.cos(delta)
+    sin_l, cos_l = np.sin(lam), np.cos(lam)
+
+    normal = np.array([-sin_d * sin_p, sin_d * cos_p, -cos_d])
+    slip = np.array([cos_l * cos_p + sin_l * cos_d * sin_p,
+                     cos_l * sin_p - sin_l * cos_d * cos_p,
+                     -sin_l * sin_d])
+    return normal, slip
+
+
+def _fault_angles(normal, slip):
+    '''
+    strike, dip, rake (degrees) of the planes of normal and slip vectors
+    (3, N) in north, east, down, the inverse of _fault_vectors
+    '''
+    # normale orientee vers le haut
+    up = np.where(normal[2] > 0, -1., 1.)
+    normal = normal * up
+    slip = slip * up
+
+    horizontal = np.hypot(normal[0], normal[1])
+    strike = np.degrees(np.arctan2(-normal[0], normal[1]))
+    # plan horizontal : strike arbitraire (0), le rake donne la direction du glissement
+    strike = np.where(horizontal > 1.e-12, strike, 0.)
+    dip = np.degrees(np.arctan2(horizontal, -normal[2]))
+
+    phi = np.radians(strike)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sin_l = np.where(horizontal > 1.e-12, -slip[2] / horizontal,
+                         slip[0] * np.sin(phi) - slip[1] * np.cos(phi))
+    cos_l = slip[0] * np.cos(phi) + slip[1] * np.sin(phi)
+    rake = np.degrees(np.arctan2(sin_l, cos_l))
+
+    return np.mod(strike, 360.), dip, rake
+
+
+def mt2planes(mt):
+    '''
+    Nodal planes of the double couple of N moment tensors (vectorized
+    version of obspy's mt2plane and aux_plane): the normal of the first
+    plane is along T - P, its slip along T + P.
+    :param mt: moment tensors, one per row (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp)
+    :type mt: array-like of shape (N, 6)
+    :return np1, np2: strike, dip, rake (degrees) of both planes
+    :type np1, np2: arrays of shape (N, 3)
+    '''
+    _, vec = _axes(mt_matrices(mt))
+    # (r, t, p) -> (north, east, down)
+    ned = np.array([-vec[:, 1, :], vec[:, 2, :], -vec[:, 0, :]])
+    t = ned[:, :, 0]
+    p = ned[:, :, 2]
+    normal = (t + p) / np.sqrt(2.)
+    slip = (t - p) / np.sqrt(2.)
+    return (np.column_stack(_fault_angles(normal, slip)),
+            np.column_stack(_fault_angles(slip, normal)))
+
+
+# result of focal_mechanisms, the axes are in the order T, N, P
+MECHANISM_DTYPE = np.dtype([('np1', 'f8', (3,)),
+                            ('np2', 'f8', (3,)),
+                            ('mt', 'f8', (6,)),
+                            ('val', 'f8', (3,)),
+                            ('plunge', 'f8', (3,)),
+                            ('azimuth', 'f8', (3,))])
+
+
+def focal_mechanisms(strike, dip, rake, out=None):
+    '''
+    Auxiliary planes, moment tensors and principal axes of N nodal planes,
+    in a single vectorized pass: the axes of a double couple are computed
+    from the normal and slip vectors, without eigendecomposition.
+    The results are the ones of aux_plane, sdrToMtArray and principal_axes.
+    :param strike, dip, rake: angles of the nodal planes in degrees
+    :type strike, dip, rake: float or array-like (broadcast together)
+    :param out: optional output array of dtype MECHANISM_DTYPE
+    :return: array of dtype MECHANISM_DTYPE and shape (N,): np1 and np2
+             (strike, dip, rake), mt (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp, with a
+             scalar moment of 1/sqrt(2), as sdrToMtArray), val, plunge and
+             azimuth of the axes T, N, P
+    '''
+    strike, dip, rake = [np.ravel(a) for a in
+                         np.broadcast_arrays(np.asarray(strike, dtype=float),
+                                             np.asarray(dip, dtype=float),
+                                             np.asarray(rake, dtype=float))]
+    if out is None:
+        out = np.empty(strike.size, dtype=MECHANISM_DTYPE)
+
+    normal, slip = _fault_vectors(strike, dip, rake)
+    out['np1'] = np.column_stack((strike, dip, rake))
+    out['np2'] = np.column_stack(aux_plane(strike, dip, rake))
+    out['mt'] = sdrToMtArray(strike, dip, rake)
+
+    # T, N, P from the normal and slip vectors, pointing downward
+    axes = np.array([(normal + slip) / np.sqrt(2.),
+                     np.cross(normal, slip, axis=0),
+                     (normal - slip) / np.sqrt(2.)])
+    axes *= np.where(axes[:, 2] <= 0, -1., 1.)[:, np.newaxis, :]
+    out['val'] = [1. / np.sqrt(2.), 0., -1. / np.sqrt(2.)]
+    # +0. avoids -0 for the horizontal axes
+    out['plunge'] = np.degrees(np.arcsin(np.clip(axes[:, 2], -1., 1.))).T + 0.
+    # azimuth 0 for the vertical axes (undefined, rounding noise otherwise)
+    vertical = np.hypot(axes[:, 0], axes[:, 1]) < 1.e-9
+    azimuth = np.mod(np.degrees(np.arctan2(axes[:, 1], axes[:, 0])), 360.)
+    out['azimuth'] = np.where(vertical, 0., azimuth).T
+    return out
+
+
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(prog='moment_tensor_dec.py',
@@ -131,23 +521,76 @@ if __name__ == "__main__":
 ./moment_tensor_dec.py -c CMTSOLUTION''')
     
     group_input = parser.add_mutually_exclusive_group(required=True)
-    group_input.add_argument('-c', '--cmtfile', help='Give a file at the CMTSOLUTION format from the Global CMT catalog')
+    group_input.add_argument('-c', '--cmtfile', help='Give a file at the CMTSOLUTION or NDK format from the Global CMT catalog (one or several events)')
     group_input.add_argument('-m', '--moment_tensor', help='Give the moment tensor in the following order: Mrr,Mtt,Mpp,Mrt,Mrp,Mtp',
                            nargs=6,type=float,metavar=("Mrr","Mtt","Mpp","Mrt","Mrp","Mtp"))
+    parser.add_argument('--cache', help='keep a binary copy of the cmtfile in CACHE_DIR (default: %(const)s) to skip the parsing on the next runs',
+                        nargs='?', const=DEFAULT_CACHE_DIR, default=None, metavar='CACHE_DIR')
+    parser.add_argument('--save', help='with -c, save the eigendecomposition of the events (eigenvalues, eigenvectors, T N P axes, percentages, M0) in a .npy file',
+                        metavar='NPY')
+    parser.add_argument('--store', help='with -c, incremental mode: decompose only the events of the cmtfile which are not in the results store STORE_DIR or have changed, merge them into the store and print them',
+                        metavar='STORE_DIR')
+    timings.add_arguments(parser)
 
     args = parser.parse_args()
+    t = timings.start(args, 'moment_tensor_dec')
+
+    if args.store and args.save:
+       parser.error('--store and --save cannot be used together')
+
+    if args.cmtfile and args.store:
+       from results_store import ResultsStore
+       store = ResultsStore(args.store)
+       if args.cache:
+          with t.stage('parse'):
+             chunks = [open_catalog(args.cmtfile, cache_dir=args.cache)]
+       else:
+          chunks = t.iterate('parse', read_catalog(args.cmtfile))
+       added, changed, unchanged = store.update(chunks, t=t)
+       if len(added) or len(changed):
+          with t.stage('save'):
+             store.save()
+
+       with t.stage('output'):
+          names = np.concatenate((added['event'], changed['event']))
+          for event,i in zip(names, store.lookup(names)):
+             print "\nevent name         : ", event
+             print "percentage of ISO  : ", np.round(store['iso'][i],decimals=2)," %"
+             print "percentage of DC   : ", np.round(store['dc'][i],decimals=2)," %"
+             print "percentage of CLVD : ", np.round(store['clvd'][i],decimals=2)," %"
+       print "\n{} new, {} changed, {} unchanged events".format(len(added), len(changed), unchanged)
+       t.finish(args.timings)
+       sys.exit()
 
     if args.cmtfile:
-       cmtfile  = args.cmtfile
-       cmt_dict = parse_cmt(cmtfile)
-       Mrr = float(cmt_dict['Mrr'])
-       Mtt = float(cmt_dict['Mtt'])
-       Mpp = float(cmt_dict['Mpp'])
-       Mrt = float(cmt_dict['Mrt'])
-       Mrp = float(cmt_dict['Mrp'])
-       Mtp = float(cmt_dict['Mtp'])
+       # CMTSOLUTION or NDK file, with one or several events
+       if args.cache:
+          with t.stage('parse'):
+             chunks = [open_catalog(args.cmtfile, cache_dir=args.cache)]
+       else:
+          chunks = read_catalog(args.cmtfile)
+
+       saved = []
+       for events in t.iterate('parse', chunks):
+          with t.stage('decompose'):
+             if args.save:
+                dec = eigen_decomposition(moment_tensors(events))
+                iso,clvd,dc = dec['iso'],dec['clvd'],dec['dc']
+                saved.append(dec)
+             else:
+                iso,clvd,dc = decompose(moment_tensors(events))
+
+          with t.stage('output'):
+             for i,event in enumerate(events['event']):
+                print "\nevent name         : ", event
+                print "percentage of ISO  : ", np.round(abs(iso[i]),decimals=2)," %"
+                print "percentage of DC   : ", np.round(dc[i],decimals=2)," %"
+                print "percentage of CLVD : ", np.round(abs(clvd[i]),decimals=2)," %"
+       if args.save:
+          np.save(args.save, np.concatenate(saved) if saved else np.empty(0, dtype=DECOMPOSITION_DTYPE))
+       t.finish(args.timings)
+       sys.exit()
 
- 
     elif args.moment_tensor:
 
        mt = args.moment_tensor
@@ -168,9 +611,11 @@ if __name__ == "__main__":
                      "\n Mtp :",Mtp
 
  
-    iso,clvd,dc = main(Mrr,Mtt,Mpp,Mrt,Mrp,Mtp)
+    with t.stage('decompose'):
+       iso,clvd,dc = main(Mrr,Mtt,Mpp,Mrt,Mrp,Mtp)
 
     print "percentage of ISO  : ", np.round(abs(iso),decimals=2)," %"
     print "percentage of DC   : ", np.round(dc,decimals=2)," %"
     print "percentage of CLVD : ", np.round(abs(clvd),decimals=2)," %"
+    t.finish(args.timings)
 
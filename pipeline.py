@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Catalog pipeline: parse -> decompose -> classify -> write.
+
+The catalog (CMTSOLUTION or NDK) is read by chunks in the main process.
+The moment tensors of each chunk are copied in a block of shared memory
+and a pool of worker processes computes the eigendecomposition (ISO, CLVD
+and DC percentages, principal axes, scalar moment, Mw) and the ternary
+classification of the block in place. The results are written in the order
+of the catalog, as a CSV file or as a columnar directory (one .npy file per
+column, see ColumnWriter).
+
+The number of shared blocks is fixed (--blocks): when all of them are in
+use, the parser waits for the oldest block to be written, so the memory
+does not depend on the size of the catalog.
+
+usage:
+
+./pipeline.py jan76_dec13.ndk -o gcmt.csv
+./pipeline.py jan76_dec13.ndk -o gcmt_columns -j 4 --chunksize 20000
+
+import numpy as np
+mw = np.load('gcmt_columns/mw.npy', mmap_mode='r')
+'''
+
+import argparse
+import collections
+import csv
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from catalog import read_catalog, moment_tensors, NpyWriter
+from magnitude import moment2Mw
+from moment_tensor_dec import eigen_decomposition, ternary_classify, FAULT_TYPES
+import timings
+
+
+# columns of the catalog, copied from the parsed chunks
+CATALOG_COLUMNS = ('event', 'time', 'lat', 'lon', 'depth', 'mag')
+
+# columns computed by the workers (float64 in the shared blocks)
+RESULT_COLUMNS = ('m0_dyne_cm', 'mw', 'iso', 'clvd', 'dc',
+                  'T_val', 'T_plg', 'T_azm', 'N_val', 'N_plg', 'N_azm',
+                  'P_val', 'P_plg', 'P_azm',
+                  'strike_slip', 'normal', 'reverse', 'fault_type')
+
+# dtypes of the columns of the columnar output
+COLUMN_DTYPES = collections.OrderedDict(
+    [('event', 'S16'), ('time', 'datetime64[ms]')] +
+    [(k, 'f8') for k in CATALOG_COLUMNS[2:] + RESULT_COLUMNS[:-1]] +
+    [('fault_type', 'i1')])
+
+
+def process_block(mt, out):
+    '''
+    Decomposition and ternary classification of moment tensors
+    :param mt: moment tensors (dyne.cm), array of shape (N, 6)
+    :param out: output array of shape (N, len(RESULT_COLUMNS))
+    '''
+    dec = eigen_decomposition(mt)
+    _, bary, fault_type = ternary_classify(dec)
+
+    out[:, 0] = dec['m0']
+    moment2Mw(dec['m0'], out=out[:, 1])
+    out[:, 2] = np.abs(dec['iso'])
+    out[:, 3] = np.abs(dec['clvd'])
+    out[:, 4] = dec['dc']
+    for i in range(3):
+        out[:, 5 + 3 * i] = dec['val'][:, i]
+        out[:, 6 + 3 * i] = dec['plunge'][:, i]
+        out[:, 7 + 3 * i] = dec['azimuth'][:, i]
+    out[:, 14:17] = bary
+    out[:, 17] = fault_type
+
+
+# shared blocks of a worker process, set by _init_worker
+_shared = {}
+
+def _init_worker(inputs, outputs, chunksize):
+    _shared['in'] = np.frombuffer(inputs, dtype=float).reshape(-1, chunksize, 6)
+    _shared['out'] = np.frombuffer(outputs, dtype=float).reshape(-1, chunksize, len(RESULT_COLUMNS))
+
+
+def _process_slot(job):
+    slot, n = job
+    process_block(_shared['in'][slot, :n], _shared['out'][slot, :n])
+    return slot, n
+
+
+#-------------------------------------------------------------------------------
+# writers
+
+class CsvWriter():
+
+    def __init__(self, filename):
+        self._file = open(filename, 'w')
+        self._csv = csv.writer(self._file, lineterminator='\n')
+        self._csv.writerow(CATALOG_COLUMNS + RESULT_COLUMNS)
+
+    def write(self, events, results):
+        times = np.datetime_as_string(events['time'], unit='ms')
+        fault_type = [FAULT_TYPES[int(t)] for t in results[:, -1]]
+        columns = ([events['event'].astype(str), times] +
+                   [events[k].tolist() for k in CATALOG_COLUMNS[2:]] +
+                   [results[:, k].tolist() for k in range(results.shape[1] - 1)] +
+                   [fault_type])
+        self._csv.writerows(zip(*columns))
+
+    def close(self):
+        self._file.close()
+
+
+class ColumnWriter():
+    '''
+    Columnar output: a directory with one .npy file per column (read them
+    with np.load(..., mmap_mode='r')) and columns.json (names, dtypes,
+    number of rows, names of the fault types)
+    '''
+
+    def __init__(self, directory):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.dtypes = COLUMN_DTYPES
+        self._writers = collections.OrderedDict(
+            (k, NpyWriter(os.path.join(directory, k + '.npy'), dtype))
+            for k, dtype in self.dtypes.items())
+
+    def write(self, events, results):
+        for k in CATALOG_COLUMNS:
+            self._writers[k].append(events[k])
+        for i, k in enumerate(RESULT_COLUMNS):
+            self._writers[k].append(results[:, i])
+
+    def close(self):
+        nrows = 0
+        for w in self._writers.values():
+            nrows = w.nrows
+            w.close()
+        meta = {'columns': list(self.dtypes.keys()),
+                'dtypes': list(self.dtypes.values()),
+                'rows': nrows,
+                'fault_types': list(FAULT_TYPES)}
+        with open(os.path.join(self.directory, 'columns.json'), 'w') as f:
+            json.dump(meta, f, indent=1)
+
+
+def open_writer(output, fmt=None):
+    '''
+    CsvWriter for a .csv file, ColumnWriter otherwise (or as given by fmt:
+    'csv' or 'columns')
+    '''
+    if fmt is None:
+        fmt = 'csv' if output.endswith('.csv') else 'columns'
+    if fmt == 'csv':
+        return CsvWriter(output)
+    if fmt == 'columns':
+        return ColumnWriter(output)
+    raise ValueError("unknown output format: {}".format(fmt))
+
+
+#-------------------------------------------------------------------------------
+def run_pipeline(filename, writer, processes=None, chunksize=10000, blocks=None,
+                 fmt=None, t=timings.NO_TIMINGS):
+    '''
+    Process a catalog and write the results
+    :param filename: catalog (CMTSOLUTION or NDK)
+    :param writer: CsvWriter or ColumnWriter (see open_writer)
+    :param processes: number of worker processes (cpu count if None, 1 to
+                      process the chunks in the current process)
+    :param chunksize: number of events per block
+    :param blocks: number of shared blocks, i.e. of chunks in flight
+                   (2 per process if None)
+    :param fmt: format of the catalog ('cmt' or 'ndk', guessed if None)
+    :param t: timings of the stages (see timings.start)
+    :return: number of events processed
+    '''
+    chunks = t.iterate('parse', read_catalog(filename, chunksize=chunksize, fmt=fmt))
+    count = 0
+
+    if processes == 1:
+        for events in chunks:
+            results = np.empty((len(events), len(RESULT_COLUMNS)))
+            with t.stage('process'):
+                process_block(moment_tensors(events), results)
+            with t.stage('write'):
+                writer.write(events, results)
+            count += len(events)
+        return count
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if blocks is None:
+        blocks = 2 * processes
+
+    inputs = multiprocessing.RawArray('d', blocks * chunksize * 6)
+    outputs = multiprocessing.RawArray('d', blocks * chunksize * len(RESULT_COLUMNS))
+    shared_in = np.frombuffer(inputs, dtype=float).reshape(blocks, chunksize, 6)
+    shared_out = np.frombuffer(outputs, dtype=float).reshape(blocks, chunksize, len(RESULT_COLUMNS))
+
+    pool = multiprocessing.Pool(processes, _init_worker, (inputs, outputs, chunksize))
+    # chunks in flight, in the order of the catalog: (events, async result)
+    pending = collections.deque()
+    free = list(range(blocks))
+
+    def write_oldest():
+        events, result = pending.popleft()
+        with t.stage('wait'):
+            slot, n = result.get()
+        with t.stage('write'):
+            writer.write(events, shared_out[slot, :n])
+        free.append(slot)
+        return n
+
+    try:
+        for events in chunks:
+            if not free:
+                # backpressure: all the blocks are in use
+                count += write_oldest()
+            slot = free.pop()
+            n = len(events)
+            shared_in[slot, :n] = moment_tensors(events)
+            pending.append((events, pool.apply_async(_process_slot, ((slot, n),))))
+        while pending:
+            count += write_oldest()
+    finally:
+        pool.terminate()
+        pool.join()
+    return count
+
+
+def main():
+
+    parser = argparse.ArgumentParser(prog='pipeline.py',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     description='Decompose and classify all the events of a catalog (CMTSOLUTION or NDK) with several processes',
+                                     epilog='''example:
+./pipeline.py jan76_dec13.ndk -o gcmt.csv
+./pipeline.py jan76_dec13.ndk -o gcmt_columns -j 4''')
+    parser.add_argument('catalog', help='catalog file (CMTSOLUTION or NDK)')
+    parser.add_argument('-o', '--output', required=True,
+                        help='results: CSV file if it ends with .csv, directory of .npy columns otherwise')
+    parser.add_argument('--format', choices=('csv', 'columns'), default=None,
+                        help='format of the output (guessed from its name by default)')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='number of worker processes (default: number of cpu)')
+    parser.add_argument('--chunksize', type=int, default=10000,
+                        help='number of events per block (default: %(default)s)')
+    parser.add_argument('--blocks', type=int, default=None,
+                        help='number of blocks in flight, bounds the memory (default: 2 per process)')
+    timings.add_arguments(parser)
+    args = parser.parse_args()
+
+    t = timings.start(args, 'pipeline')
+    t0 = time.time()
+    writer = open_writer(args.output, args.format)
+    try:
+        count = run_pipeline(args.catalog, writer, processes=args.processes,
+                             chunksize=args.chunksize, blocks=args.blocks, t=t)
+    finally:
+        writer.close()
+    elapsed = time.time() - t0
+    print "{} events in {:.1f} s ({:.0f} events/s)".format(count, elapsed, count/max(elapsed, 1.e-9))
+    t.finish(args.timings)
+
+
+if __name__ == "__main__":
+
+    main()
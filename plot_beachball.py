@@ -19,10 +19,18 @@ exemple:
 '''
 
 
-from obspy.imaging.beachball import beachball,aux_plane, mt2plane, MomentTensor,beach
 import argparse
+import os
 import sys
-import matplotlib.pylab as plt
+import time
+import multiprocessing
+import numpy as np
+
+# obspy and matplotlib are imported by the functions which draw, to keep
+# the import of this module (and the worker processes) light
+from catalog import load_catalog, load_foc_mec, moment_tensors
+from moment_tensor_dec import mt2planes, aux_plane
+import timings
 
 
 class BB():
@@ -30,7 +38,8 @@ class BB():
    def __init__(self,facecolor='r',edgecolor='k',
                 alpha=1,
                 bgcolor='w',
-                outputname=None):
+                outputname=None,
+                cache=None):
 
 
       self.edgecolor=edgecolor
@@ -40,28 +49,43 @@ class BB():
       self.lw=1.
 
       self.outputname = outputname
+      # optional BeachballCache, the geometry is computed by obspy if None
+      self.cache = cache
+
+
+   def collection(self,fm):
+      '''
+      patch collection of the beachball, centered in an axes of limits (0,1)
+      '''
+      from obspy.imaging.beachball import beach
+      _beach = self.cache.beach if self.cache is not None else beach
+      return _beach(fm, 
+                    xy=(0.5,0.5),
+                    facecolor=self.facecolor,
+                    linewidth=self.lw,
+                    bgcolor=self.bgcolor,
+                    edgecolor=self.edgecolor,
+                    alpha=self.alpha,
+                    width=1,
+                    size=1)
 
 
    def draw(self,fm,NP=None):
 
+      import matplotlib.pylab as plt
+      from obspy.imaging.beachball import beach
+      _beach = self.cache.beach if self.cache is not None else beach
+
       fig=plt.figure(figsize=(8,8))
       ax = fig.add_axes([0.05,0.05,0.9,0.9])
 
-      b = beach(fm, 
-                xy=(0.5,0.5),
-                facecolor=self.facecolor,
-                linewidth=self.lw,
-                bgcolor=self.bgcolor,
-                edgecolor=self.edgecolor,
-                alpha=self.alpha,
-                width=1,
-                size=1)
+      b = self.collection(fm)
 
       b.set_zorder(10)
       ax.add_collection(b)
 
       if NP:
-         b2 = beach(NP, 
+         b2 = _beach(NP, 
                     xy=(0.5,0.5),
                     #facecolor=self.facecolor,
                     linewidth=self.lw+1,
@@ -87,19 +111,161 @@ class BB():
          plt.show()
 
 
+# figure of a worker process of draw_batch, created once by _init_worker
+_worker = {}
+
+def _init_worker(bb_args,figsize,dpi,cache):
+
+   from matplotlib.figure import Figure
+   from matplotlib.backends.backend_agg import FigureCanvasAgg
+   from beachball_cache import BeachballCache
+
+   if isinstance(cache, dict):
+      # arguments of the cache of the main process: open its disk cache
+      # read-only (without it if it is locked by the main process)
+      import anydbm
+      try:
+         cache = BeachballCache(readonly=True, **cache)
+      except anydbm.error:
+         cache.pop('cache_file')
+         cache = BeachballCache(**cache)
+
+   fig = Figure(figsize=figsize)
+   FigureCanvasAgg(fig)
+   ax = fig.add_axes([0.05,0.05,0.9,0.9])
+   ax.set_xlim(0,1)
+   ax.set_ylim(0,1)
+   ax.set_xticks(())
+   ax.set_yticks(())
+   ax.set_frame_on(False)
+
+   _worker['fig'] = fig
+   _worker['ax'] = ax
+   _worker['bb'] = BB(cache=cache, **bb_args)
+   _worker['dpi'] = dpi
+
+
+def _draw_one(job):
+
+   fm, filename = job
+   b = _worker['bb'].collection(fm)
+   _worker['ax'].add_collection(b)
+   _worker['fig'].savefig(filename, transparent=True, dpi=_worker['dpi'])
+   b.remove()
+   return filename
+
+
+def draw_batch(mechanisms,template='beachball_{index:06d}.png',names=None,
+               processes=None,figsize=(2,2),dpi=100,chunksize=16,resolution=None,
+               cache_file=None,**bb_args):
+   '''
+   Draw one image file per mechanism. Each worker process draws all its
+   mechanisms in the same Agg figure, only the beachball is replaced.
+   :param mechanisms: nodal planes (N, 3) or moment tensors (N, 6)
+   :param template: name of the output files, formatted with the index of
+                    the mechanism ({index}) and its name ({name})
+   :param names: names of the mechanisms (the index if None)
+   :param processes: number of worker processes (cpu count if None, 1 to
+                     draw in the current process)
+   :param resolution: if given, each process keeps the geometry of the
+                      mechanisms quantized to this resolution (degrees) in a
+                      BeachballCache
+   :param cache_file: on-disk cache of the geometry (see BeachballCache,
+                      resolution 1 degree by default): the missing
+                      geometries are computed by the main process, the
+                      worker processes only read it
+   :param bb_args: facecolor, edgecolor, alpha, bgcolor of the beachballs
+   :return count, elapsed: number of files written and elapsed time (s)
+   '''
+   jobs = ((list(fm), template.format(index=i, name=names[i] if names is not None else i))
+           for i, fm in enumerate(mechanisms))
+
+   t0 = time.time()
+   cache = None
+   if resolution or cache_file:
+      cache = {'resolution': resolution or 1., 'cache_file': cache_file}
+   if cache_file:
+      from beachball_cache import BeachballCache
+      main_cache = BeachballCache(**cache)
+      for fm in mechanisms:
+         # size of the beachballs of BB.collection
+         main_cache.geometry(fm, size=100)
+      if processes == 1:
+         cache = main_cache
+      else:
+         main_cache.close()
+
+   count = 0
+   if processes == 1:
+      _init_worker(bb_args, figsize, dpi, cache)
+      try:
+         for job in jobs:
+            _draw_one(job)
+            count += 1
+      finally:
+         if cache_file:
+            cache.close()
+   else:
+      pool = multiprocessing.Pool(processes, _init_worker, (bb_args, figsize, dpi, cache))
+      try:
+         for _ in pool.imap_unordered(_draw_one, jobs, chunksize):
+            count += 1
+      finally:
+         pool.close()
+         pool.join()
+
+   return count, time.time() - t0
+
+
 
 def main():
 
     parser = argparse.ArgumentParser(description='Draws a beachball of an earthquake focal mechanism given strike, dip, rake or the 6 components of the moment tensor')
 
     parser.add_argument('--fm', help='Nodal plane (strike dip rake) or moment tensor (Mrr Mtt Mpp Mrt Mrp Mtp)',type=float,nargs='+')
+    parser.add_argument('--infile', help='Draw one file per line of a file of nodal planes (3 columns) or moment tensors (6 columns)')
+    parser.add_argument('--cmtfile', help='Draw one file per event of a catalog (CMTSOLUTION or NDK format)')
+    parser.add_argument('--template', help='Name of the output files with --infile or --cmtfile, {index} and {name} are replaced by the index and the name of the event. Default is %(default)s',
+                        default='beachball_{index:06d}.png')
+    parser.add_argument('-j','--processes', help='Number of processes with --infile or --cmtfile. Default is the number of cpu',type=int,default=None)
+    parser.add_argument('--resolution', help='With --infile or --cmtfile, reuse the geometry of the mechanisms identical at this resolution (degrees). Default is None (no cache), 1 with --cache',type=float,default=None)
+    parser.add_argument('--cache', metavar='CACHE_DIR', help='Keep the geometry of the beachballs in CACHE_DIR for the next runs (shared with ternary_plot.py --cache)',default=None)
     parser.add_argument('--dc', help='superpose the double couple component',action='store_true')
     parser.add_argument('-c','--color', help='Choose a color for the quadrant of tension (r,b,k,g,y...). Default color is red',default='r',type=str)
     parser.add_argument('-o','--output', help='Name of the output file (could be a png, ps, pdf,eps, and svg). Default is None',default=None,type=str)
+    timings.add_arguments(parser)
 
     args = parser.parse_args()
-
-    bb = BB(outputname=args.output,facecolor=args.color)
+    t = timings.start(args, 'plot_beachball')
+
+    cache_file = None
+    if args.cache:
+       if not os.path.isdir(args.cache):
+          os.makedirs(args.cache)
+       cache_file = os.path.join(args.cache, 'beachballs')
+
+    if args.infile or args.cmtfile:
+       names = None
+       with t.stage('parse'):
+          if args.infile:
+             mechanisms = load_foc_mec(args.infile, columns=(3, 6))
+          else:
+             cat = load_catalog(args.cmtfile)
+             mechanisms = moment_tensors(cat)
+             names = cat['event']
+
+       count, elapsed = draw_batch(mechanisms, template=args.template, names=names,
+                                   processes=args.processes, resolution=args.resolution,
+                                   cache_file=cache_file, facecolor=args.color)
+       # one call per beachball, drawn by the worker processes
+       t.add('render', elapsed, calls=count)
+       print "{} beachballs in {:.1f} s ({:.1f} events/s)".format(count, elapsed, count/max(elapsed, 1.e-9))
+       t.finish(args.timings)
+       return
+
+    from beachball_cache import BeachballCache
+    cache = BeachballCache(resolution=args.resolution or 1., cache_file=cache_file)
+    bb = BB(outputname=args.output,facecolor=args.color,cache=cache)
 
     NP = None
 
@@ -113,11 +279,12 @@ def main():
           Mrt=args.fm[3]
           Mrp=args.fm[4]
           Mtp=args.fm[5]
-          M = MomentTensor( (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp), 0)
-          nod_planes = mt2plane(M)
+          with t.stage('axes'):
+             np1, np2 = mt2planes(args.fm)
+             s1,d1,r1 = [float(a) for a in np1[0]]
+             s2,d2,r2 = [float(a) for a in np2[0]]
           if args.dc:
-             NP = (nod_planes.strike,nod_planes.dip,nod_planes.rake )
-             s2,d2,r2 = aux_plane(nod_planes.strike,nod_planes.dip,nod_planes.rake)
+             NP = (s1,d1,r1)
 
           print "Moment tensor:", \
             "\n Mrr :",Mrr, \
@@ -127,20 +294,29 @@ def main():
             "\n Mrp :",Mrp, \
             "\n Mtp :",Mtp
 
-          print "NP1:",round(nod_planes.strike),round(nod_planes.dip),round(nod_planes.rake)
+          print "NP1:",round(s1),round(d1),round(r1)
           print "NP2:",round(s2),round(d2),round(r2)
          
 
        elif len(args.fm) == 3:
           print "Draw beachball from nodal plane"
           # compute auxiliary plane
-          s2,d2,r2 = aux_plane(args.fm[0],args.fm[1],args.fm[2])
+          with t.stage('axes'):
+             s2,d2,r2 = [float(a[0]) for a in aux_plane(args.fm[0],args.fm[1],args.fm[2])]
 
           print "NP1:",round(args.fm[0]),round(args.fm[1]),round(args.fm[2])
           print "NP2:",round(s2),round(d2),round(r2)
 
 
-       bb.draw(args.fm, NP=NP)
+       if args.output:
+          with t.stage('render'):
+             bb.draw(args.fm, NP=NP)
+          t.finish(args.timings)
+       else:
+          # the window stays open in draw
+          t.finish(args.timings)
+          bb.draw(args.fm, NP=NP)
+    cache.close()
 
 if __name__ == "__main__":
 
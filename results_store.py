@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Persistent store of the decomposition and classification of the events of
+a catalog, for incremental runs.
+
+The GCMT catalogs grow by appending events: the store records the name of
+each event processed (the event name of the catalog) with a hash of its
+content (sha1 of the parsed record), so that the next runs only compute the
+events which are new or have changed, and merge them into the results.
+
+The store is a directory at the columnar format of pipeline.py (one .npy
+file per column of COLUMN_DTYPES, plus the hash column, and columns.json).
+The events are kept in the order in which they were first seen; an event
+missing from a later catalog is kept in the store.
+
+usage:
+
+./results_store.py jan76_dec13.ndk gcmt_store
+./results_store.py jan76_dec13.ndk gcmt_store     # nothing to compute
+cat new_events.ndk >> jan76_dec13.ndk
+./results_store.py jan76_dec13.ndk gcmt_store     # only the new events
+
+import results_store
+store = results_store.ResultsStore('gcmt_store')
+added, changed, unchanged = store.update(read_catalog('jan76_dec13.ndk'))
+store.save()
+print store['mw'][store.lookup(['C201410151116A'])]
+'''
+
+import argparse
+import collections
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from catalog import read_catalog, moment_tensors, CATALOG_DTYPE
+from pipeline import process_block, CATALOG_COLUMNS, RESULT_COLUMNS, COLUMN_DTYPES
+from moment_tensor_dec import FAULT_TYPES
+import timings
+
+
+# bump when the computation or the layout of the results changes: the store
+# is then rebuilt from scratch
+STORE_VERSION = 1
+
+STORE_DTYPES = collections.OrderedDict(list(COLUMN_DTYPES.items()) + [('hash', 'S20')])
+
+
+def event_hashes(events):
+    '''
+    sha1 digests of the records of a catalog array (see catalog.CATALOG_DTYPE)
+    :return: array of dtype S20
+    '''
+    events = np.ascontiguousarray(events)
+    raw = events.tobytes()
+    size = events.dtype.itemsize
+    return np.array([hashlib.sha1(raw[i:i + size]).digest()
+                     for i in range(0, len(raw), size)], dtype='S20')
+
+
+class ResultsStore():
+
+    def __init__(self, directory):
+        '''
+        Open a store, empty if the directory does not exist or if it was
+        written by another version (see STORE_VERSION)
+        :param directory: directory of the store
+        '''
+        self.directory = directory
+        self.columns = collections.OrderedDict(
+            (k, np.empty(0, dtype=dtype)) for k, dtype in STORE_DTYPES.items())
+
+        meta_file = os.path.join(directory, 'columns.json')
+        if not os.path.exists(meta_file):
+            return
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION or meta.get('columns') != list(STORE_DTYPES):
+            return
+        for k in STORE_DTYPES:
+            self.columns[k] = np.load(os.path.join(directory, k + '.npy'))
+
+    def __len__(self):
+        return len(self.columns['event'])
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+    def lookup(self, names):
+        '''
+        Rows of events in the store
+        :param names: event names
+        :return: row index of each event, -1 if it is not in the store
+        '''
+        names = np.asarray(names, dtype=STORE_DTYPES['event'])
+        stored = self.columns['event']
+        if not len(stored):
+            return np.full(len(names), -1, dtype=int)
+        order = np.argsort(stored, kind='mergesort')
+        pos = np.searchsorted(stored, names, sorter=order)
+        rows = order[np.minimum(pos, len(stored) - 1)]
+        rows[stored[rows] != names] = -1
+        return rows
+
+    def update(self, chunks, t=timings.NO_TIMINGS):
+        '''
+        Compute the events of a catalog which are not in the store, or whose
+        content changed, and merge them into the store (save() writes it)
+        :param chunks: iterable of catalog arrays (e.g. catalog.read_catalog)
+        :param t: timings of the stages (see timings.start)
+        :return added, changed, unchanged: catalog arrays of the new and of the
+                                           changed events, number of events
+                                           already up to date
+        '''
+        stored_hash = self.columns['hash']
+        parts = []
+        added = []
+        changed = []
+        unchanged = 0
+
+        for events in chunks:
+            with t.stage('hash'):
+                hashes = event_hashes(events)
+                rows = self.lookup(events['event'])
+                found = rows >= 0
+                same = found.copy()
+                same[found] = stored_hash[rows[found]] == hashes[found]
+            unchanged += np.count_nonzero(same)
+            if same.all():
+                continue
+
+            todo = ~same
+            events = events[todo]
+            results = np.empty((len(events), len(RESULT_COLUMNS)))
+            with t.stage('process'):
+                process_block(moment_tensors(events), results)
+
+            part = dict((k, events[k]) for k in CATALOG_COLUMNS)
+            part.update((k, results[:, i]) for i, k in enumerate(RESULT_COLUMNS))
+            part['hash'] = hashes[todo]
+            parts.append(part)
+            added.append(events[~found[todo]])
+            changed.append(events[found[todo]])
+
+        if parts:
+            with t.stage('merge'):
+                self._merge(parts)
+
+        def concatenate(arrays):
+            return np.concatenate(arrays) if arrays else np.empty(0, dtype=CATALOG_DTYPE)
+        return concatenate(added), concatenate(changed), unchanged
+
+    def _merge(self, parts):
+        columns = collections.OrderedDict(
+            (k, np.concatenate([self.columns[k]] + [p[k] for p in parts]).astype(dtype))
+            for k, dtype in STORE_DTYPES.items())
+
+        # one row per event: at the place of its first occurrence, with the
+        # values of its last one
+        names = columns['event']
+        _, first = np.unique(names, return_index=True)
+        _, last = np.unique(names[::-1], return_index=True)
+        last = len(names) - 1 - last
+        rows = last[np.argsort(first, kind='mergesort')]
+        for k in columns:
+            self.columns[k] = columns[k][rows]
+
+    def save(self):
+        '''
+        Write the store. columns.json is removed first and written last, so
+        that an interrupted save leaves a store which is rebuilt by the next run.
+        '''
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        meta_file = os.path.join(self.directory, 'columns.json')
+        if os.path.exists(meta_file):
+            os.remove(meta_file)
+
+        for k, column in self.columns.items():
+            path = os.path.join(self.directory, k + '.npy')
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, column)
+            os.rename(path + '.tmp', path)
+
+        meta = {'version': STORE_VERSION,
+                'columns': list(STORE_DTYPES.keys()),
+                'dtypes': list(STORE_DTYPES.values()),
+                'rows': len(self),
+                'fault_types': list(FAULT_TYPES)}
+        with open(meta_file, 'w') as f:
+            json.dump(meta, f, indent=1)
+
+
+def update_store(filename, directory, chunksize=10000, fmt=None, t=timings.NO_TIMINGS):
+    '''
+    Bring the store of a catalog up to date (see ResultsStore.update)
+    :param filename: catalog (CMTSOLUTION or NDK)
+    :param directory: directory of the store
+    :return store, added, changed, unchanged:
+    '''
+    store = ResultsStore(directory)
+    chunks = t.iterate('parse', read_catalog(filename, chunksize=chunksize, fmt=fmt))
+    added, changed, unchanged = store.update(chunks, t=t)
+    if len(added) or len(changed) or not os.path.exists(os.path.join(directory, 'columns.json')):
+        with t.stage('save'):
+            store.save()
+    return store, added, changed, unchanged
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(prog='results_store.py',
+                                     description='Decompose and classify the new or changed events of a catalog (CMTSOLUTION or NDK) and merge them into a results store')
+    parser.add_argument('catalog', help='catalog file (CMTSOLUTION or NDK)')
+    parser.add_argument('store', help='directory of the results (created if needed)')
+    parser.add_argument('--format', choices=('cmt', 'ndk'), default=None,
+                        help='format of the catalog (guessed by default)')
+    timings.add_arguments(parser)
+    args = parser.parse_args()
+
+    t = timings.start(args, 'results_store')
+    store, added, changed, unchanged = update_store(args.catalog, args.store, fmt=args.format, t=t)
+    print "{} new, {} changed, {} unchanged events, {} events in the store".format(
+        len(added), len(changed), unchanged, len(store))
+    t.finish(args.timings)
@@ -30,87 +30,71 @@ ternary_plot(M)
 <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
 '''
 
-from math import sqrt, sin, cos
+from math import sin, cos
 import numpy as np
-import matplotlib.pylab as plt
-import matplotlib.tri as tri
-from datetime import datetime
-from obspy.imaging.beachball import MomentTensor,mt2axes, beach
 import argparse
+import os
+
+# matplotlib and obspy (beachball_cache) are only imported by the plotting
+# code: the numeric functions of this module can be used without them
+from moment_tensor_dec import sdrToMtArray, ternary_classify, principal_axes
+from catalog import (load_catalog, open_catalog, cached_array, moment_tensors, read_foc_mec,
+                     load_foc_mec, MT_KEYS, FOC_MEC_COLUMNS, DEFAULT_CACHE_DIR)
+import timings
 
 
 # conversion deg to radians
 degtorad=np.pi/180.
 
-def read_foc_mec_file(fmfile):
-
+# geometry of the beachballs shared by the diagrams (see beachball_cache),
+# created with the first diagram
+default_bb_cache = None
 
+def read_foc_mec_file(fmfile):
+    '''
+    read a file of moment tensors (Mrr Mtt Mpp Mrt Mrp Mtp per line) into a
+    dictionary {1: {'Mrr': ..., ...}, 2: ...}
+    (catalog.load_foc_mec returns the (N, 6) array directly, use it for
+    large files)
+    '''
     fm = {}
-    idx = 0
-    with open(fmfile, 'r') as f:
-      data = f.readlines()
-
-      for line in data:
-          line = line.strip()
-          if not line.startswith("#"):
-              col = line.split()
-              idx +=1
-              fm[idx] = {}
-
-              fm[idx]['Mrr']  = float(col[0])
-              fm[idx]['Mtt']  = float(col[1])
-              fm[idx]['Mpp']  = float(col[2])              
-              fm[idx]['Mrt']  = float(col[3])
-              fm[idx]['Mrp']  = float(col[4])
-              fm[idx]['Mtp']  = float(col[5])
+    for idx, row in enumerate(load_foc_mec(fmfile)[:, :6].tolist(), 1):
+        fm[idx] = dict(zip(MT_KEYS, row))
 
     return fm
 
 
-def sdrToMt(strike, dip, rake):
+def foc_mec_array(fm):
     '''
-    convert strike dip rake to moment tensor
+    convert the dictionary returned by read_foc_mec_file into an (N, 6) array
     '''
+    return np.array([[fm[idx][k] for k in MT_KEYS] for idx in sorted(fm)],
+                    dtype=float).reshape(-1, 6)
+
 
+def _padded_foc_mec(fmfile):
+    # chunks of a focal mechanism table with all the columns of
+    # FOC_MEC_COLUMNS (nan if missing), for the binary cache
+    for chunk in read_foc_mec(fmfile):
+        out = np.full((len(chunk), len(FOC_MEC_COLUMNS)), np.nan)
+        out[:, :chunk.shape[1]] = chunk
+        yield out
 
-    strike *=degtorad
-    dip *= degtorad
-    rake *= degtorad
-    # moment tensor (r=up, t=south and p=east)
-    is2 = 1/sqrt(2.0)
 
-    mrr = is2*( sin(2*dip) * sin(rake) )
-    mtt = -is2*( sin(dip) * cos(rake) * sin(2*strike) + sin(2*dip) * sin(rake) * sin(strike)**2 )
-    mpp = is2*( sin(dip) * cos(rake) * sin(2*strike) - sin(2*dip) * sin(rake) * cos(strike)**2 )
-    mtp = -is2*( sin(dip) * cos(rake) * cos(2*strike) + 0.5*sin(2*dip) * sin(rake) * sin(2*strike) )
-    mrp = is2*( cos(dip) * cos(rake) * sin(strike) - cos(2*dip) * sin(rake) * cos(strike))
-    mrt = -is2*( cos(dip) * cos(rake) * cos(strike) + cos(2*dip) * sin(rake) * sin(strike) )
+def sdrToMt(strike, dip, rake):
+    '''
+    convert strike dip rake to moment tensor
+    (see moment_tensor_dec.sdrToMtArray for arrays of angles)
+    '''
+    mrr, mtt, mpp, mrt, mrp, mtp = [float(m) for m in sdrToMtArray(strike, dip, rake)[0]]
 
     #mt = MomentTensor((mrr, mtt, mpp, mrt, mrp, mtp), 0)
     return mrr, mtt, mpp, mrt, mrp, mtp
 
 
-def parse_cmt(cmtfile):
-    cmt_dict = {}
-
-    with open(cmtfile, 'r') as fcmt :
-         cmt_lines = fcmt.readlines()
-
-         line = cmt_lines[0]
-         cmt_dict['mag'] = float(line.split()[10])
-         cmt_dict['pde_time'] = line[5:24]
-
-         for line in cmt_lines[1:]:
-             key   = line.rstrip().split(':')[0]
-             value = ' '.join(line.rstrip().split(':')[1:])
-             cmt_dict[key] = value
-             #print key, value
-
-    return cmt_dict
-
 class ternaryDiagram():
 
-    def __init__(self,scaling=True, start_angle=90,rotate_labels=False,label_offset=-0.4,sides=3):
+    def __init__(self,scaling=True, start_angle=90,rotate_labels=False,label_offset=-0.4,sides=3,bb_cache=None):
 
         #self.data = data
 
@@ -132,8 +116,21 @@ class ternaryDiagram():
                          'tight_layout':False}
 
         self.bb_args = {'width':50, 'facecolor':'k','bgcolor':'w','alpha':1}
-
-    def background(self):
+        # cache of the beachball geometry
+        global default_bb_cache
+        if bb_cache is None:
+            if default_bb_cache is None:
+                from beachball_cache import BeachballCache
+                default_bb_cache = BeachballCache()
+            bb_cache = default_bb_cache
+        self.bb_cache = bb_cache
+
+    def background(self,fig=None):
+        '''
+        Draw the static part of the diagram (border, labels, reference
+        beachballs) in a new pyplot figure, or in fig if given (e.g. a Figure
+        with an Agg canvas, without pyplot)
+        '''
 
         self.basis = np.array(
             [
@@ -147,9 +144,12 @@ class ternaryDiagram():
     
 
 
-        fig = plt.figure(**self.fig_args)
+        if fig is None:
+            import matplotlib.pylab as plt
+            fig = plt.figure(**self.fig_args)
         self.ax = fig.add_axes([0.05,0.05,0.9,0.9])
 
+        beach = self.bb_cache.beach
         SS_bb = beach([45.,90.,0.], xy=(6.73e-17, 1.15),axes=self.ax, **self.bb_args)
         R_bb = beach([0.,45.,90.], xy=(0.95, -0.6),axes=self.ax, **self.bb_args)
         N_bb  = beach([0.,45.,-90.], xy=(-0.95, -0.6),axes=self.ax, **self.bb_args)
@@ -203,6 +203,18 @@ class ternaryDiagram():
 
 
     def plot_data(self,data,M,mag=None):
+        '''
+        Draw the beachballs of N events at their place in the diagram, in a
+        single collection
+        :param data: ternary coordinates of the events (N, sides), e.g.
+                     sin(plunge) of the N, P, T axes (see ternary_classify)
+        :param M: moment tensors (N, 6) or nodal planes (N, 3) of the events
+        :param mag: magnitudes (scalar or (N,)), the width of a beachball is
+                    0.05*mag (0.09 without magnitude, or where mag is nan)
+        :return: the collection of the beachballs
+        '''
+        data = np.atleast_2d(np.asarray(data, dtype=float))
+        M = np.asarray(M, dtype=float).reshape(len(data), -1)
 
         # If data is Nxsides, newdata is Nx2.
         if self.scaling:
@@ -219,19 +231,245 @@ class ternaryDiagram():
                      alpha=0.8,
                      color='r')
         '''
-        if mag:
-            width=mag*0.05
-        else:
-            width=0.09
-
-        b = beach(M, 
-                  xy=(tridata[:,0], tridata[:,1]),
+        width = np.full(len(data), 0.09)
+        if mag is not None:
+            mag = np.broadcast_to(np.asarray(mag, dtype=float), width.shape)
+            scaled = np.isfinite(mag) & (mag != 0)
+            width[scaled] = mag[scaled]*0.05
+
+        b = self.bb_cache.beaches(M, 
+                  xy=tridata,
                   width=width, 
                   linewidth=1,
                   facecolor='r')
         
         b.set_zorder(1)
         self.ax.add_collection(b)
+        return b
+
+
+    def plot_density(self,data,nbins=20,M=None,mag=None,top=0,cmap='viridis'):
+        '''
+        Plot the number of events in the cells of a triangular grid, as a
+        single rasterized layer: the rendering time and the size of the output
+        file do not depend on the number of events.
+        :param data: ternary coordinates of the events (N, 3), see plot_data
+        :param nbins: number of cells along a side of the diagram
+        :param M: moment tensors (N, 6), needed to draw the beachballs of the
+                  top events
+        :param mag: magnitudes (N,) used to select and to scale the top events
+                    (the scalar moment of M is used to select them if None)
+        :param top: number of beachballs of the largest events drawn over the
+                    density
+        :return: the collection of the cells, its array is the number of
+                 events of each non empty cell
+        '''
+        import matplotlib.tri as tri
+
+        if self.sides != 3:
+            raise ValueError("the density mode needs a ternary diagram (sides=3)")
+
+        data = np.asarray(data, dtype=float)
+        if self.scaling:
+            data = data / data.sum(-1)[:, np.newaxis]
+        tridata = np.dot(data, self.basis)
+
+        # noeuds de la grille : coordonnees (i, j, nbins-i-j)/nbins
+        i, j = np.mgrid[0:nbins+1, 0:nbins+1]
+        keep = i + j <= nbins
+        nodes = np.column_stack((i[keep], j[keep], nbins - i[keep] - j[keep])) / float(nbins)
+        nodes = np.dot(nodes, self.basis)
+        grid = tri.Triangulation(nodes[:, 0], nodes[:, 1])
+
+        # events on the border: pull them slightly toward the center
+        # (origin of the basis) so that they fall inside a cell
+        inside = tridata * (1. - 1.e-9)
+        cell = grid.get_trifinder()(inside[:, 0], inside[:, 1])
+        counts = np.bincount(cell[cell >= 0], minlength=len(grid.triangles))
+
+        # empty cells are not drawn
+        grid.set_mask(counts == 0)
+        pc = self.ax.tripcolor(grid, facecolors=counts, cmap=cmap, edgecolors='none', zorder=0)
+        pc.set_rasterized(True)
+        self.ax.figure.colorbar(pc, ax=self.ax, shrink=0.5, label='number of events')
+
+        if top and M is not None:
+            M = np.asarray(M, dtype=float)
+            if mag is None:
+                # scalar moment
+                rank = np.sqrt(0.5*(M[:, :3]**2).sum(1) + (M[:, 3:]**2).sum(1))
+            else:
+                # the events without magnitude last
+                rank = np.asarray(mag, dtype=float)
+                rank = np.where(np.isnan(rank), -np.inf, rank)
+            idx = np.argsort(rank)[::-1][:top]
+            self.plot_data(data[idx], M[idx],
+                           mag=None if mag is None else np.asarray(mag)[idx])
+        return pc
+
+    def animate(self,data,M,windows,output,mag=None,processes=None,delay=50,dpi=100):
+        '''
+        Animation of subsets of events (e.g. time windows), written in a gif,
+        mp4 or webm file (see animation.py) without intermediate image files.
+        Each worker process draws the background once, then only the
+        beachballs of its frames, and the frames are streamed to the writer.
+        :param data: ternary coordinates of the events (N, 3), see plot_data
+        :param M: moment tensors of the events (N, 6)
+        :param windows: frames, as (start, stop, label): the events
+                        data[start:stop] are drawn with the label (see
+                        time_windows)
+        :param output: .gif, .mp4 or .webm file
+        :param mag: magnitudes of the events (N,), see plot_data
+        :param processes: number of worker processes (cpu count if None, 1 to
+                          draw in the current process)
+        :param delay: delay between the frames, in 1/100 s
+        :return: number of frames
+        '''
+        import animation
+
+        windows = list(windows)
+        if not windows:
+            raise ValueError("no frame")
+        options = {'scaling':self.scaling, 'start_angle':self.start_angle,
+                   'rotate_labels':self.rotate_labels,
+                   'label_offset':self.label_offset, 'sides':self.sides}
+        data = np.asarray(data, dtype=float)
+        M = np.asarray(M, dtype=float)
+
+        # the worker processes read the disk cache of the beachballs
+        # computed so far
+        if processes == 1 or not self.bb_cache.cache_file:
+            bb_cache = self.bb_cache
+        else:
+            self.bb_cache.sync()
+            bb_cache = {'resolution':self.bb_cache.resolution,
+                        'maxsize':self.bb_cache.maxsize,
+                        'cache_file':self.bb_cache.cache_file}
+
+        # palette of the gif, from the first frame
+        lut = None
+        _init_frame_worker(options, data, M, mag, dpi, None, self.bb_cache)
+        first = _render_frame(windows[0])
+        palette = None
+        if output.lower().endswith('.gif'):
+            palette = animation.make_palette(first)
+            lut = animation.palette_lut(palette)
+        size = (first.shape[1], first.shape[0])
+        del first
+        _frame_worker.clear()
+
+        writer = animation.open_writer(output, size, palette=palette, delay=delay)
+        count = 0
+        try:
+            frames = animation.ordered_map(_render_frame, windows, processes=processes,
+                                           initializer=_init_frame_worker,
+                                           initargs=(options, data, M, mag, dpi, lut, bb_cache))
+            for frame in frames:
+                if lut is not None:
+                    writer.write(*frame)
+                else:
+                    writer.write(frame)
+                count += 1
+        finally:
+            writer.close()
+        return count
+
+
+# diagram of a worker process of ternaryDiagram.animate, created once by
+# _init_frame_worker
+_frame_worker = {}
+
+def _init_frame_worker(options, data, M, mag, dpi, lut, bb_cache=None):
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if isinstance(bb_cache, dict):
+        # arguments of the cache of the main process: open its disk cache
+        # read-only (without it if it is locked by the main process)
+        import anydbm
+        from beachball_cache import BeachballCache
+        try:
+            bb_cache = BeachballCache(readonly=True, **bb_cache)
+        except anydbm.error:
+            bb_cache.pop('cache_file')
+            bb_cache = BeachballCache(**bb_cache)
+    tri = ternaryDiagram(bb_cache=bb_cache, **options)
+    fig = Figure(**tri.fig_args)
+    fig.set_dpi(dpi)
+    canvas = FigureCanvasAgg(fig)
+    tri.background(fig=fig)
+    label = tri.ax.text(0.02, 0.98, '', transform=tri.ax.transAxes,
+                        horizontalalignment='left', verticalalignment='top')
+    canvas.draw()
+
+    _frame_worker['tri'] = tri
+    _frame_worker['canvas'] = canvas
+    # static part of the frames
+    _frame_worker['background'] = canvas.copy_from_bbox(fig.bbox)
+    _frame_worker['label'] = label
+    _frame_worker['data'] = data
+    _frame_worker['M'] = M
+    _frame_worker['mag'] = mag
+    _frame_worker['lut'] = lut
+
+
+def _render_frame(window):
+    '''
+    Draw the events data[start:stop] over the background
+    :return: RGB image, or the gif frame compressed with the palette lut
+    '''
+    import animation
+
+    start, stop, text = window
+    tri = _frame_worker['tri']
+    canvas = _frame_worker['canvas']
+    data, M, mag = _frame_worker['data'], _frame_worker['M'], _frame_worker['mag']
+
+    canvas.restore_region(_frame_worker['background'])
+    artists = []
+    if stop > start:
+        artists.append(tri.plot_data(data[start:stop], M[start:stop],
+                                     mag=None if mag is None else mag[start:stop]))
+    _frame_worker['label'].set_text(text)
+    artists.append(_frame_worker['label'])
+    for a in artists:
+        tri.ax.draw_artist(a)
+    for a in artists[:-1]:
+        a.remove()
+
+    width, height = canvas.get_width_height()
+    img = np.frombuffer(canvas.buffer_rgba(), dtype=np.uint8).reshape(height, width, 4)[:, :, :3].copy()
+    if _frame_worker['lut'] is None:
+        return img
+    return animation.encode_frame(img, _frame_worker['lut'])
+
+
+def time_windows(times, window, step=None):
+    '''
+    Time windows of the frames of an animation, for ternaryDiagram.animate
+    :param times: sorted times of the events (datetime64)
+    :param window: length of the windows, in days
+    :param step: time between the beginnings of the windows, in days
+                 (window if None)
+    :return: list of (start, stop, label), the events of a window are
+             times[start:stop]
+    '''
+    times = np.asarray(times).astype('datetime64[ms]')
+    if not len(times):
+        return []
+    if step is None:
+        step = window
+    ms_per_day = 86400000.
+    length = np.timedelta64(int(round(window * ms_per_day)), 'ms')
+    begin = np.arange(times[0], times[-1] + np.timedelta64(1, 'ms'),
+                      np.timedelta64(int(round(step * ms_per_day)), 'ms'))
+    start = np.searchsorted(times, begin)
+    stop = np.searchsorted(times, begin + length)
+    labels = ['{} - {}'.format(b, e) for b, e in
+              zip(np.datetime_as_string(begin, unit='D'),
+                  np.datetime_as_string(begin + length, unit='D'))]
+    return list(zip(start.tolist(), stop.tolist(), labels))
 
 
 
@@ -252,28 +490,167 @@ def main():
                              type=float,
                              metavar=("strike","dip","slip"))
 
-    parser.add_argument('--infile',help='read input file with several moment tensor')
-
+    parser.add_argument('--infile',help='read input file with several moment tensor (Mrr Mtt Mpp Mrt Mrp Mtp [lon lat depth Mw] per line) and plot all of them')
+
+    parser.add_argument('--cache', help='keep a binary copy of the input files in CACHE_DIR (default: %(const)s) to skip the parsing on the next runs',
+                        nargs='?', const=DEFAULT_CACHE_DIR, default=None, metavar='CACHE_DIR')
+    parser.add_argument('--density', help='plot the density of all the events of --infile or of the catalog given with -c, on a triangular grid of NBINS cells per side (default: %(const)s)',
+                        nargs='?', const=20, default=None, type=int, metavar='NBINS')
+    parser.add_argument('--top', help='with --density, draw the beachballs of the TOP largest events',
+                        type=int, default=0)
+    parser.add_argument('--store', help='with --density and -c, take the ternary coordinates of the events from the results store STORE_DIR (see results_store), computing only the new or changed events',
+                        metavar='STORE_DIR')
+    parser.add_argument('--animate', help='with -c, animation of the events of the catalog by time windows of DAYS days, written in the --output file (gif, mp4 or webm)',
+                        type=float, default=None, metavar='DAYS')
+    parser.add_argument('--step', help='with --animate, time between two frames in days (default: the length of the windows)',
+                        type=float, default=None, metavar='DAYS')
+    parser.add_argument('--delay', help='with --animate, delay between the frames in 1/100 s (default: %(default)s)',
+                        type=int, default=50)
+    parser.add_argument('-j', '--processes', help='with --animate, number of processes drawing the frames (default: number of cpu)',
+                        type=int, default=None)
     parser.add_argument('--debug', help='debug mode', action='store_true')
     parser.add_argument('-o','--output', help='save figure (png, svg, eps, pdf)')
+    timings.add_arguments(parser)
 
     args = parser.parse_args()
+    if args.infile and (args.mt or args.np):
+        parser.error('--infile not allowed with --mt or --np')
+    if args.store and not (args.density and args.cmtfile):
+        parser.error('--store needs --density and -c')
+    t = timings.start(args, 'ternary_plot')
+
+    with t.stage('import'):
+        import matplotlib.pylab as plt
+
+    bb_cache = None
+    if args.cache:
+        from beachball_cache import BeachballCache
+        if not os.path.isdir(args.cache):
+            os.makedirs(args.cache)
+        bb_cache = BeachballCache(cache_file=os.path.join(args.cache, 'beachballs'))
 
     if args.infile:
-        fm = read_foc_mec_file(args.infile)        
-        print fm
+        with t.stage('parse'):
+            if args.cache:
+                fm = cached_array(args.infile, _padded_foc_mec,
+                                  ('f8', (len(FOC_MEC_COLUMNS),)), tag='focmec10',
+                                  cache_dir=args.cache)
+            else:
+                fm = load_foc_mec(args.infile)
+        # optional columns: lon lat depth Mw
+        fm_mt = fm[:, :6]
+        fm_mag = fm[:, 9] if fm.shape[1] > 9 else np.full(len(fm), np.nan)
+        if args.debug:
+            print fm
+
+    if args.animate:
+        if not args.cmtfile or not args.output:
+            parser.error('--animate needs -c and --output')
+        with t.stage('parse'):
+            if args.cache:
+                cat = open_catalog(args.cmtfile, cache_dir=args.cache)
+            else:
+                cat = load_catalog(args.cmtfile)
+            cat = cat[np.argsort(cat['time'], kind='mergesort')]
+        with t.stage('axes'):
+            mt = moment_tensors(cat)
+            _, data, _ = ternary_classify(mt)
+        windows = time_windows(cat['time'], args.animate, step=args.step)
+
+        tri=ternaryDiagram(bb_cache=bb_cache)
+        with t.stage('render'):
+            count = tri.animate(data, mt, windows, args.output,
+                                processes=args.processes, delay=args.delay)
+        if bb_cache:
+            bb_cache.close()
+        print "animation created : {} ({} frames)".format(args.output, count)
+        t.finish(args.timings)
+        return
+
+    if args.density:
+        # every event of the input file and of the catalog, in a single
+        # density layer
+        if not (args.infile or args.cmtfile):
+            parser.error('--density needs --infile or -c')
+        mt = []
+        mags = []
+        data = []
+        if args.infile:
+            mt.append(fm_mt)
+            mags.append(fm_mag)
+            with t.stage('axes'):
+                data.append(ternary_classify(fm_mt)[1])
+        if args.cmtfile:
+            with t.stage('parse'):
+                if args.cache:
+                    cat = open_catalog(args.cmtfile, cache_dir=args.cache)
+                else:
+                    cat = load_catalog(args.cmtfile)
+            mt.append(moment_tensors(cat))
+            mags.append(cat['mag'])
+            if args.store:
+                # only the events of the catalog are kept in the store
+                from results_store import ResultsStore
+                store = ResultsStore(args.store)
+                added, changed, _ = store.update([cat], t=t)
+                if len(added) or len(changed):
+                    with t.stage('save'):
+                        store.save()
+                rows = store.lookup(cat['event'])
+                data.append(np.column_stack([store[k][rows] for k in ('strike_slip', 'normal', 'reverse')]))
+            else:
+                with t.stage('axes'):
+                    data.append(ternary_classify(mt[-1])[1])
+        mt = np.concatenate(mt)
+        data = np.concatenate(data)
+        mag = np.concatenate(mags)
+        if not np.isfinite(mag).any():
+            mag = None
+
+        tri=ternaryDiagram(bb_cache=bb_cache)
+        with t.stage('background'):
+            tri.background()
+        with t.stage('plot'):
+            tri.plot_density(data, nbins=args.density, M=mt, mag=mag, top=args.top)
+        if bb_cache:
+            bb_cache.close()
+
+        if args.output:
+            with t.stage('savefig'):
+                plt.savefig(args.output, bbox_inches='tight')
+            t.finish(args.timings)
+        else:
+            t.finish(args.timings)
+            plt.show()
+        return
+
+    mag = None
+    if args.infile or args.cmtfile:
+       # every event of the input file and of the catalog
+       mt = []
+       mags = []
+       if args.infile:
+          mt.append(fm_mt)
+          mags.append(fm_mag)
+       if args.cmtfile:
+          with t.stage('parse'):
+             if args.cache:
+                cat = open_catalog(args.cmtfile, cache_dir=args.cache)
+             else:
+                cat = load_catalog(args.cmtfile)
+          mt.append(moment_tensors(cat))
+          mags.append(cat['mag'])
+       M = np.concatenate(mt)
+       mag = np.concatenate(mags)
+
+       # ternary coordinates of all the events at once
+       with t.stage('axes'):
+          plunge, data, _ = ternary_classify(M)
+       if args.debug:
+          print len(M), "events"
+          print "plunges of T, N, P:"
+          print plunge
 
-        
-    if args.cmtfile:
-       cmtfile  = args.cmtfile
-       cmt_dict = parse_cmt(cmtfile)
-       Mrr = float(cmt_dict['Mrr'])
-       Mtt = float(cmt_dict['Mtt'])
-       Mpp = float(cmt_dict['Mpp'])
-       Mrt = float(cmt_dict['Mrt'])
-       Mrp = float(cmt_dict['Mrp'])
-       Mtp = float(cmt_dict['Mtp'])
- 
     elif args.mt:
 
        Mrr=args.mt[0]
@@ -288,43 +665,52 @@ def main():
         
         Mrr,Mtt,Mpp,Mrt,Mrp,Mtp = sdrToMt(args.np[0], args.np[1], args.np[2])
 
-
-    M = MomentTensor( (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp), 0)
-    # principal axes
-    (T, N, P) = mt2axes(M)
+    else:
+        parser.error('give a moment tensor (--mt), a nodal plane (--np), a catalog (-c) or a file of moment tensors (--infile)')
 
 
+    if not (args.infile or args.cmtfile):
+        M = [Mrr,Mtt,Mpp,Mrt,Mrp,Mtp]
+        # principal axes T, N, P
+        with t.stage('axes'):
+            val, plunge, azimuth = [a[0] for a in principal_axes(M)]
 
-    if args.debug:
-        
-        print "Moment tensor: \n Mrr :",Mrr, \
-            "\n Mtt :",Mtt, \
-            "\n Mpp :",Mpp, \
-            "\n Mrt :",Mrt, \
-            "\n Mrp :",Mrp, \
-            "\n Mtp :",Mtp
+        if args.debug:
 
-        print "PRINCIPAL AXES:"
-        print "T axis: VAL = ", round(T.val), " PLG = ", round(T.dip), "AZM = ", round(T.strike)
-        print "N axis: VAL = ", round(N.val), " PLG = ", round(N.dip), "AZM = ", round(N.strike)
-        print "P axis: VAL = ", round(P.val), " PLG = ", round(P.dip), "AZM = ", round(P.strike)
+            print "Moment tensor: \n Mrr :",Mrr, \
+                "\n Mtt :",Mtt, \
+                "\n Mpp :",Mpp, \
+                "\n Mrt :",Mrt, \
+                "\n Mrp :",Mrp, \
+                "\n Mtp :",Mtp
 
+            print "PRINCIPAL AXES:"
+            print "T axis: VAL = ", round(val[0]), " PLG = ", round(plunge[0]), "AZM = ", round(azimuth[0])
+            print "N axis: VAL = ", round(val[1]), " PLG = ", round(plunge[1]), "AZM = ", round(azimuth[1])
+            print "P axis: VAL = ", round(val[2]), " PLG = ", round(plunge[2]), "AZM = ", round(azimuth[2])
 
-    x = sin(T.dip*degtorad)
-    y = sin(N.dip*degtorad)
-    z = sin(P.dip*degtorad)
+        x = sin(plunge[0]*degtorad)
+        y = sin(plunge[1]*degtorad)
+        z = sin(plunge[2]*degtorad)
 
-    data = np.array([[y,z,x]])
+        data = np.array([[y,z,x]])
 
 
-    tri=ternaryDiagram()
-    tri.background()
+    tri=ternaryDiagram(bb_cache=bb_cache)
+    with t.stage('background'):
+        tri.background()
 
-    tri.plot_data(data,M)
+    with t.stage('plot'):
+        tri.plot_data(data,M,mag=mag)
+    if bb_cache:
+        bb_cache.close()
 
     if args.output:
-        plt.savefig(output, bbox_inches='tight')
+        with t.stage('savefig'):
+            plt.savefig(args.output, bbox_inches='tight')
+        t.finish(args.timings)
     else:
+        t.finish(args.timings)
         plt.show()
 
 if __name__ == '__main__':
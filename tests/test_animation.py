@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import numpy as np
+
+import animation
+
+
+def _lzw_decode(data):
+    # GIF image data (code size and sub-blocks) -> bytes of the color indices
+    data = bytearray(data)
+    min_code_size = data[0]
+    raw = bytearray()
+    p = 1
+    while data[p]:
+        raw.extend(data[p + 1:p + 1 + data[p]])
+        p += 1 + data[p]
+    assert p == len(data) - 1
+    clear = 1 << min_code_size
+    out = bytearray()
+    acc = nbits = pos = 0
+    code_size = min_code_size + 1
+    table = prev = None
+    while True:
+        while nbits < code_size:
+            acc |= raw[pos] << nbits
+            pos += 1
+            nbits += 8
+        code = acc & ((1 << code_size) - 1)
+        acc >>= code_size
+        nbits -= code_size
+        if code == clear:
+            table = [bytearray([i]) for i in range(clear)] + [None, None]
+            code_size = min_code_size + 1
+            prev = None
+            continue
+        if code == clear + 1:
+            return bytes(out)
+        if code < len(table):
+            entry = table[code]
+            if prev is not None:
+                table.append(prev + entry[:1])
+        else:
+            entry = prev + prev[:1]
+            table.append(entry)
+        out.extend(entry)
+        prev = entry
+        if len(table) == 1 << code_size and code_size < 12:
+            code_size += 1
+
+
+def _frames():
+    rng = np.random.RandomState(0)
+    # noise (several resets of the table), flat areas, runs, gradient
+    return [rng.randint(0, 256, (300, 200)),
+            np.zeros((200, 300)),
+            np.repeat(rng.randint(0, 4, 2000), rng.randint(1, 400, 2000)),
+            np.add.outer(np.arange(200), np.arange(300)) // 7 % 256,
+            np.array([[5]]),
+            np.arange(256).repeat(3)]
+
+
+class TestLzw(unittest.TestCase):
+
+    def test_round_trip(self):
+        for frame in _frames():
+            frame = frame.astype(np.uint8)
+            self.assertEqual(_lzw_decode(animation.lzw_encode(frame)), frame.tobytes())
+        # smaller palettes
+        frame = np.random.RandomState(1).randint(0, 4, (50, 60)).astype(np.uint8)
+        data = animation.lzw_encode(frame, min_code_size=2)
+        self.assertEqual(bytearray(data)[0], 2)
+        self.assertEqual(_lzw_decode(data), frame.tobytes())
+
+    def test_sub_blocks(self):
+        data = bytearray(animation.lzw_encode(np.random.RandomState(2).randint(0, 256, 1000)))
+        p = 1
+        while data[p]:
+            self.assertLessEqual(data[p], 255)
+            p += 1 + data[p]
+        self.assertEqual(p, len(data) - 1)
+
+    def test_encoders(self):
+        # Pillow's encoder, when it is used, gives the same frames
+        encode = animation.gif_encoder()
+        if encode is animation.lzw_encode:
+            self.skipTest('no Pillow >= 9.1')
+        for frame in _frames():
+            frame = frame.astype(np.uint8)
+            self.assertEqual(_lzw_decode(encode(frame)), frame.tobytes())
+
+
+class TestWhich(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.environ.get('PATH')
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        shutil.rmtree(self.tmpdir)
+
+    def test_path(self):
+        encoder = os.path.join(self.tmpdir, 'encoder')
+        with open(encoder, 'w') as f:
+            f.write('#!/bin/sh\n')
+        os.environ['PATH'] = os.pathsep.join(['/nonexistent', self.tmpdir])
+        # not executable
+        self.assertIsNone(animation._which('encoder'))
+        os.chmod(encoder, stat.S_IRWXU)
+        self.assertEqual(animation._which('encoder'), encoder)
+        self.assertEqual(animation._which(encoder), encoder)
+        self.assertIsNone(animation._which('missing'))
+        self.assertIsNone(animation._which(self.tmpdir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from obspy.imaging.beachball import beach
+
+from beachball_cache import BeachballCache
+
+
+class TestBeachballCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = BeachballCache()
+
+    def test_beach_axes(self):
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
+        col = self.cache.beach([200, 26, 56], xy=(0.3, 0.6), width=30, axes=ax)
+        ax.add_collection(col)
+        fig.canvas.draw()
+        np.testing.assert_allclose(col.get_offsets(), [[0.3, 0.6]])
+        self.assertIs(col.get_offset_transform(), ax.transData)
+
+    def test_same_geometry_as_obspy(self):
+        for fm in ([200, 26, 56], [1., -2., 1., 0.5, 0.3, -0.2]):
+            expected = beach(fm, xy=(1, 2), width=3)
+            col = self.cache.beach(fm, xy=(1, 2), width=3)
+            self.assertEqual(len(col.get_paths()), len(expected.get_paths()))
+            for p, q in zip(col.get_paths(), expected.get_paths()):
+                np.testing.assert_allclose(p.vertices, q.vertices, atol=1.e-9)
+
+    def test_mt_key_tolerance(self):
+        mt = np.array([1., -2., 1., 0.5, 0.3, -0.2])
+        step = np.radians(self.cache.resolution)
+        norm = np.sqrt(0.5 * (mt[:3]**2).sum() + (mt[3:]**2).sum())
+        # same key for the scaled tensor, and within the tolerance
+        self.assertEqual(self.cache.key(mt), self.cache.key(1.e20 * mt))
+        self.assertEqual(self.cache.key(mt), self.cache.key(mt + [0.1 * step * norm, 0, 0, 0, 0, 0]))
+        self.assertNotEqual(self.cache.key(mt), self.cache.key(mt + [2 * step * norm, 0, 0, 0, 0, 0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
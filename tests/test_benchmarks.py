@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import benchmarks
+from catalog import load_foc_mec, MT_KEYS
+from moment_tensor_dec import sdrToMtArray
+
+
+class TestBaselines(unittest.TestCase):
+
+    def test_names(self):
+        names = [b[0] for b in benchmarks.BENCHMARKS]
+        for name, baseline in benchmarks.BASELINES.items():
+            self.assertIn(name, names)
+            self.assertIn(baseline, names)
+
+    def test_legacy_sdrToMt(self):
+        # the baseline computes the same thing as the code which replaced it
+        strike, dip, rake = benchmarks.random_mechanisms(50)[:3]
+        legacy = [benchmarks._legacy_sdrToMt(s, d, r)
+                  for s, d, r in zip(strike.tolist(), dip.tolist(), rake.tolist())]
+        np.testing.assert_allclose(legacy, sdrToMtArray(strike, dip, rake), atol=1.e-12)
+
+    def test_legacy_read_foc_mec_file(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'fm.txt')
+            benchmarks.write_foc_mec(benchmarks.random_catalog(20), filename)
+            fm = benchmarks._legacy_read_foc_mec_file(filename)
+            self.assertEqual(sorted(fm), range(1, 21))
+            np.testing.assert_array_equal([[fm[i][k] for k in MT_KEYS] for i in sorted(fm)],
+                                          load_foc_mec(filename))
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
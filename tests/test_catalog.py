@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+'''
+run from the directory of the scripts: python -m unittest discover -s tests
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import catalog
+
+
+CMTSOLUTION = '''{header}
+event name:     201410151116A
+time shift:      8.2300
+half duration:   1.5000
+latitude:       64.6000
+longitude:     -17.3000
+depth:          12.0000
+Mrr:      -3.260000e+24
+Mtt:       1.960000e+24
+Mpp:       1.300000e+24
+Mrt:      -6.790000e+22
+Mrp:      -6.030000e+23
+Mtp:      -2.030000e+23
+'''
+
+HEADERS = ('PDEQ2014 10 15 11 16 34.00  64.4500  -18.0400  10.0 0.0 5.1 ICELAND',
+           'PDE 2014 10 15 11 16 34.00  64.4500  -18.0400  10.0 0.0 5.1 ICELAND',
+           ' PDEQ2014 10 15 11 16 34.00  64.4500  -18.0400  10.0 0.0 5.1 ICELAND',
+           ' PDE 2014 10 15 11 16 34.00  64.4500  -18.0400  10.0 0.0 5.1 ICELAND')
+
+
+class TestCmtsolution(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, text):
+        filename = os.path.join(self.tmpdir, 'event.txt')
+        with open(filename, 'w') as f:
+            f.write(text)
+        return filename
+
+    def test_headers(self):
+        for header in HEADERS:
+            filename = self.write(CMTSOLUTION.format(header=header) * 2)
+            self.assertEqual(catalog.guess_format(filename), 'cmt')
+            cat = catalog.load_catalog(filename)
+            self.assertEqual(len(cat), 2, header)
+            self.assertEqual(str(cat['time'][0]), '2014-10-15T11:16:34.000', header)
+            self.assertEqual(cat['mag'][0], 5.1)
+            self.assertEqual(cat['event'][0], b'201410151116A')
+            np.testing.assert_allclose(catalog.moment_tensors(cat)[0, 0], -3.26e24)
+
+    def test_invalid_header(self):
+        filename = self.write(CMTSOLUTION.format(header='PDEQ 10 15 11 16 34.00'))
+        self.assertRaises(ValueError, catalog.load_catalog, filename)
+
+
+class TestFocMec(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'fm.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def load(self, text, chunksize=65536, columns=None):
+        with open(self.filename, 'w') as f:
+            f.write(text)
+        return catalog.load_foc_mec(self.filename, chunksize=chunksize, columns=columns)
+
+    def test_columns(self):
+        text = '# Mrr Mtt Mpp Mrt Mrp Mtp lon lat\n1 2 3 4 5 6 7 8\n\n\t-1 -2 -3 -4 -5 -6 -7 -8'
+        for chunksize in (1, 2, 100):
+            fm = self.load(text, chunksize=chunksize)
+            np.testing.assert_array_equal(fm, [np.arange(1, 9), -np.arange(1, 9)])
+
+    def test_allowed_columns(self):
+        # nodal planes or moment tensors, as read by plot_beachball.py
+        np.testing.assert_array_equal(self.load('200 26 56\n0 45 -90\n', columns=(3, 6)),
+                                      [[200, 26, 56], [0, 45, -90]])
+        self.assertEqual(self.load('# empty\n', columns=(3, 6)).shape, (0, 3))
+        self.assertIn('expected 3 or 6 columns, got 4', self.error('1 2 3 4\n', (3, 6)))
+        self.assertIn('expected 6, 7, 8, 9 or 10 columns, got 3', self.error('200 26 56\n', None))
+        # the other lines have the number of columns of the first one
+        self.assertIn('line 2:', self.error('200 26 56\n1 2 3 4 5 6\n', (3, 6)))
+
+    def error(self, text, columns):
+        try:
+            self.load(text, columns=columns)
+        except ValueError as e:
+            return str(e)
+        self.fail('no error')
+
+    def assertLineError(self, text, lineno):
+        try:
+            self.load(text)
+        except ValueError as e:
+            self.assertIn('line {}:'.format(lineno), str(e))
+        else:
+            self.fail('no error')
+
+    def test_shifted_columns(self):
+        # a short line then a long one: the same number of values in the chunk
+        self.assertLineError('1 2 3 4 5 6 7\n1 2 3 4 5 6\n# comment\n1 2 3 4 5 6 7 8\n', 2)
+        self.assertLineError('1 2 3 4 5 6 7\n\n1 2 3 4 5 6 7 8\n1 2 3 4 5 6\n', 3)
+
+    def test_invalid_number(self):
+        self.assertLineError('1 2 3 4 5 6\n1 2 3 x 5 6\n', 2)
+
+
+class TestCachedArray(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmpdir, 'fm.txt')
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+        self.parsed = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, text, mtime):
+        with open(self.source, 'w') as f:
+            f.write(text)
+        os.utime(self.source, (mtime, mtime))
+
+    def read_chunks(self, filename):
+        self.parsed += 1
+        return catalog.read_foc_mec(filename)
+
+    def cached(self):
+        return catalog.cached_array(self.source, self.read_chunks, ('f8', (6,)),
+                                    cache_dir=self.cache_dir)
+
+    def test_invalidation(self):
+        self.write('1 2 3 4 5 6\n', 1000000000)
+        np.testing.assert_array_equal(self.cached(), [[1, 2, 3, 4, 5, 6]])
+        self.assertEqual(self.parsed, 1)
+        self.assertIsInstance(self.cached(), np.memmap)
+        self.assertEqual(self.parsed, 1)
+
+        # touched only: same content, the cache is reused
+        self.write('1 2 3 4 5 6\n', 1000000100)
+        np.testing.assert_array_equal(self.cached(), [[1, 2, 3, 4, 5, 6]])
+        self.assertEqual(self.parsed, 1)
+
+        # same size, new mtime, different content
+        self.write('6 5 4 3 2 1\n', 1000000200)
+        np.testing.assert_array_equal(self.cached(), [[6, 5, 4, 3, 2, 1]])
+        self.assertEqual(self.parsed, 2)
+
+        # new size
+        self.write('6 5 4 3 2 1\n1 1 1 1 1 1\n', 1000000200)
+        self.assertEqual(len(self.cached()), 2)
+        self.assertEqual(self.parsed, 3)
+        self.cached()
+        self.assertEqual(self.parsed, 3)
+
+    def test_tags(self):
+        self.write('1 2 3 4 5 6\n', 1000000000)
+        catalog.cached_array(self.source, self.read_chunks, ('f8', (6,)), tag='a',
+                             cache_dir=self.cache_dir)
+        catalog.cached_array(self.source, self.read_chunks, ('f8', (6,)), tag='b',
+                             cache_dir=self.cache_dir)
+        self.assertEqual(self.parsed, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
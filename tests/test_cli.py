@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import csv
+import unittest
+from StringIO import StringIO
+
+import numpy as np
+
+from tools.cli import run, read_records
+
+
+def _args(**kwargs):
+    options = dict(format='csv', header=True, chunksize=2, unit='s', dyne=False)
+    options.update(kwargs)
+    return argparse.Namespace(**options)
+
+
+def _run(command, text, **kwargs):
+    out = StringIO()
+    run(command, [], _args(**kwargs), stdin=StringIO(text), stdout=out)
+    return list(csv.DictReader(StringIO(out.getvalue())))
+
+
+class TestCli(unittest.TestCase):
+
+    def test_read_records(self):
+        chunks = list(read_records(StringIO('# tensors\n1 2 3\n\n4,5,6\n7, 8 ,9\n'), 3, chunksize=2))
+        self.assertEqual([c.tolist() for c in chunks],
+                         [[['1', '2', '3'], ['4', '5', '6']], [['7', '8', '9']]])
+        self.assertRaises(ValueError, list, read_records(StringIO('1 2\n'), 3))
+
+    def test_dates_with_spaces(self):
+        chunks = list(read_records(StringIO('2014-10-15 11:16:34\n2014-10-15T11:16:35\n'), 1))
+        self.assertEqual(chunks[0].tolist(), [['2014-10-15 11:16:34'], ['2014-10-15T11:16:35']])
+
+    def test_date_round_trip(self):
+        timestamps = [0., 1413371794.5, -86400., 1.e9 + 0.001]
+        dates = _run('timestamp2date', '\n'.join(repr(t) for t in timestamps), unit='ms')
+        self.assertEqual(dates[1]['date'], '2014-10-15 11:16:34.500')
+        back = _run('date2timestamp', '\n'.join(row['date'] for row in dates), unit='ms')
+        np.testing.assert_allclose([float(row['timestamp']) for row in back], timestamps,
+                                   rtol=0, atol=1.e-6)
+
+    def test_mw2m0(self):
+        rows = _run('mw2m0', '5.5\n6\n7.2\n')
+        self.assertEqual(len(rows), 3)
+        np.testing.assert_allclose(float(rows[1]['M0_Nm']), 10**(1.5 * 6 + 9.1))
+        np.testing.assert_allclose(float(rows[1]['Es_joules']), 1.6e-5 * 10**(1.5 * 6 + 9.1))
+
+    def test_m02mw_energy(self):
+        # the same energy in joules from M0 in N.m and in dyne.cm
+        for text, dyne in (('1.2589254e18\n', False), ('1.2589254e25\n', True)):
+            row = _run('m02mw', text, dyne=dyne)[0]
+            np.testing.assert_allclose(float(row['Mw']), 6., atol=1.e-7)
+            np.testing.assert_allclose(float(row['Es_joules']), 2.0142807e13, rtol=1.e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
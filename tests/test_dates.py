@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+import calendar
+import os
+import time
+import unittest
+
+import numpy as np
+
+from date2timestamp import date_to_timestamp, dates_to_timestamps
+from timestamp2date import timestamp_to_date, timestamps_to_dates
+
+
+class TestDates(unittest.TestCase):
+
+    def setUp(self):
+        # the per-value functions use the local time
+        self.tz = os.environ.get('TZ')
+        os.environ['TZ'] = 'UTC'
+        time.tzset()
+
+    def tearDown(self):
+        if self.tz is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = self.tz
+        time.tzset()
+
+    def test_same_as_per_value(self):
+        timestamps = np.random.RandomState(0).randint(-10**9, 2 * 10**9, 1000)
+        dates = timestamps_to_dates(timestamps)
+        self.assertEqual(dates.tolist(), [timestamp_to_date(t) for t in timestamps])
+        iso = timestamps_to_dates(timestamps, sep='T')
+        np.testing.assert_array_equal(dates_to_timestamps(iso),
+                                      [date_to_timestamp(d) for d in iso])
+        np.testing.assert_array_equal(dates_to_timestamps(iso), timestamps)
+
+    def test_utc_whatever_the_local_time(self):
+        os.environ['TZ'] = 'Europe/Paris'
+        time.tzset()
+        self.assertEqual(dates_to_timestamps('2014-10-15T11:16:34'),
+                         calendar.timegm((2014, 10, 15, 11, 16, 34)))
+        self.assertEqual(timestamps_to_dates(1413371794), '2014-10-15 11:16:34')
+
+    def test_sub_second(self):
+        self.assertEqual(dates_to_timestamps('2014-10-15T11:16:34.123456'), 1413371794.123456)
+        # finer digits are truncated
+        self.assertEqual(dates_to_timestamps('2014-10-15 11:16:34.123456', unit='ms'), 1413371794.123)
+        self.assertEqual(dates_to_timestamps('1969-12-31T23:59:59.5', unit='ms'), -0.5)
+        self.assertEqual(timestamps_to_dates([1413371794.1236, -0.5], unit='ms').tolist(),
+                         ['2014-10-15 11:16:34.124', '1969-12-31 23:59:59.500'])
+        self.assertEqual(dates_to_timestamps('2014-10-15'), 1413331200.)
+
+
+if __name__ == '__main__':
+    unittest.main()
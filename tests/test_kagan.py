@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+'''
+The Kagan angles from the quaternions against the minimum rotation between
+the principal axes (computed event by event), and the pairs of the kd-tree
+against an exhaustive search.
+'''
+
+import unittest
+
+import numpy as np
+
+from kagan import sdr_quaternions, quaternions, kagan_angle, kagan_pairs, KaganIndex
+from moment_tensor_dec import mt_matrices, sdrToMtArray
+
+
+# rotations of 180 degrees around T, B and P, which leave a double couple unchanged
+_SYMMETRIES = [np.diag(d) for d in ((1., 1., 1.), (1., -1., -1.), (-1., 1., -1.), (-1., -1., 1.))]
+
+
+def _frame(mt):
+    # T, B, P axes (columns) of a moment tensor, right-handed
+    val, vec = np.linalg.eigh(mt_matrices(mt)[0])
+    t, p = vec[:, np.argmax(val)], vec[:, np.argmin(val)]
+    return np.column_stack((t, np.cross(p, t), p))
+
+
+def _brute_force_angle(mt1, mt2):
+    r1, r2 = _frame(mt1), _frame(mt2)
+    angles = []
+    for s in _SYMMETRIES:
+        # angle of the rotation r2 s r1^T
+        cos = (np.trace(np.dot(np.dot(r2, s), r1.T)) - 1.) / 2.
+        angles.append(np.degrees(np.arccos(np.clip(cos, -1., 1.))))
+    return min(angles)
+
+
+def _random_mt(n, seed=0):
+    rng = np.random.RandomState(seed)
+    return rng.normal(size=(n, 6))
+
+
+def _pairs_set(i, j, angle):
+    return dict(((a, b), c) for a, b, c in zip(i, j, angle))
+
+
+class TestKaganAngle(unittest.TestCase):
+
+    def test_brute_force(self):
+        mt1, mt2 = _random_mt(300), _random_mt(300, seed=1)
+        angles = kagan_angle(quaternions(mt1), quaternions(mt2))
+        expected = [_brute_force_angle(a, b) for a, b in zip(mt1, mt2)]
+        np.testing.assert_allclose(angles, expected, rtol=0, atol=1.e-9)
+        self.assertTrue(((angles >= 0.) & (angles <= 120.)).all())
+
+    def test_sdr(self):
+        strike, dip, rake = np.random.RandomState(2).uniform([0., 0., -180.], [360., 90., 180.],
+                                                             (200, 3)).T
+        # the same orientation from the planes and from their tensors
+        np.testing.assert_allclose(kagan_angle(sdr_quaternions(strike, dip, rake),
+                                               quaternions(sdrToMtArray(strike, dip, rake))),
+                                   0., atol=1.e-5)
+        # the auxiliary plane is the same double couple
+        np.testing.assert_allclose(kagan_angle(sdr_quaternions(321, 69, -173),
+                                               sdr_quaternions(228.2, 83.3, -21.3)), 0., atol=0.5)
+        # a vertical strike-slip fault turned around the vertical
+        q = sdr_quaternions(np.zeros(5), 90., 0.)
+        np.testing.assert_allclose(kagan_angle(q, sdr_quaternions([10., 30., 60., 90., 100.], 90., 0.)),
+                                   [10., 30., 60., 90., 80.], atol=1.e-9)
+
+
+class TestPairs(unittest.TestCase):
+
+    def setUp(self):
+        self.q = quaternions(_random_mt(400, seed=3))
+        # all the pairs
+        i, j = np.triu_indices(len(self.q), 1)
+        self.angles = kagan_angle(self.q[i], self.q[j])
+        self.i, self.j = i, j
+
+    def expected(self, max_angle):
+        sel = self.angles <= max_angle
+        return _pairs_set(self.i[sel], self.j[sel], self.angles[sel])
+
+    def assertSamePairs(self, pairs, expected):
+        pairs = _pairs_set(*pairs)
+        self.assertEqual(sorted(pairs), sorted(expected))
+        for ij in expected:
+            self.assertAlmostEqual(pairs[ij], expected[ij], places=9)
+
+    def test_kagan_pairs(self):
+        for max_angle in (5., 25.):
+            expected = self.expected(max_angle)
+            self.assertTrue(expected)
+            for blocksize in (64, 2048):
+                self.assertSamePairs(kagan_pairs(self.q, max_angle, blocksize=blocksize), expected)
+
+    def test_index_pairs(self):
+        index = KaganIndex(self.q)
+        self.assertEqual(len(index), 400)
+        for max_angle in (5., 25., 120.):
+            expected = self.expected(max_angle)
+            self.assertSamePairs(index.query_pairs(max_angle), expected)
+            chunks = list(index.iter_pairs(max_angle, chunksize=50))
+            self.assertEqual(len(chunks), 8)
+            self.assertSamePairs([np.concatenate(c) for c in zip(*chunks)], expected)
+        self.assertEqual([len(a) for a in KaganIndex(self.q[:1]).query_pairs(10.)], [0, 0, 0])
+
+    def test_query(self):
+        index = KaganIndex(self.q)
+        for k in (0, 17, 399):
+            idx, angle = index.query(self.q[k], 30.)
+            all_angles = kagan_angle(self.q[k], self.q)
+            np.testing.assert_array_equal(np.sort(idx), np.flatnonzero(all_angles <= 30.))
+            np.testing.assert_allclose(angle, all_angles[idx], atol=1.e-12)
+            self.assertTrue((np.diff(angle) >= 0.).all())
+            self.assertEqual(idx[0], k)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import numpy as np
+
+from magnitude import moment2Mw, Mw2moment, energy
+
+
+class TestMagnitude(unittest.TestCase):
+
+    def test_mw6(self):
+        m0 = Mw2moment(6.)
+        self.assertAlmostEqual(m0 / 1.e18, 1.2589254, 6)
+        self.assertAlmostEqual(Mw2moment(6., unit='dyne.cm') / 1.e25, 1.2589254, 6)
+        # Es = 1.6e-5 M0 in N.m, whatever the unit of M0
+        self.assertAlmostEqual(energy(m0, unit='N.m') / 1.e13, 2.0142807, 6)
+        self.assertAlmostEqual(energy(m0 * 1.e7) / 1.e13, 2.0142807, 6)
+
+    def test_round_trip(self):
+        mw = np.random.RandomState(0).uniform(2., 9.5, 1000)
+        for unit in ('N.m', 'dyne.cm'):
+            np.testing.assert_allclose(moment2Mw(Mw2moment(mw, unit=unit), unit=unit), mw,
+                                       rtol=0, atol=1.e-12)
+        # the same magnitudes from both units
+        np.testing.assert_allclose(Mw2moment(mw, unit='dyne.cm'), Mw2moment(mw) * 1.e7)
+        np.testing.assert_allclose(moment2Mw(Mw2moment(mw), unit='N.m'),
+                                   moment2Mw(Mw2moment(mw) * 1.e7))
+
+    def test_scalars_and_out(self):
+        self.assertIsInstance(moment2Mw(1.e25), float)
+        self.assertIsInstance(Mw2moment([6.])[0], np.floating)
+        m0 = Mw2moment(np.array([5., 6., 7.]))
+        out = np.empty(3)
+        self.assertIs(moment2Mw(m0, out=out, unit='N.m'), out)
+        np.testing.assert_allclose(out, [5., 6., 7.])
+        self.assertIs(energy(m0, out=out, unit='N.m'), out)
+        np.testing.assert_allclose(out, 1.6e-5 * m0)
+        self.assertRaises(ValueError, energy, m0, unit='J')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+'''
+The vectorized computations against the scalar functions of the scripts
+(main) and against obspy's aux_plane, mt2axes and mt2plane, on random
+mechanisms.
+'''
+
+import os
+import sys
+import unittest
+
+import numpy as np
+from obspy.imaging.beachball import MomentTensor, aux_plane as obspy_aux_plane, mt2axes, mt2plane
+
+import moment_tensor_dec
+from moment_tensor_dec import (aux_plane, principal_axes, mt2planes, sdrToMtArray, decompose,
+                               eigen_decomposition, _fault_vectors)
+
+
+def _random_sdr(n, seed=0):
+    rng = np.random.RandomState(seed)
+    strike = rng.uniform(0., 360., n)
+    # away from the horizontal and vertical planes, where strike or rake are
+    # not defined
+    dip = rng.uniform(1., 89., n)
+    rake = rng.uniform(-180., 180., n)
+    return strike, dip, rake
+
+
+def _random_mt(n, seed=0):
+    rng = np.random.RandomState(seed + 1)
+    return rng.normal(size=(n, 6)) * 1.e24
+
+
+def _angle_diff(a, b):
+    return np.abs(np.mod(np.asarray(a) - np.asarray(b) + 180., 360.) - 180.)
+
+
+def _axis_vectors(plunge, azimuth):
+    plunge, azimuth = np.radians(plunge), np.radians(azimuth)
+    return np.array([np.cos(plunge) * np.cos(azimuth),
+                     np.cos(plunge) * np.sin(azimuth),
+                     np.sin(plunge)])
+
+
+def _rtp(v):
+    # (north, east, down) vectors of _axis_vectors in (r, t, p), in the
+    # layout of the vec field of eigen_decomposition (event, component, axis)
+    return np.array([-v[2], -v[0], v[1]]).transpose(1, 0, 2)
+
+
+def _same_plane(p, q, atol=1.e-6):
+    # same normal and slip vectors (the pair of vectors of a plane is
+    # defined up to a common sign)
+    n1, s1 = _fault_vectors(*p)
+    n2, s2 = _fault_vectors(*q)
+    sign = np.sign((n1 * n2).sum())
+    return np.allclose(n1, sign * n2, atol=atol) and np.allclose(s1, sign * s2, atol=atol)
+
+
+def _main(mt):
+    # moment_tensor_dec.main prints the matrices
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        return moment_tensor_dec.main(*mt)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+class TestDecompose(unittest.TestCase):
+
+    def test_main(self):
+        mt = _random_mt(200)
+        iso, clvd, dc = decompose(mt)
+        for i in range(len(mt)):
+            np.testing.assert_allclose([iso[i], clvd[i], dc[i]], _main(mt[i]),
+                                       rtol=1.e-9, atol=1.e-9)
+
+    def test_eigen_decomposition(self):
+        mt = _random_mt(50)
+        dec = eigen_decomposition(mt)
+        for k, v in zip(('iso', 'clvd', 'dc'), decompose(mt)):
+            np.testing.assert_allclose(dec[k], v, rtol=1.e-12, atol=1.e-9)
+        val, plunge, azimuth = principal_axes(mt)
+        np.testing.assert_array_equal(dec['val'], val)
+        np.testing.assert_array_equal(dec['plunge'], plunge)
+        np.testing.assert_array_equal(dec['azimuth'], azimuth)
+        np.testing.assert_array_equal(dec['m0'], 0.5 * (val[:, 0] - val[:, 2]))
+
+    def test_eigenvectors(self):
+        mt = _random_mt(50)
+        dec = eigen_decomposition(mt)
+        m = moment_tensor_dec.mt_matrices(mt)
+        vec = dec['vec']
+        # orthonormal T, N, P columns, M v = lambda v
+        np.testing.assert_allclose(np.einsum('nji,njk->nik', vec, vec),
+                                   np.tile(np.eye(3), (len(mt), 1, 1)), atol=1.e-12)
+        np.testing.assert_allclose(np.einsum('nij,njk->nik', m, vec),
+                                   vec * dec['val'][:, np.newaxis, :], rtol=0, atol=1.e12)
+        self.assertTrue((np.diff(dec['val'], axis=1) <= 0.).all())
+        # the plunge and azimuth of the vectors
+        np.testing.assert_allclose(np.abs((vec * _rtp(_axis_vectors(dec['plunge'], dec['azimuth'])))
+                                          .sum(axis=1)), 1., atol=1.e-9)
+
+    def test_scalar_moment(self):
+        m0 = 10.**np.random.RandomState(2).uniform(16., 22., 20)
+        mt = sdrToMtArray(*_random_sdr(20)) * np.sqrt(2.) * m0[:, np.newaxis]
+        np.testing.assert_allclose(eigen_decomposition(mt)['m0'], m0, rtol=1.e-12)
+
+    def test_out(self):
+        mt = _random_mt(20)
+        out = np.zeros(30, dtype=moment_tensor_dec.DECOMPOSITION_DTYPE)
+        self.assertIs(eigen_decomposition(mt, out=out[5:25]).base, out)
+        expected = eigen_decomposition(mt)
+        for k in expected.dtype.names:
+            np.testing.assert_array_equal(out[5:25][k], expected[k])
+        self.assertTrue((out['m0'][:5] == 0.).all() and (out['m0'][25:] == 0.).all())
+
+    def test_double_couple(self):
+        iso, clvd, dc = decompose(sdrToMtArray(*_random_sdr(20)))
+        np.testing.assert_allclose(iso, 0., atol=1.e-9)
+        np.testing.assert_allclose(clvd, 0., atol=1.e-6)
+        np.testing.assert_allclose(dc, 100., atol=1.e-6)
+
+    def test_isotropic(self):
+        # no deviatoric part: pure ISO, and the zero tensor
+        mt = [[1., 1., 1., 0., 0., 0.], [-2.e20, -2.e20, -2.e20, 0., 0., 0.], [0.] * 6]
+        iso, clvd, dc = decompose(mt)
+        np.testing.assert_array_equal(iso, [100., -100., 0.])
+        np.testing.assert_array_equal(clvd, [0., 0., 0.])
+        np.testing.assert_array_equal(dc, [0., 0., 0.])
+        self.assertTrue(np.isfinite(eigen_decomposition(mt)['clvd']).all())
+
+
+def _scalar_sdrToMt(strike, dip, rake):
+    # ternary_plot.sdrToMt before its vectorization
+    from math import sqrt, sin, cos
+    degtorad = np.pi / 180.
+    strike *= degtorad
+    dip *= degtorad
+    rake *= degtorad
+    is2 = 1 / sqrt(2.0)
+    mrr = is2*( sin(2*dip) * sin(rake) )
+    mtt = -is2*( sin(dip) * cos(rake) * sin(2*strike) + sin(2*dip) * sin(rake) * sin(strike)**2 )
+    mpp = is2*( sin(dip) * cos(rake) * sin(2*strike) - sin(2*dip) * sin(rake) * cos(strike)**2 )
+    mtp = -is2*( sin(dip) * cos(rake) * cos(2*strike) + 0.5*sin(2*dip) * sin(rake) * sin(2*strike) )
+    mrp = is2*( cos(dip) * cos(rake) * sin(strike) - cos(2*dip) * sin(rake) * cos(strike))
+    mrt = -is2*( cos(dip) * cos(rake) * cos(strike) + cos(2*dip) * sin(rake) * sin(strike) )
+    return mrr, mtt, mpp, mrt, mrp, mtp
+
+
+class TestSdrToMt(unittest.TestCase):
+
+    def test_scalar(self):
+        strike, dip, rake = _random_sdr(500)
+        mt = sdrToMtArray(strike, dip, rake)
+        expected = [_scalar_sdrToMt(*sdr) for sdr in zip(strike, dip, rake)]
+        np.testing.assert_allclose(mt, expected, rtol=0, atol=1.e-12)
+
+    def test_out_and_blocksize(self):
+        strike, dip, rake = _random_sdr(100)
+        expected = sdrToMtArray(strike, dip, rake)
+        out = np.empty((100, 6))
+        self.assertIs(sdrToMtArray(strike, dip, rake, out=out, blocksize=7), out)
+        np.testing.assert_array_equal(out, expected)
+        self.assertRaises(ValueError, sdrToMtArray, strike, dip, rake, out=np.empty((99, 6)))
+
+    def test_broadcast(self):
+        mt = sdrToMtArray(321., [69., 30.], -173.)
+        np.testing.assert_allclose(mt, [_scalar_sdrToMt(321., 69., -173.),
+                                        _scalar_sdrToMt(321., 30., -173.)], atol=1.e-12)
+        self.assertEqual(sdrToMtArray(321, 69, -173).shape, (1, 6))
+
+
+class TestObspy(unittest.TestCase):
+
+    n = 500
+
+    def test_aux_plane(self):
+        strike, dip, rake = _random_sdr(self.n)
+        s2, d2, r2 = aux_plane(strike, dip, rake)
+        for i in range(self.n):
+            expected = obspy_aux_plane(strike[i], dip[i], rake[i])
+            self.assertLess(_angle_diff(s2[i], expected[0]), 1.e-6)
+            self.assertLess(abs(d2[i] - expected[1]), 1.e-6)
+            self.assertLess(_angle_diff(r2[i], expected[2]), 1.e-6)
+
+    def test_principal_axes(self):
+        mt = _random_mt(self.n)
+        val, plunge, azimuth = principal_axes(mt)
+        vectors = _axis_vectors(plunge, azimuth)
+        for i in range(self.n):
+            axes = mt2axes(MomentTensor(mt[i], 0))
+            np.testing.assert_allclose(val[i], [a.val for a in axes], rtol=1.e-9, atol=1.e10)
+            expected = _axis_vectors([a.dip for a in axes], [a.strike for a in axes])
+            # an horizontal axis may point to either side
+            np.testing.assert_allclose(np.abs((vectors[:, i] * expected).sum(axis=0)), 1., atol=1.e-9)
+            np.testing.assert_allclose(plunge[i], [a.dip for a in axes], atol=1.e-6)
+
+    def test_mt2planes(self):
+        for mt in (_random_mt(self.n), sdrToMtArray(*_random_sdr(self.n))):
+            np1, np2 = mt2planes(mt)
+            for i in range(len(mt)):
+                p1 = mt2plane(MomentTensor(mt[i], 0))
+                p1 = (p1.strike, p1.dip, p1.rake)
+                p2 = obspy_aux_plane(*p1)
+                # the same pair of planes, in any order
+                self.assertTrue((_same_plane(np1[i], p1) and _same_plane(np2[i], p2)) or
+                                (_same_plane(np1[i], p2) and _same_plane(np2[i], p1)), i)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmarks import random_catalog, write_ndk
+from catalog import moment_tensors
+from moment_tensor_dec import eigen_decomposition
+from pipeline import run_pipeline, open_writer, COLUMN_DTYPES
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.catalog = os.path.join(self.tmpdir, 'catalog.ndk')
+        self.events = random_catalog(537)
+        write_ndk(self.events, self.catalog)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_pipeline(self, output, catalog=None, **kwargs):
+        output = os.path.join(self.tmpdir, output)
+        writer = open_writer(output)
+        try:
+            count = run_pipeline(catalog or self.catalog, writer, **kwargs)
+        finally:
+            writer.close()
+        return count, output
+
+    def read_columns(self, directory):
+        with open(os.path.join(directory, 'columns.json')) as f:
+            meta = json.load(f)
+        return meta, dict((k, np.load(os.path.join(directory, k + '.npy'))) for k in meta['columns'])
+
+    def test_processes(self):
+        # the same results in the same order, in one process or with shared blocks
+        outputs = {}
+        for name, kwargs in (('one', {'processes': 1}),
+                             ('pool', {'processes': 3, 'chunksize': 100, 'blocks': 2})):
+            count, csv_file = self.run_pipeline(name + '.csv', **kwargs)
+            self.assertEqual(count, 537)
+            _, columns = self.run_pipeline(name + '_columns', **kwargs)
+            with open(csv_file) as f:
+                outputs[name] = f.read(), self.read_columns(columns)
+        self.assertEqual(outputs['one'][0], outputs['pool'][0])
+        self.assertEqual(len(outputs['one'][0].splitlines()), 538)
+        meta, one = outputs['one'][1]
+        self.assertEqual(meta, outputs['pool'][1][0])
+        self.assertEqual(meta['rows'], 537)
+        self.assertEqual(meta['columns'], list(COLUMN_DTYPES))
+        for k in meta['columns']:
+            np.testing.assert_array_equal(one[k], outputs['pool'][1][1][k])
+
+        np.testing.assert_array_equal(one['event'], self.events['event'])
+        dec = eigen_decomposition(moment_tensors(self.events))
+        np.testing.assert_allclose(one['dc'], dec['dc'], rtol=1.e-3, atol=0.1)
+        np.testing.assert_allclose(one['T_plg'], dec['plunge'][:, 0], atol=0.1)
+
+    def test_empty(self):
+        empty = os.path.join(self.tmpdir, 'empty.ndk')
+        open(empty, 'w').close()
+        for processes in (1, 3):
+            count, csv_file = self.run_pipeline('empty{}.csv'.format(processes), empty,
+                                                processes=processes)
+            self.assertEqual(count, 0)
+            with open(csv_file) as f:
+                self.assertEqual(len(f.read().splitlines()), 1)
+            _, columns = self.run_pipeline('empty{}'.format(processes), empty,
+                                           processes=processes)
+            meta, data = self.read_columns(columns)
+            self.assertEqual(meta['rows'], 0)
+            self.assertEqual(data['mw'].shape, (0,))
+            self.assertEqual(data['time'].dtype, np.dtype('datetime64[ms]'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.image import imread
+
+from beachball_cache import BeachballCache
+from plot_beachball import draw_batch
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestDrawBatch(unittest.TestCase):
+
+    mechanisms = np.array([[200., 26., 56.], [321., 69., -173.], [0., 45., -90.],
+                           [10., 80., 0.]])
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def draw(self, subdir, mechanisms, **kwargs):
+        os.mkdir(os.path.join(self.tmpdir, subdir))
+        template = os.path.join(self.tmpdir, subdir, kwargs.pop('template', 'bb_{index:03d}.png'))
+        count, _ = draw_batch(mechanisms, template=template, **kwargs)
+        return count, dict((f, imread(os.path.join(self.tmpdir, subdir, f)))
+                           for f in sorted(os.listdir(os.path.join(self.tmpdir, subdir))))
+
+    def test_processes(self):
+        # the same files, whatever the number of processes and the cache
+        count, one = self.draw('one', self.mechanisms, processes=1)
+        self.assertEqual(count, 4)
+        self.assertEqual(sorted(one), ['bb_000.png', 'bb_001.png', 'bb_002.png', 'bb_003.png'])
+        for subdir, kwargs in (('pool', {'processes': 2, 'chunksize': 1}),
+                               ('cache', {'processes': 2, 'resolution': 1.})):
+            _, images = self.draw(subdir, self.mechanisms, **kwargs)
+            self.assertEqual(sorted(images), sorted(one))
+            for f in one:
+                np.testing.assert_array_equal(images[f], one[f])
+        # each image is a different beachball
+        self.assertFalse(np.array_equal(one['bb_000.png'], one['bb_001.png']))
+
+    def test_cache_file(self):
+        # geometries stored by the main process, read by the workers
+        cache_file = os.path.join(self.tmpdir, 'beachballs')
+        _, one = self.draw('one', self.mechanisms, processes=1)
+        for subdir, processes in (('disk', 1), ('disk_pool', 2), ('disk_again', 2)):
+            _, images = self.draw(subdir, self.mechanisms, processes=processes,
+                                  cache_file=cache_file)
+            for f in one:
+                np.testing.assert_array_equal(images[f], one[f])
+        cache = BeachballCache(cache_file=cache_file, readonly=True)
+        try:
+            for fm in self.mechanisms:
+                cache.geometry(fm)
+            self.assertEqual((cache.disk_hits, cache.misses), (4, 0))
+        finally:
+            cache.close()
+
+    def test_moment_tensors_and_names(self):
+        mt = np.array([[1., -2., 1., 0.5, 0.3, -0.2], [-3.26, 1.96, 1.3, -0.068, -0.603, -0.203]])
+        count, images = self.draw('mt', mt, names=['A', 'B'], processes=1,
+                                  template='{name}_{index}.png')
+        self.assertEqual(count, 2)
+        self.assertEqual(sorted(images), ['A_0.png', 'B_1.png'])
+
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_script(self, *args, **kwargs):
+        env = dict(os.environ, MPLBACKEND='Agg')
+        with open(os.devnull, 'w') as null:
+            subprocess.check_call([sys.executable, os.path.join(SCRIPTS, 'plot_beachball.py')] +
+                                  list(args), stdout=null, env=env, **kwargs)
+
+    def test_infile(self):
+        infile = os.path.join(self.tmpdir, 'planes.txt')
+        with open(infile, 'w') as f:
+            f.write('# strike dip rake\n200 26 56\n\n0 45 -90\n')
+        template = os.path.join(self.tmpdir, 'bb_{index}.png')
+        self.run_script('--infile', infile, '--template', template, '-j', '1')
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['bb_0.png', 'bb_1.png', 'planes.txt'])
+        # malformed lines are rejected as in the other scripts
+        with open(infile, 'a') as f:
+            f.write('1 2 3 4 5 6\n')
+        with open(os.devnull, 'w') as null:
+            self.assertRaises(subprocess.CalledProcessError, self.run_script,
+                              '--infile', infile, '--template', template, stderr=null)
+
+    def test_single_event_cache(self):
+        # the beachball and its double couple are read from the disk cache
+        cache = os.path.join(self.tmpdir, 'cache')
+        fm = ['--fm', '1', '-2', '1', '0.5', '0.3', '-0.2', '--dc']
+        images = []
+        for name in ('first.png', 'second.png'):
+            output = os.path.join(self.tmpdir, name)
+            self.run_script(*(fm + ['-o', output, '--cache', cache]))
+            images.append(imread(output))
+        np.testing.assert_array_equal(images[0], images[1])
+        bb = BeachballCache(cache_file=os.path.join(cache, 'beachballs'), readonly=True)
+        try:
+            bb.geometry([1., -2., 1., 0.5, 0.3, -0.2])
+            self.assertEqual(bb.disk_hits, 1)
+        finally:
+            bb.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from results_store import ResultsStore, update_store
+from test_catalog import CMTSOLUTION, HEADERS
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestResultsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.catalog = os.path.join(self.tmpdir, 'catalog.txt')
+        self.store = os.path.join(self.tmpdir, 'store')
+        self.write(1)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, n):
+        with open(self.catalog, 'w') as f:
+            for i in range(n):
+                f.write(CMTSOLUTION.format(header=HEADERS[0]).replace(
+                    '201410151116A', 'EVENT{:08d}'.format(i)))
+
+    def mtimes(self):
+        return dict((name, os.stat(os.path.join(self.store, name)).st_mtime)
+                    for name in os.listdir(self.store))
+
+    def test_update(self):
+        _, added, changed, unchanged = update_store(self.catalog, self.store)
+        self.assertEqual((len(added), len(changed), unchanged), (1, 0, 0))
+        self.write(3)
+        store, added, changed, unchanged = update_store(self.catalog, self.store)
+        self.assertEqual((len(added), len(changed), unchanged), (2, 0, 1))
+        self.assertEqual(len(ResultsStore(self.store)), 3)
+        np.testing.assert_array_equal(store.lookup(['EVENT00000002', 'UNKNOWN']), [2, -1])
+
+    def run_script(self, *args):
+        with open(os.devnull, 'w') as null:
+            subprocess.check_call([sys.executable, os.path.join(SCRIPTS, 'moment_tensor_dec.py')] +
+                                  list(args), stdout=null)
+
+    def test_unchanged_store_not_written(self):
+        for run in (lambda: update_store(self.catalog, self.store),
+                    lambda: self.run_script('-c', self.catalog, '--store', self.store)):
+            shutil.rmtree(self.store, ignore_errors=True)
+            run()
+            before = self.mtimes()
+            os.utime(os.path.join(self.store, 'columns.json'), (0, 0))
+            run()
+            after = self.mtimes()
+            self.assertEqual(after['columns.json'], 0)
+            self.assertEqual(sorted(after), sorted(before))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+'''
+The numeric-only paths of the scripts must not import matplotlib or obspy
+(see "Startup time" in the README)
+'''
+
+import os
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+from obspy.imaging.beachball import aux_plane as obspy_aux_plane, mt2axes, MomentTensor
+
+from np1_np2TNP import np1_np2TNP
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules of the heavy dependencies imported, printed after the code
+HEAVY = '; print(sorted(m for m in ("matplotlib", "obspy") if m in sys.modules))'
+
+
+def _heavy_modules(code):
+    with open(os.devnull, 'w') as null:
+        out = subprocess.check_output([sys.executable, '-c', 'import sys; ' + code + HEAVY],
+                                      cwd=SCRIPTS, stderr=null)
+    return out.splitlines()[-1].strip()
+
+
+def _run_script(script, *args):
+    # the script run as __main__, in the interpreter which reports the modules
+    return ('sys.argv = {!r}; import runpy; runpy.run_path({!r}, run_name="__main__")'
+            .format([script] + list(args), script))
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_modules(self):
+        # the plotting modules only import matplotlib and obspy to draw
+        for module in ('np1_np2TNP', 'moment_tensor_dec', 'M02Mw', 'Mw2M0', 'magnitude',
+                       'date2timestamp', 'timestamp2date', 'catalog', 'ternary_plot',
+                       'plot_beachball'):
+            self.assertEqual(_heavy_modules('import ' + module), '[]', module)
+
+    def test_numeric_scripts(self):
+        for script, args in (('np1_np2TNP.py', ['321', '69', '-173']),
+                             ('moment_tensor_dec.py', ['-m', '1', '-2', '1', '0.5', '0.3', '-0.2']),
+                             ('M02Mw.py', ['1.e18']),
+                             ('Mw2M0.py', ['6'])):
+            self.assertEqual(_heavy_modules(_run_script(script, *args)), '[]', script)
+
+    def test_plotting_path(self):
+        # the check itself: drawing imports them
+        code = ('import plot_beachball; plot_beachball.BB(outputname=None).collection([0, 45, -90])')
+        self.assertEqual(_heavy_modules(code), "['matplotlib', 'obspy']")
+
+
+class TestNp1Np2TNP(unittest.TestCase):
+
+    def test_same_as_obspy(self):
+        # the results of the obspy functions used before
+        planes = [(321, 69, -173), (200, 26, 56), (0, 45, -90), (10, 80, 0)]
+        fm = np1_np2TNP(*np.transpose(planes))
+        for i, plane in enumerate(planes):
+            np.testing.assert_allclose(fm['np2'][i], obspy_aux_plane(*plane), atol=1.e-9)
+            t, n, p = mt2axes(MomentTensor(fm['mt'][i], 0))
+            np.testing.assert_allclose(fm['plunge'][i], [t.dip, n.dip, p.dip], atol=1.e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+
+from moment_tensor_dec import (ternary_classify, eigen_decomposition, principal_axes,
+                               sdrToMtArray, FAULT_TYPES)
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestTernaryClassify(unittest.TestCase):
+
+    def test_known_mechanisms(self):
+        # strike-slip, normal, reverse, oblique (odd)
+        mt = sdrToMtArray([0., 30., 60., 0.], [90., 45., 30., 45.], [0., -90., 90., 30.])
+        plunge, bary, fault_type = ternary_classify(mt)
+        self.assertEqual([FAULT_TYPES[k] for k in fault_type],
+                         ['strike-slip', 'normal', 'reverse', 'odd'])
+        np.testing.assert_allclose(bary[:2], np.eye(3)[:2], atol=1.e-12)
+        np.testing.assert_allclose(plunge[2], [75., 0., 15.], atol=1.e-9)
+
+    def test_rules(self):
+        rng = np.random.RandomState(0)
+        mt = rng.normal(size=(1000, 6))
+        plunge, bary, fault_type = ternary_classify(mt)
+        np.testing.assert_allclose(bary.sum(axis=1), 1.)
+        t, n, p = plunge.T
+        expected = np.where(n > 60., 0, np.where(p > 60., 1, np.where(t > 50., 2, 3)))
+        np.testing.assert_array_equal(fault_type, expected)
+        np.testing.assert_allclose(plunge, principal_axes(mt)[1])
+
+    def test_decomposition(self):
+        # same result from the moment tensors and from their decomposition
+        mt = np.random.RandomState(1).normal(size=(100, 6))
+        for a, b in zip(ternary_classify(mt), ternary_classify(eigen_decomposition(mt))):
+            np.testing.assert_allclose(a, b)
+
+    def test_headless(self):
+        out = subprocess.check_output(
+            [sys.executable, '-c', 'import sys, moment_tensor_dec; '
+             'moment_tensor_dec.ternary_classify([[1, 2, 3, 4, 5, 6]]); '
+             'print(sorted(m for m in ("matplotlib", "obspy") if m in sys.modules))'],
+            cwd=SCRIPTS)
+        self.assertEqual(out.strip(), b'[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+
+import ternary_plot
+from beachball_cache import BeachballCache
+from catalog import load_catalog, moment_tensors
+from moment_tensor_dec import sdrToMtArray, ternary_classify
+from results_store import ResultsStore
+from test_catalog import CMTSOLUTION, HEADERS
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestAnimate(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.mt = sdrToMtArray(rng.uniform(0, 360, 20), rng.uniform(1, 89, 20),
+                               rng.uniform(-180, 180, 20))
+        _, self.data, _ = ternary_classify(self.mt)
+        self.windows = [(0, 10, 'a'), (10, 20, 'b')]
+
+    def tearDown(self):
+        ternary_plot._frame_worker.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def test_worker_reads_the_disk_cache(self):
+        cache_file = os.path.join(self.tmpdir, 'beachballs')
+        cache = BeachballCache(cache_file=cache_file)
+        tri = ternary_plot.ternaryDiagram(bb_cache=cache)
+        tri.animate(self.data, self.mt, self.windows, os.path.join(self.tmpdir, 'a.gif'),
+                    processes=1)
+        cache.close()
+
+        # as in a worker process of animate
+        args = {'resolution': 1., 'maxsize': 4096, 'cache_file': cache_file}
+        ternary_plot._init_frame_worker({}, self.data, self.mt, None, 50, None, args)
+        worker_cache = ternary_plot._frame_worker['tri'].bb_cache
+        self.assertEqual(worker_cache.cache_file, cache_file)
+        self.assertTrue(worker_cache.readonly)
+        worker_cache.hits = worker_cache.disk_hits = worker_cache.misses = 0
+        ternary_plot._render_frame(self.windows[1])
+        self.assertEqual(worker_cache.misses, 0)
+        self.assertGreater(worker_cache.disk_hits, 0)
+        worker_cache.close()
+
+    def test_processes(self):
+        frames = []
+        for processes in (1, 2):
+            output = os.path.join(self.tmpdir, 'a{}.gif'.format(processes))
+            cache = BeachballCache(cache_file=os.path.join(self.tmpdir, 'bb{}'.format(processes)))
+            tri = ternary_plot.ternaryDiagram(bb_cache=cache)
+            self.assertEqual(tri.animate(self.data, self.mt, self.windows, output,
+                                         processes=processes), 2)
+            cache.close()
+            with open(output, 'rb') as f:
+                frames.append(f.read())
+        self.assertEqual(frames[0], frames[1])
+
+
+class TestDensity(unittest.TestCase):
+
+    def setUp(self):
+        self.tri = ternary_plot.ternaryDiagram()
+        self.tri.background()
+
+    def tearDown(self):
+        import matplotlib.pyplot as plt
+        plt.close('all')
+
+    def test_counts(self):
+        # strike-slip, normal, reverse vertices, and the center
+        data = np.array([[1., 0., 0.]] * 5 + [[0., 1., 0.]] * 3 + [[0., 0., 1.]] * 2 +
+                        [[1., 1., 1.]] * 4)
+        pc = self.tri.plot_density(data, nbins=4)
+        counts = np.asarray(pc.get_array())
+        self.assertEqual(counts.sum(), len(data))
+        self.assertEqual(sorted(counts[counts > 0].tolist()), [2, 3, 4, 5])
+
+    def test_mechanisms(self):
+        mt = sdrToMtArray([0., 30., 60., 10.], [90., 45., 30., 89.], [0., -90., 90., 2.])
+        _, data, fault_type = ternary_classify(mt)
+        pc = self.tri.plot_density(data, nbins=10)
+        counts = np.asarray(pc.get_array())
+        # both strike-slip in the same cell
+        self.assertEqual(sorted(counts[counts > 0].tolist()), [1, 1, 2])
+
+    def test_sides(self):
+        tri = ternary_plot.ternaryDiagram(sides=4)
+        tri.background()
+        self.assertRaises(ValueError, tri.plot_density, np.ones((2, 4)))
+
+    def test_top(self):
+        drawn = []
+        self.tri.plot_data = lambda data, M, mag=None: drawn.append((M, mag))
+        data = np.random.RandomState(0).uniform(size=(10, 3))
+        M = np.arange(60.).reshape(10, 6)
+        mag = np.array([5., 7., 6., 4., 8., 5., 5., 5., 5., 5.])
+        self.tri.plot_density(data, M=M, mag=mag, top=3)
+        np.testing.assert_array_equal(drawn[0][0], M[[4, 1, 2]])
+        np.testing.assert_array_equal(drawn[0][1], [8., 7., 6.])
+        # without magnitude, the largest scalar moments
+        self.tri.plot_density(data, M=M, top=2)
+        np.testing.assert_array_equal(drawn[1][0], M[[9, 8]])
+        # top without M: no beachball
+        self.tri.plot_density(data, top=2)
+        self.assertEqual(len(drawn), 2)
+        # the events without magnitude after the others
+        mag[[0, 4]] = np.nan
+        self.tri.plot_density(data, M=M, mag=mag, top=2)
+        np.testing.assert_array_equal(drawn[2][0], M[[1, 2]])
+
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.catalog = os.path.join(self.tmpdir, 'catalog.txt')
+        self.store = os.path.join(self.tmpdir, 'store')
+        self.output = os.path.join(self.tmpdir, 'density.png')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, names, changed=()):
+        with open(self.catalog, 'w') as f:
+            for name in names:
+                text = CMTSOLUTION.format(header=HEADERS[0]).replace('201410151116A', name)
+                if name in changed:
+                    # another mechanism
+                    text = text.replace('Mrr:      -3.26', 'Mrr:       3.26')
+                f.write(text)
+
+    def run_script(self, *args):
+        env = dict(os.environ, MPLBACKEND='Agg')
+        with open(os.devnull, 'w') as null:
+            return subprocess.call([sys.executable, os.path.join(SCRIPTS, 'ternary_plot.py')] +
+                                   list(args), stdout=null, stderr=null, env=env)
+
+    def assertStored(self):
+        cat = load_catalog(self.catalog)
+        store = ResultsStore(self.store)
+        self.assertEqual(len(store), len(cat))
+        rows = store.lookup(cat['event'])
+        stored = np.column_stack([store[k][rows] for k in ('strike_slip', 'normal', 'reverse')])
+        np.testing.assert_allclose(stored, ternary_classify(moment_tensors(cat))[1], atol=1.e-12)
+
+    def test_density_store(self):
+        density = ['--density', '5', '-o', self.output, '--store', self.store]
+        self.write(['EVENT1', 'EVENT2'])
+        self.assertEqual(self.run_script('-c', self.catalog, *density), 0)
+        self.assertStored()
+        # an event added and an event changed
+        self.write(['EVENT1', 'EVENT2', 'EVENT3'], changed=['EVENT2'])
+        self.assertEqual(self.run_script('-c', self.catalog, *density), 0)
+        self.assertStored()
+        self.assertTrue(os.path.getsize(self.output) > 0)
+
+        # with a file of moment tensors too: only the catalog in the store
+        infile = os.path.join(self.tmpdir, 'fm.txt')
+        np.savetxt(infile, sdrToMtArray([0., 30.], [90., 45.], [0., -90.]))
+        self.assertEqual(self.run_script('--infile', infile, '-c', self.catalog, *density), 0)
+        self.assertStored()
+
+    def test_store_needs_catalog(self):
+        infile = os.path.join(self.tmpdir, 'fm.txt')
+        np.savetxt(infile, sdrToMtArray([0., 30.], [90., 45.], [0., -90.]))
+        self.assertEqual(self.run_script('--infile', infile, '--density', '-o', self.output,
+                                         '--store', self.store), 2)
+        self.write(['EVENT1'])
+        self.assertEqual(self.run_script('-c', self.catalog, '-o', self.output,
+                                         '--store', self.store), 2)
+        self.assertFalse(os.path.exists(self.store))
+
+    def test_infile_exclusive(self):
+        # --infile goes with -c, not with a single mechanism
+        infile = os.path.join(self.tmpdir, 'fm.txt')
+        np.savetxt(infile, sdrToMtArray([0.], [90.], [0.]))
+        for single in (['--mt', '1', '-2', '1', '0.5', '0.3', '-0.2'], ['--np', '321', '69', '-173']):
+            self.assertEqual(self.run_script('--infile', infile, '-o', self.output, *single), 2)
+        self.assertFalse(os.path.exists(self.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+import timings
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _args(*argv):
+    parser = argparse.ArgumentParser()
+    timings.add_arguments(parser)
+    return parser.parse_args(list(argv))
+
+
+class TestTimings(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_disabled(self):
+        t = timings.start(_args(), 'test')
+        self.assertIs(t, timings.NO_TIMINGS)
+        items = [1, 2]
+        self.assertIs(t.iterate('parse', items), items)
+        with t.stage('parse'):
+            pass
+        t.add('parse', 1.)
+        t.finish('-')
+
+    def test_stages(self):
+        output = os.path.join(self.tmpdir, 'timings.json')
+        args = _args('--timings', output)
+        t = timings.start(args, 'test')
+        with t.stage('parse'):
+            time.sleep(0.01)
+        with t.stage('parse'):
+            pass
+        self.assertEqual(list(t.iterate('read', 'abc')), ['a', 'b', 'c'])
+        t.add('render', 2., calls=10)
+        t.finish(args.timings)
+
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual(report['command'], 'test')
+        self.assertEqual([(s['name'], s['calls']) for s in report['stages']],
+                         [('parse', 2), ('read', 3), ('render', 10)])
+        self.assertGreaterEqual(report['stages'][0]['wall_s'], 0.01)
+        self.assertEqual(report['stages'][2]['wall_s'], 2.)
+        self.assertGreater(report['peak_rss_mb'], 0.)
+        self.assertGreaterEqual(report['total_s'], 0.01)
+
+    def test_profile(self):
+        pstats_file = os.path.join(self.tmpdir, 'run.pstats')
+        args = _args('--profile', pstats_file)
+        t = timings.start(args, 'test')
+        sorted(range(1000))
+        # the statistics without the report
+        t.finish(args.timings)
+        self.assertTrue(pstats.Stats(pstats_file).total_calls > 0)
+
+    def test_script(self):
+        # --timings without a file: the report on stderr
+        proc = subprocess.Popen([sys.executable, os.path.join(SCRIPTS, 'moment_tensor_dec.py'),
+                                 '-m', '1', '-2', '1', '0.5', '0.3', '-0.2', '--timings'],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = proc.communicate()
+        self.assertEqual(proc.returncode, 0)
+        report = json.loads(err.splitlines()[-1])
+        self.assertEqual(report['command'], 'moment_tensor_dec')
+        self.assertIn('decompose', [s['name'] for s in report['stages']])
+
+
+if __name__ == '__main__':
+    unittest.main()
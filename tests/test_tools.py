@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+'''
+The tools package: imports, and its command line (python -m tools and
+./tools.py)
+'''
+
+import os
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _python(args, cwd):
+    env = dict(os.environ, PYTHONPATH=SCRIPTS, MPLBACKEND='Agg')
+    return subprocess.check_output([sys.executable] + args, cwd=cwd, env=env).decode()
+
+
+class TestPackage(unittest.TestCase):
+
+    def test_mt_io(self):
+        from tools import mt, io
+        import moment_tensor_dec
+        import catalog
+        # the same functions as the scripts
+        self.assertIs(mt.eigen_decomposition, moment_tensor_dec.eigen_decomposition)
+        self.assertIs(io.read_catalog, catalog.read_catalog)
+        fm = mt.focal_mechanisms([321.], [69.], [-173.])
+        np.testing.assert_allclose(fm['mt'], mt.sdr_to_mt([321.], [69.], [-173.]))
+        np.testing.assert_allclose(mt.decompose(fm['mt'])[2], [100.])
+        self.assertEqual(io.dates_to_timestamps('1970-01-02 00:00:00'), 86400.)
+
+    def test_light_imports(self):
+        # tools.mt and tools.io do not import matplotlib nor obspy, from
+        # any directory
+        out = _python(['-c', 'import sys, tools.mt, tools.io; '
+                             'print(sorted(m for m in ("matplotlib", "obspy", "scipy") if m in sys.modules))'],
+                      cwd='/')
+        self.assertEqual(out.strip(), '[]')
+
+    def test_plot(self):
+        from tools import plot
+        import ternary_plot
+        self.assertIs(plot.ternaryDiagram, ternary_plot.ternaryDiagram)
+        self.assertTrue(callable(plot.write_animation))
+
+
+class TestCommandLine(unittest.TestCase):
+
+    def test_python_m(self):
+        out = _python(['-m', 'tools', 'mw2m0', '--no-header', '6'], cwd='/')
+        self.assertEqual(out.split(',')[0], '6.0')
+
+    def test_script(self):
+        # ./tools.py runs the command line of the package
+        out = _python([os.path.join(SCRIPTS, 'tools.py'), 'np1np2', '321', '69', '-173'], cwd='/')
+        header, row = out.splitlines()
+        self.assertTrue(header.startswith('strike1,dip1,rake1,strike2'))
+        np.testing.assert_allclose([float(v) for v in row.split(',')[3:6]],
+                                   [228.48, 83.47, -21.14], atol=0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import numpy as np
+
+from uncertainty import monte_carlo
+from moment_tensor_dec import sdrToMtArray, ternary_classify
+
+
+class TestMonteCarlo(unittest.TestCase):
+
+    # a strike-slip, a normal and a reverse fault
+    strike = np.array([0., 30., 60.])
+    dip = np.array([89., 45., 30.])
+    rake = np.array([0., -90., 90.])
+
+    def test_three_planes(self):
+        # 3 events: (strike, dip, rake) must not be taken as 3 planes
+        stats = monte_carlo(strike=self.strike, dip=self.dip, rake=self.rake,
+                            sigma_sdr=1., samples=200)
+        self.assertEqual(len(stats), 3)
+        np.testing.assert_array_equal(stats['prob'].argmax(axis=1), [0, 1, 2])
+        np.testing.assert_array_equal(stats['prob'].argmax(axis=1),
+                                      ternary_classify(sdrToMtArray(self.strike, self.dip, self.rake))[2])
+
+    def test_mt_and_planes(self):
+        # same classification from the moment tensors
+        mt = sdrToMtArray(self.strike, self.dip, self.rake)
+        stats = monte_carlo(mt=mt, sigma_mt=0.01, samples=200)
+        np.testing.assert_array_equal(stats['prob'].argmax(axis=1), [0, 1, 2])
+
+    def test_scalar_plane(self):
+        stats = monte_carlo(strike=321, dip=69, rake=-173, samples=100)
+        self.assertEqual(len(stats), 1)
+
+    def test_arguments(self):
+        self.assertRaises(ValueError, monte_carlo)
+        self.assertRaises(ValueError, monte_carlo, strike=self.strike, dip=self.dip)
+        self.assertRaises(ValueError, monte_carlo, mt=np.ones((1, 6)), strike=self.strike,
+                          dip=self.dip, rake=self.rake)
+
+    def test_reproducible(self):
+        # the samples of an event do not depend on the blocks
+        rng = np.random.RandomState(1)
+        mt = rng.normal(size=(20, 6))
+        a = monte_carlo(mt=mt, samples=100, memory=1)
+        b = monte_carlo(mt=mt, samples=100, memory=0.2)
+        self.assertEqual(a.tobytes(), b.tobytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
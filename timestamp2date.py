@@ -1,14 +1,40 @@
-#/usr/bin/env python
+#!/usr/bin/env python
 
 import time
 import datetime
 import argparse
 
+import numpy as np
+
 
 def timestamp_to_date(timestamp):
     return datetime.datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
 
 
+def timestamps_to_dates(timestamps, unit='s', sep=' '):
+    '''
+    Convert timestamps to dates, in UTC (timestamp_to_date uses the local time)
+    :param timestamps: seconds since 1970-01-01T00:00:00 UTC
+    :type timestamps: float or array-like
+    :param unit: precision of the dates ('s', 'ms' or 'us'), the timestamps
+                 are rounded to it
+    :param sep: separator between the date and the time
+    :return: dates yyyy-mm-dd hh:mm:ss[.ffffff]
+    :type: str or array of str
+    '''
+    ticks = np.timedelta64(1, 's') // np.timedelta64(1, unit)
+    t = np.round(np.atleast_1d(np.asarray(timestamps, dtype=float)) * ticks).astype('int64')
+    dates = np.datetime_as_string(t.view('datetime64[{}]'.format(unit)), unit=unit)
+    if sep != 'T':
+        # the separator is always the 11th character
+        dates = dates.astype('S')
+        chars = dates.view('S1').reshape(dates.shape + (dates.itemsize,))
+        chars[..., 10] = sep
+    if np.ndim(timestamps) == 0:
+        return str(dates[0])
+    return dates
+
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Wall time of the stages of a script (parsing, decomposition, rendering...),
+for the --timings and --profile options of the scripts.
+
+The stages are timed with a context manager. Without --timings nor
+--profile, start() returns NO_TIMINGS, whose stages do nothing.
+
+usage:
+
+timings.add_arguments(parser)
+args = parser.parse_args()
+t = timings.start(args, 'ternary_plot')
+with t.stage('parse'):
+    cat = load_catalog(filename)
+for events in t.iterate('parse', read_catalog(filename)):
+    ...
+t.finish(args.timings)
+
+The report is a json object:
+
+{"command": "ternary_plot", "total_s": 1.92, "peak_rss_mb": 95.1,
+ "children_peak_rss_mb": 0.0,
+ "stages": [{"name": "parse", "calls": 1, "wall_s": 0.41}, ...]}
+'''
+
+import json
+import resource
+import sys
+from collections import OrderedDict
+from timeit import default_timer as timer
+
+
+def _status(key):
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith(key + ':'):
+                return int(line.split()[1]) / 1024.
+
+
+def _maxrss(who):
+    # ru_maxrss is in kB on Linux, in bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / 1024. if sys.platform != 'darwin' else rss / 1024.**2
+
+
+def peak_rss():
+    '''
+    Peak memory (resident set size) of the process, in MB
+    '''
+    try:
+        return _status('VmHWM')
+    except (IOError, OSError):
+        return _maxrss(resource.RUSAGE_SELF)
+
+
+def reset_peak_rss():
+    '''
+    Reset the peak memory of the process (Linux only)
+    :return: current memory (MB), or the peak memory if it cannot be reset
+    '''
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return _status('VmRSS')
+    except (IOError, OSError):
+        return peak_rss()
+
+
+class _Stage():
+
+    __slots__ = ('timings', 'name', 't0')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = timer()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.add(self.name, timer() - self.t0)
+        return False
+
+
+class Timings():
+
+    def __init__(self, command=None, profile=None):
+        '''
+        :param command: name of the script, in the report
+        :param profile: if given, the script is profiled with cProfile and
+                        the statistics are saved in this file by finish()
+        '''
+        self.command = command
+        self.stages = OrderedDict()
+        self.profile = profile
+        self._profiler = None
+        if profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self.t0 = timer()
+
+    def stage(self, name):
+        '''
+        context manager adding its wall time to the stage
+        '''
+        return _Stage(self, name)
+
+    def add(self, name, elapsed, calls=1):
+        stage = self.stages.setdefault(name, [0, 0.])
+        stage[0] += calls
+        stage[1] += elapsed
+
+    def iterate(self, name, iterable):
+        '''
+        generator timing each step of an iterable (e.g. the chunks of a reader)
+        '''
+        it = iter(iterable)
+        while True:
+            t0 = timer()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add(name, timer() - t0, calls=0)
+                return
+            self.add(name, timer() - t0)
+            yield item
+
+    def report(self):
+        return OrderedDict([
+            ('command', self.command),
+            ('total_s', timer() - self.t0),
+            ('peak_rss_mb', peak_rss()),
+            ('children_peak_rss_mb', _maxrss(resource.RUSAGE_CHILDREN)),
+            ('stages', [OrderedDict([('name', name), ('calls', calls), ('wall_s', wall)])
+                        for name, (calls, wall) in self.stages.items()])])
+
+    def finish(self, output='-'):
+        '''
+        Stop the profiler and write the report (json) in output (stderr if '-')
+        '''
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile)
+            self._profiler = None
+        if output is None:
+            return
+        text = json.dumps(self.report())
+        if output == '-':
+            sys.stderr.write(text + '\n')
+        else:
+            with open(output, 'w') as f:
+                f.write(text + '\n')
+
+
+class _NoStage():
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NoTimings():
+    '''
+    Timings doing nothing, when --timings and --profile are not given
+    '''
+    _stage = _NoStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def add(self, name, elapsed, calls=1):
+        pass
+
+    def iterate(self, name, iterable):
+        return iterable
+
+    def finish(self, output='-'):
+        pass
+
+
+NO_TIMINGS = _NoTimings()
+
+
+def add_arguments(parser):
+    '''
+    add the --timings and --profile options to an argparse parser
+    '''
+    parser.add_argument('--timings', help='write the wall time and the number of calls of each stage and the peak memory as json in JSON (default: stderr)',
+                        nargs='?', const='-', default=None, metavar='JSON')
+    parser.add_argument('--profile', help='profile with cProfile and save the statistics in PSTATS (python -m pstats PSTATS)',
+                        default=None, metavar='PSTATS')
+
+
+def start(args, command):
+    '''
+    Timings of a script, from the options added by add_arguments
+    :return: Timings, or NO_TIMINGS if neither --timings nor --profile is given
+    '''
+    if not args.timings and not args.profile:
+        return NO_TIMINGS
+    return Timings(command, profile=args.profile)
@@ -0,0 +1,11 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# the conversions are in the tools package (tools/cli.py), which is imported
+# instead of this file: this script only runs its command line
+from tools.cli import main
+
+
+if __name__ == "__main__":
+
+    main()
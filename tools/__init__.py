@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+'''
+The computations of the scripts, as a package, for the programs which
+process events in-process instead of running a script per event.
+
+  tools.mt    moment tensors: decomposition, classification, nodal planes,
+              principal axes, magnitudes, Kagan angles, uncertainty (numpy)
+  tools.io    catalogs (CMTSOLUTION, NDK, focal mechanism tables), binary
+              cache, results store, dates and timestamps
+  tools.plot  beachballs, ternary diagrams, animations (matplotlib, obspy)
+
+Every function works on arrays of events; there is a single implementation
+of each, which stays in the modules of the scripts (moment_tensor_dec,
+catalog, magnitude, ...): the subpackages only re-export them, and the
+modules of the scripts import each other by their top-level names. tools.mt and tools.io
+only import numpy; matplotlib and obspy are imported by tools.plot.
+
+The directory of the scripts must be in the path:
+
+import sys
+sys.path.insert(0, 'path_to_the_scripts')
+from tools import mt, io
+cat = io.load_catalog('jan76_dec13.ndk')
+dec = mt.eigen_decomposition(io.moment_tensors(cat))
+_, bary, fault_type = mt.ternary_classify(dec)
+mw = mt.moment2Mw(dec['m0'])
+
+The command line of the conversions is tools.cli (python -m tools, or
+./tools.py).
+'''
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Single entry point for the conversion scripts, with a batch mode
+(python -m tools, or ./tools.py).
+
+The values are given on the command line, or, without values, read from
+stdin: one record per line (fields separated by spaces or commas, the whole
+line for the commands of one field, e.g. "yyyy-mm-dd hh:mm:ss"; empty lines
+and lines starting with # are skipped). The records are converted by
+chunks and the results are written on stdout as CSV or JSON lines, so that
+a single process converts millions of values in a shell pipeline.
+
+subcommands:
+  m02mw           seismic moment (N.m, or dyne.cm with --dyne) -> Mw, Es
+  mw2m0           Mw -> seismic moment, Es
+  date2timestamp  yyyy-mm-ddThh:mm:ss[.ffffff] -> timestamp (UTC)
+  timestamp2date  timestamp -> yyyy-mm-dd hh:mm:ss[.ffffff] (UTC)
+  np1np2          strike dip rake -> auxiliary plane, moment tensor, T N P axes
+  mtdec           Mrr Mtt Mpp Mrt Mrp Mtp -> percentage of ISO, DC and CLVD
+
+examples:
+
+./tools.py mw2m0 5.5 6 7.2
+awk '{print $12}' catalog.txt | python -m tools mw2m0 --format jsonl
+./tools.py np1np2 321 69 -173
+./tools.py mtdec < tensors.txt > decomposition.csv
+'''
+
+from __future__ import absolute_import
+
+import argparse
+import csv
+import json
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from tools.mt import moment2Mw, Mw2moment, energy, decompose, focal_mechanisms
+from tools.io import dates_to_timestamps, timestamps_to_dates
+
+
+#-------------------------------------------------------------------------------
+# conversions: function(fields, args) -> list of columns
+# fields is an (N, nfields) array of strings
+
+def _m02mw(fields, args):
+    m0 = fields[:, 0].astype(float)
+    unit = 'dyne.cm' if args.dyne else 'N.m'
+    m0_nm = m0 / 1.e7 if args.dyne else m0
+    return [m0_nm, m0_nm * 1.e7, moment2Mw(m0, unit=unit), energy(m0, unit=unit)]
+
+
+def _mw2m0(fields, args):
+    mw = fields[:, 0].astype(float)
+    m0 = Mw2moment(mw)
+    return [mw, m0, energy(m0, unit='N.m')]
+
+
+def _date2timestamp(fields, args):
+    return [fields[:, 0], dates_to_timestamps(fields[:, 0], unit=args.unit)]
+
+
+def _timestamp2date(fields, args):
+    ts = fields[:, 0].astype(float)
+    return [ts, timestamps_to_dates(ts, unit=args.unit)]
+
+
+def _np1np2(fields, args):
+    fm = focal_mechanisms(*fields.astype(float).T)
+    return (list(fm['np1'].T) + list(fm['np2'].T) + list(fm['mt'].T) +
+            [fm[k][:, i] for i in range(3) for k in ('val', 'plunge', 'azimuth')])
+
+
+def _mtdec(fields, args):
+    iso, clvd, dc = decompose(fields.astype(float))
+    return [np.abs(iso), dc, np.abs(clvd)]
+
+
+# name: (number of fields per record, conversion, output columns, help)
+COMMANDS = {
+    'm02mw': (1, _m02mw, ('M0_Nm', 'M0_dyne_cm', 'Mw', 'Es_joules'),
+              'convert seismic moment to moment magnitude Mw'),
+    'mw2m0': (1, _mw2m0, ('Mw', 'M0_Nm', 'Es_joules'),
+              'convert moment magnitude Mw to seismic moment'),
+    'date2timestamp': (1, _date2timestamp, ('date', 'timestamp'),
+                       'convert UTC dates (yyyy-mm-ddThh:mm:ss) to timestamps'),
+    'timestamp2date': (1, _timestamp2date, ('timestamp', 'date'),
+                       'convert timestamps to UTC dates'),
+    'np1np2': (3, _np1np2,
+               ('strike1', 'dip1', 'rake1', 'strike2', 'dip2', 'rake2',
+                'Mrr', 'Mtt', 'Mpp', 'Mrt', 'Mrp', 'Mtp',
+                'T_val', 'T_plg', 'T_azm', 'N_val', 'N_plg', 'N_azm',
+                'P_val', 'P_plg', 'P_azm'),
+               'auxiliary plane, moment tensor and principal axes of nodal planes (strike dip rake)'),
+    'mtdec': (6, _mtdec, ('ISO', 'DC', 'CLVD'),
+              'percentage of ISO, DC and CLVD of moment tensors (Mrr Mtt Mpp Mrt Mrp Mtp)'),
+}
+
+
+#-------------------------------------------------------------------------------
+def read_records(stream, nfields, chunksize=65536):
+    '''
+    Generator of (N, nfields) arrays of strings read from a text stream
+    (a single field is the whole line, which may contain spaces)
+    '''
+    records = []
+    for lineno, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        fields = [line] if nfields == 1 else line.replace(',', ' ').split()
+        if len(fields) != nfields:
+            raise ValueError("line {}: expected {} fields, got {}".format(lineno, nfields, len(fields)))
+        records.append(fields)
+        if len(records) == chunksize:
+            yield np.array(records)
+            records = []
+    if records:
+        yield np.array(records)
+
+
+def _format(value):
+    # shortest representation that reads back to the same float, as in json
+    # (10 digits are not enough for timestamps to the microsecond)
+    if isinstance(value, float):
+        return repr(value)
+    return value
+
+
+def write_records(out, columns, names, fmt, header):
+    rows = zip(*[np.asarray(c).tolist() for c in columns])
+    if fmt == 'jsonl':
+        for row in rows:
+            out.write(json.dumps(OrderedDict(zip(names, row))) + '\n')
+    else:
+        writer = csv.writer(out, lineterminator='\n')
+        if header:
+            writer.writerow(names)
+        for row in rows:
+            writer.writerow([_format(v) for v in row])
+    out.flush()
+
+
+def run(command, values, args, stdin=sys.stdin, stdout=sys.stdout):
+    '''
+    Convert the values (or the records of stdin if values is empty) with a
+    command of COMMANDS and write the results on stdout
+    :return: number of records converted
+    '''
+    nfields, convert, names, _ = COMMANDS[command]
+
+    if values:
+        if len(values) % nfields:
+            raise ValueError("{} expects {} values per record".format(command, nfields))
+        chunks = [np.array(values).reshape(-1, nfields)]
+    else:
+        chunks = read_records(stdin, nfields, chunksize=args.chunksize)
+
+    count = 0
+    for fields in chunks:
+        columns = convert(fields, args)
+        write_records(stdout, columns, names, args.format, header=(count == 0 and args.header))
+        count += len(fields)
+    return count
+
+
+def main():
+
+    parser = argparse.ArgumentParser(prog='tools.py',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     description='Conversion tools, for values given on the command line or records read from stdin',
+                                     epilog='''example:
+./tools.py mw2m0 5.5 6 7.2
+cat magnitudes.txt | ./tools.py mw2m0 --format jsonl''')
+    subparsers = parser.add_subparsers(dest='command')
+
+    for name in sorted(COMMANDS):
+        nfields, _, _, description = COMMANDS[name]
+        sub = subparsers.add_parser(name, help=description, description=description)
+        # negative numbers are not taken for options (but in scientific
+        # notation they are: use stdin)
+        sub.add_argument('values', nargs='*',
+                         help='values to convert ({} per record), read from stdin if none'.format(nfields))
+        sub.add_argument('--format', choices=('csv', 'jsonl'), default='csv',
+                         help='output format (default: csv)')
+        sub.add_argument('--no-header', dest='header', action='store_false',
+                         help='do not write the header line of the csv output')
+        sub.add_argument('--chunksize', type=int, default=65536,
+                         help='number of records converted at once (default: %(default)s)')
+        if name == 'm02mw':
+            sub.add_argument('--dyne', action='store_true', help='M0 is given in dyne.cm')
+        if name in ('date2timestamp', 'timestamp2date'):
+            # dates are parsed to the microsecond, printed to the second
+            sub.add_argument('--unit', choices=('s', 'ms', 'us'),
+                             default='us' if name == 'date2timestamp' else 's',
+                             help='precision of the dates (default: %(default)s)')
+
+    args = parser.parse_args()
+
+    try:
+        run(args.command, args.values, args)
+    except ValueError as e:
+        parser.exit(2, '{}: error: {}\n'.format(parser.prog, e))
+    except IOError:
+        # stdout closed by the pipeline (e.g. | head)
+        pass
+
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+
+'''
+Catalogs and results, by chunks of events (numpy only).
+
+from tools import io
+for cat in io.read_catalog('jan76_dec13.ndk'):
+    mt = io.moment_tensors(cat)
+'''
+
+from __future__ import absolute_import
+
+from catalog import (read_catalog, load_catalog, open_catalog, guess_format, moment_tensors,
+                     read_foc_mec, load_foc_mec, cached_array, NpyWriter, CATALOG_DTYPE,
+                     MT_KEYS, FOC_MEC_COLUMNS, DEFAULT_CACHE_DIR)
+from date2timestamp import dates_to_timestamps
+from timestamp2date import timestamps_to_dates
+from pipeline import run_pipeline, open_writer, process_block, RESULT_COLUMNS, COLUMN_DTYPES
+from results_store import ResultsStore, update_store
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+'''
+Moment tensors and focal mechanisms, for arrays of events (numpy only).
+
+The moment tensors are arrays of shape (N, 6): Mrr Mtt Mpp Mrt Mrp Mtp
+(r=up, t=south, p=east), the angles are in degrees.
+
+from tools import mt
+fm = mt.focal_mechanisms(strike, dip, rake)   # np2, mt, principal axes
+iso, clvd, dc = mt.decompose(fm['mt'])
+'''
+
+from __future__ import absolute_import
+
+from moment_tensor_dec import (mt_matrices, decompose, principal_axes, eigen_decomposition,
+                               ternary_classify, sdrToMtArray, aux_plane, mt2planes,
+                               focal_mechanisms, DECOMPOSITION_DTYPE, MECHANISM_DTYPE,
+                               FAULT_TYPES)
+from magnitude import moment2Mw, Mw2moment, energy
+from kagan import quaternions, sdr_quaternions, kagan_angle, kagan_pairs, KaganIndex
+from uncertainty import monte_carlo, scalar_moments, uncertainty_dtype, UNCERTAINTY_DTYPE
+
+# sdrToMtArray under the name of the other functions of the package
+sdr_to_mt = sdrToMtArray
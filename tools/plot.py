@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+'''
+Drawings: beachballs, ternary diagrams and animations (matplotlib, obspy).
+
+from tools import plot
+diagram = plot.ternaryDiagram()
+diagram.background()
+diagram.plot_data(bary, mt, mag)
+'''
+
+from __future__ import absolute_import
+
+from beachball_cache import BeachballCache
+from plot_beachball import BB, draw_batch
+from ternary_plot import ternaryDiagram, time_windows
+from animation import GifWriter, VideoWriter, open_writer, write_animation
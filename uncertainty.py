@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''
+Monte Carlo estimation of the uncertainty of the decomposition (ISO, CLVD,
+DC percentages) and of the position in the ternary diagram of focal
+mechanisms.
+
+For each event, K perturbed mechanisms are drawn: gaussian errors on the
+strike, dip and rake (degrees), or on the 6 components of the moment tensor
+(in fraction of the scalar moment by default). They are decomposed with
+moment_tensor_dec.eigen_decomposition and classified with ternary_classify
+by blocks of events, so that the memory used does not depend on the number
+of events (see --memory). The blocks can be computed by several processes.
+
+For each event are returned the percentiles of the ISO, CLVD and DC
+percentages and of the ternary coordinates, and the probability of each
+class of FAULT_TYPES (see UNCERTAINTY_DTYPE).
+
+The draws are reproducible: the samples of an event only depend on the
+seed and on the position of the event in the input, not on the blocks nor
+on the number of processes.
+
+usage:
+
+./uncertainty.py --np 321 69 -173 --sigma-sdr 10 10 15
+./uncertainty.py -c jan76_dec13.ndk --sigma-mt 0.1 -K 1000 -j 4 > gcmt_uncertainty.csv
+
+import uncertainty
+stats = uncertainty.monte_carlo(strike=strike, dip=dip, rake=rake, sigma_sdr=(10, 10, 15))
+print stats['dc'][:, 1], stats['prob']
+'''
+
+import argparse
+import csv
+import multiprocessing
+import sys
+
+import numpy as np
+
+from moment_tensor_dec import sdrToMtArray, eigen_decomposition, ternary_classify, FAULT_TYPES
+import timings
+
+
+DEFAULT_PERCENTILES = (5., 50., 95.)
+
+# memory used per sample by the decomposition (tensor, matrices,
+# eigenvectors, work arrays of eigh), to size the blocks
+_BYTES_PER_SAMPLE = 1024
+
+
+def uncertainty_dtype(npercentiles=len(DEFAULT_PERCENTILES)):
+    '''
+    dtype of the statistics of monte_carlo:
+     - iso, clvd, dc: percentiles of the percentages (signed as decompose)
+     - bary: percentiles of the ternary coordinates (strike-slip, normal,
+       reverse vertices, see ternary_classify), shape (3, npercentiles)
+     - prob: probability of each class of FAULT_TYPES
+    '''
+    p = npercentiles
+    return np.dtype([('iso', 'f8', (p,)),
+                     ('clvd', 'f8', (p,)),
+                     ('dc', 'f8', (p,)),
+                     ('bary', 'f8', (3, p)),
+                     ('prob', 'f8', (len(FAULT_TYPES),))])
+
+
+UNCERTAINTY_DTYPE = uncertainty_dtype()
+
+
+def scalar_moments(mt):
+    '''
+    Scalar moment of moment tensors (Frobenius norm / sqrt(2))
+    '''
+    mt = np.asarray(mt, dtype=float).reshape(-1, 6)
+    return np.sqrt(0.5*(mt[:, :3]**2).sum(axis=1) + (mt[:, 3:]**2).sum(axis=1))
+
+
+def _samples(block, samples, seed, first):
+    # perturbed moment tensors of a block of events, shape (n*samples, 6)
+    kind, values, sigma = block
+    n, ncols = values.shape
+    noise = np.empty((n, samples, ncols))
+    for j in range(n):
+        # one generator per event: the draws do not depend on the blocks
+        noise[j] = np.random.RandomState([seed, first + j]).standard_normal((samples, ncols))
+    perturbed = (values[:, np.newaxis, :] + noise * sigma[:, np.newaxis, :]).reshape(-1, ncols)
+    if kind == 'sdr':
+        return sdrToMtArray(perturbed[:, 0], perturbed[:, 1], perturbed[:, 2])
+    return perturbed
+
+
+def _statistics(block, samples, percentiles, seed, first):
+    '''
+    Draw and decompose the samples of a block of events
+    :param block: ('sdr' or 'mt', values (n, 3 or 6), sigma (n, 3 or 6))
+    :param seed: seed of the draws
+    :param first: position of the first event of the block in the input
+    '''
+    n = len(block[1])
+    mt = _samples(block, samples, seed, first)
+
+    dec = eigen_decomposition(mt)
+    _, bary, fault_type = ternary_classify(dec)
+
+    out = np.empty(n, dtype=uncertainty_dtype(len(percentiles)))
+    for k in ('iso', 'clvd', 'dc'):
+        out[k] = np.percentile(dec[k].reshape(n, samples), percentiles, axis=1).T
+    out['bary'] = np.percentile(bary.reshape(n, samples, 3), percentiles, axis=1).transpose(1, 2, 0)
+    counts = np.zeros((n, len(FAULT_TYPES)))
+    np.add.at(counts, (np.repeat(np.arange(n), samples), fault_type), 1.)
+    out['prob'] = counts / samples
+    return out
+
+
+# parameters of a worker process, set by _init_worker
+_worker = {}
+
+def _init_worker(samples, percentiles):
+    _worker['samples'] = samples
+    _worker['percentiles'] = percentiles
+
+
+def _worker_block(job):
+    block, seed, first = job
+    return _statistics(block, _worker['samples'], _worker['percentiles'], seed, first)
+
+
+def monte_carlo(mt=None, strike=None, dip=None, rake=None, sigma_mt=0.1, relative=True,
+                sigma_sdr=(10., 10., 10.),
+                samples=1000, percentiles=DEFAULT_PERCENTILES, seed=0,
+                memory=64, processes=1, t=timings.NO_TIMINGS):
+    '''
+    Monte Carlo statistics of the decomposition and ternary classification
+    of perturbed mechanisms, given either as moment tensors or as nodal planes
+    :param mt: moment tensors (N, 6) (Mrr,Mtt,Mpp,Mrt,Mrp,Mtp)
+    :param strike, dip, rake: nodal planes, in degrees (scalars or arrays
+                              (N,), broadcast together)
+    :param sigma_mt: standard deviation of the components of mt (scalar,
+                     (6,) or (N, 6)), in fraction of the scalar moment of each
+                     event if relative, in the unit of mt otherwise
+    :param sigma_sdr: standard deviation of the strike, dip and rake in
+                      degrees (scalar, (3,) or (N, 3))
+    :param samples: number of samples K per event
+    :param percentiles: percentiles of the statistics (0 to 100)
+    :param seed: seed of the random draws
+    :param memory: memory budget of a block of events (MB), per process
+    :param processes: number of worker processes (1 to compute in the
+                      current process, cpu count if None)
+    :param t: timings of the stages (see timings.start)
+    :return: array of dtype uncertainty_dtype(len(percentiles)), one per event
+    '''
+    sdr = (strike, dip, rake)
+    given = [a is not None for a in sdr]
+    if not (mt is None and all(given) or mt is not None and not any(given)):
+        raise ValueError("give either mt or strike, dip and rake")
+    if mt is not None:
+        kind = 'mt'
+        values = np.asarray(mt, dtype=float).reshape(-1, 6)
+        sigma = np.broadcast_to(np.asarray(sigma_mt, dtype=float), (len(values), 6))
+        if relative:
+            sigma = sigma * scalar_moments(values)[:, np.newaxis]
+    else:
+        kind = 'sdr'
+        values = np.column_stack([np.ravel(a) for a in
+                                  np.broadcast_arrays(*[np.asarray(a, dtype=float) for a in sdr])])
+        sigma = np.broadcast_to(np.asarray(sigma_sdr, dtype=float), (len(values), 3))
+    percentiles = tuple(float(p) for p in percentiles)
+    samples = int(samples)
+
+    out = np.empty(len(values), dtype=uncertainty_dtype(len(percentiles)))
+    blocksize = max(1, int(memory * 2**20) // (samples * _BYTES_PER_SAMPLE))
+    starts = range(0, len(values), blocksize)
+    jobs = (((kind, values[i:i + blocksize], np.ascontiguousarray(sigma[i:i + blocksize])), seed, i)
+            for i in starts)
+
+    if processes == 1:
+        results = (_statistics(block, samples, percentiles, s, i) for block, s, i in jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, _init_worker, (samples, percentiles))
+        results = pool.imap(_worker_block, jobs)
+    try:
+        i = 0
+        for stats in t.iterate('sample', results):
+            out[i:i + len(stats)] = stats
+            i += len(stats)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return out
+
+
+def _columns(percentiles):
+    names = []
+    for k in ('iso', 'clvd', 'dc'):
+        names += ['{}_p{:g}'.format(k, p) for p in percentiles]
+    for k in ('strike_slip', 'normal', 'reverse'):
+        names += ['{}_p{:g}'.format(k, p) for p in percentiles]
+    names += ['p_' + k.replace('-', '_') for k in FAULT_TYPES]
+    return names
+
+
+def write_csv(out, stats, percentiles, names=None):
+    '''
+    Write the statistics of monte_carlo as CSV, one line per event
+    :param names: names of the events (first column), if given
+    '''
+    writer = csv.writer(out, lineterminator='\n')
+    header = _columns(percentiles)
+    table = np.column_stack([stats['iso'], stats['clvd'], stats['dc'],
+                             stats['bary'].reshape(len(stats), -1), stats['prob']])
+    if names is not None:
+        writer.writerow(['event'] + header)
+        for name, row in zip(names, table.tolist()):
+            writer.writerow([name] + [repr(v) for v in row])
+    else:
+        writer.writerow(header)
+        for row in table.tolist():
+            writer.writerow([repr(v) for v in row])
+
+
+def main():
+
+    parser = argparse.ArgumentParser(prog='uncertainty.py',
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     description='Monte Carlo uncertainty of the ISO, CLVD, DC percentages and of the ternary classification of focal mechanisms',
+                                     epilog='''example:
+./uncertainty.py --np 321 69 -173 --sigma-sdr 10 10 15
+./uncertainty.py -c jan76_dec13.ndk --sigma-mt 0.1 -K 1000 -j 4 > gcmt_uncertainty.csv''')
+    group_input = parser.add_mutually_exclusive_group(required=True)
+    group_input.add_argument('-c', '--cmtfile', help='catalog at the CMTSOLUTION or NDK format')
+    group_input.add_argument('--infile', help='file of moment tensors (Mrr Mtt Mpp Mrt Mrp Mtp [lon lat depth Mw] per line)')
+    group_input.add_argument('--mt', help='moment tensor', nargs=6, type=float,
+                             metavar=("Mrr", "Mtt", "Mpp", "Mrt", "Mrp", "Mtp"))
+    group_input.add_argument('--np', help='nodal plane', nargs=3, type=float,
+                             metavar=("strike", "dip", "rake"))
+    parser.add_argument('--sigma-mt', type=float, default=0.1,
+                        help='standard deviation of the moment tensor components, in fraction of the scalar moment (default: %(default)s)')
+    parser.add_argument('--sigma-sdr', type=float, nargs=3, default=(10., 10., 10.),
+                        metavar=('STRIKE', 'DIP', 'RAKE'),
+                        help='with --np, standard deviation of the angles in degrees (default: 10 10 10)')
+    parser.add_argument('-K', '--samples', type=int, default=1000,
+                        help='number of samples per event (default: %(default)s)')
+    parser.add_argument('--percentiles', type=float, nargs='+', default=DEFAULT_PERCENTILES,
+                        help='percentiles of the statistics (default: 5 50 95)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random draws (default: %(default)s)')
+    parser.add_argument('--memory', type=float, default=64,
+                        help='memory budget of a block of events in MB, per process (default: %(default)s)')
+    parser.add_argument('-j', '--processes', type=int, default=1,
+                        help='number of worker processes (default: %(default)s, 0 for the number of cpu)')
+    timings.add_arguments(parser)
+    args = parser.parse_args()
+
+    t = timings.start(args, 'uncertainty')
+    names = None
+    kwargs = {}
+    with t.stage('parse'):
+        if args.cmtfile:
+            from catalog import load_catalog, moment_tensors
+            cat = load_catalog(args.cmtfile)
+            names = cat['event']
+            kwargs['mt'] = moment_tensors(cat)
+        elif args.infile:
+            from catalog import load_foc_mec
+            kwargs['mt'] = load_foc_mec(args.infile)[:, :6]
+        elif args.mt:
+            kwargs['mt'] = [args.mt]
+        else:
+            kwargs['strike'], kwargs['dip'], kwargs['rake'] = args.np
+
+    stats = monte_carlo(sigma_mt=args.sigma_mt, sigma_sdr=args.sigma_sdr,
+                        samples=args.samples, percentiles=args.percentiles,
+                        seed=args.seed, memory=args.memory,
+                        processes=args.processes or None, t=t, **kwargs)
+    with t.stage('output'):
+        write_csv(sys.stdout, stats, args.percentiles, names=names)
+    t.finish(args.timings)
+
+
+if __name__ == "__main__":
+
+    main()